@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncioによる並列ダウンロード
+スレッドプールの代わりにasyncio.create_subprocess_execでyt-dlpを起動し、
+セマフォ（--adaptive時は自動調整リミッター）で同時実行数を制限します
+"""
+
+import asyncio
+import contextlib
+import signal
+import subprocess
+from collections import deque
+
+from format_model import FormatModel
+from job_queue import DOWNLOADING, FAILED, PENDING, PROBING
+from yt_dlp_engine import PROGRESS_MARKER, TAIL_LINES, DownloadResult, EngineResult, parse_result_line
+
+# 子プロセス終了を待つ時間（秒）。超えた場合は強制終了
+TERMINATE_TIMEOUT = 5
+# 1行の最大長（--dump-single-jsonは巨大な1行になるため大きめに確保）
+STREAM_LIMIT = 16 * 1024 * 1024
+# 帯域・接続数の空きを確認する間隔（秒）
+BANDWIDTH_POLL_INTERVAL = 0.2
+# 実行中のジョブがない間に、可変の同時実行数の空きを確認する間隔（秒）
+LIMITER_POLL_INTERVAL = 0.2
+
+
+class AsyncOrchestrator:
+    """
+    YouTubeVideoDownloaderのジョブをasyncioで並行実行
+
+    実行中のジョブ数だけタスクを生成するため、数千件のジョブを投入しても
+    メモリ使用量は同時実行数に比例します。
+    インデックス・動画情報キャッシュ・ジョブキューの読み書きはasyncio.to_threadで実行し、
+    イベントループ（他のジョブの出力の読み取り・中断の処理）を止めません。
+    中断時（Ctrl-C）は実行中のyt-dlpプロセスを終了させてから戻ります。
+    """
+
+    def __init__(self, downloader, max_concurrency=None):
+        """
+        Args:
+            downloader (YouTubeVideoDownloader): 形式選択・インデックス記録に使用
+            max_concurrency (int): 同時実行数（省略時はdownloader.max_workers）
+        """
+        self.downloader = downloader
+        self.max_concurrency = max_concurrency or downloader.max_workers
+        self.yt_dlp_path = None
+        self.enumeration_failed = False
+        self._processes = set()
+
+    def prepare(self):
+        """
+        yt-dlpの実行ファイルを確認
+
+        Returns:
+            bool: 利用可能な場合True
+        """
+        if not self.downloader.check_yt_dlp():
+            return False
+        self.yt_dlp_path = self.downloader.toolchain.path('yt-dlp')
+        if not self.yt_dlp_path:
+            print("エラー: asyncioモードにはyt-dlpの実行ファイルが必要です")
+            return False
+        return True
+
+    async def run_yt_dlp(self, args, stream=False, on_output=None, echo=True):
+        """
+        yt-dlpを子プロセスとして実行
+
+        Args:
+            args (list): yt-dlpに渡す引数
+            stream (bool): 出力をリアルタイムで表示するか
+            on_output (callable): リアルタイム出力の各行を受け取る関数
+            echo (bool): リアルタイム出力の各行を表示するか（Falseの場合はon_outputにのみ渡す）
+
+        Returns:
+            EngineResult: 実行結果
+        """
+        process = await asyncio.create_subprocess_exec(
+            self.yt_dlp_path, *args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if stream else subprocess.PIPE,
+            limit=STREAM_LIMIT,
+        )
+        self._processes.add(process)
+        try:
+            if not stream:
+                stdout, stderr = await process.communicate()
+                stdout = stdout.decode('utf-8', 'replace')
+                files = [f for f in map(parse_result_line, stdout.splitlines()) if f]
+                return EngineResult(process.returncode, stdout, stderr.decode('utf-8', 'replace'), files)
+
+            files = []
+            tail = deque(maxlen=TAIL_LINES)
+            async for raw in process.stdout:
+                line = raw.decode('utf-8', 'replace').rstrip()
+                reported = parse_result_line(line)
+                if reported:
+                    files.append(reported)
+                elif line.startswith(PROGRESS_MARKER):
+                    if on_output:
+                        on_output(line)
+                else:
+                    if echo:
+                        print(line)
+                    tail.append(line)
+                    if on_output:
+                        on_output(line)
+            await process.wait()
+            return EngineResult(process.returncode, stderr="\n".join(tail), files=files)
+        except asyncio.CancelledError:
+            await self._terminate(process)
+            raise
+        finally:
+            self._processes.discard(process)
+
+    async def _terminate(self, process):
+        """子プロセスを終了させる（応答がなければ強制終了）"""
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def probe(self, url):
+        """
+        動画情報を取得（動画情報キャッシュを優先）
+
+        Returns:
+            FormatModel: 形式モデル（取得に失敗した場合は空のモデル）
+        """
+        downloader = self.downloader
+        info = await asyncio.to_thread(downloader.cached_video_info, url)
+        if info is None:
+            with downloader.timed('probe', url):
+                result = await self.run_yt_dlp(downloader.video_info_args(url))
+            info = await asyncio.to_thread(downloader.parse_video_info, result)
+        return FormatModel.from_info(info) if info else FormatModel([])
+
+    async def prefetch(self, url, quality):
+        """
+        ダウンロード前に形式一覧を取得（ダウンロード済みの場合は取得しない）
+
+        Returns:
+            FormatModel: 形式モデル（不要な場合None）
+        """
+        if await asyncio.to_thread(self.downloader.is_already_downloaded, url, quality):
+            return None
+        await asyncio.to_thread(self.downloader.set_job_state, url, PROBING)
+        return await self.probe(url)
+
+    async def download(self, url, quality="720p", format_id=None, audio_quality="0", audio_format="best",
+                       prefetched=None):
+        """
+        1本の動画をダウンロード（YouTubeVideoDownloader.download_videoのasyncio版）
+
+        Args:
+            prefetched (asyncio.Task): 先読み中の形式一覧（省略時はここで取得）
+
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        downloader = self.downloader
+        cached_info = await asyncio.to_thread(downloader.get_cached_download, url, quality)
+        if cached_info:
+            print(f"✅ 動画は既にダウンロード済みです: {url}")
+            downloader.count_metric('index_skips')
+            return downloader.cached_result(cached_info)
+
+        await asyncio.to_thread(downloader.set_job_state, url, PROBING)
+        available_formats = None
+        if prefetched is not None:
+            available_formats = await prefetched
+        if available_formats is None and not format_id:
+            available_formats = await self.probe(url)
+        format_spec, info_file = await asyncio.to_thread(downloader.resolve_format, url, quality, format_id,
+                                                         available_formats)
+        async with self.bandwidth_lease() as lease:
+            args = downloader.build_download_args(url, format_spec, audio_quality, audio_format, info_file, lease)
+            downloader.print_download_header(url, quality, lease)
+            await asyncio.to_thread(downloader.set_job_state, url, DOWNLOADING)
+            observer = downloader.job_output_observer(url)
+            with downloader.timed('download', url):
+                result = await self.run_yt_dlp(args, stream=True, on_output=observer, echo=downloader.echo_output)
+            downloader.record_merge(url, observer)
+        return await asyncio.to_thread(downloader.finish_download, url, quality, result)
+
+    @contextlib.asynccontextmanager
+    async def bandwidth_lease(self):
+        """
+        帯域・接続数の割り当てを取得（--max-rate/--max-connections未指定時はNone）
+
+        空きがない場合はイベントループを止めずに、他のジョブの終了を待ちます。
+        子プロセスの帯域は実行中に変更できないため、開始時の割り当てで固定します。
+        """
+        budget = self.downloader.bandwidth
+        if budget is None:
+            yield None
+            return
+        lease = budget.try_acquire(adjustable=False)
+        while lease is None:
+            await asyncio.sleep(BANDWIDTH_POLL_INTERVAL)
+            lease = budget.try_acquire(adjustable=False)
+        try:
+            yield lease
+        finally:
+            budget.release(lease)
+
+    async def _download_safely(self, url, options, prefetched=None):
+        """1ジョブを実行（一時的な失敗・403/429はretry_policyに従って再試行）"""
+        downloader = self.downloader
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = await self._enter_breaker()
+            try:
+                with downloader.timed('job', url):
+                    result = await self.download(url, prefetched=prefetched, **options)
+            except asyncio.CancelledError:
+                self._exit_breaker(ticket, DownloadResult(False, interrupted=True))
+                raise
+            except Exception as e:
+                print(f"❌ エラー: {url} - {e}")
+                await asyncio.to_thread(downloader.set_job_state, url, FAILED, str(e))
+                result = DownloadResult(False)
+                self._exit_breaker(ticket, result)
+                if downloader.limiter:
+                    downloader.limiter.record_result(result)
+                return result
+            self._exit_breaker(ticket, result)
+            if downloader.limiter:
+                downloader.limiter.record_result(result)
+            kind, delay = downloader.retry_policy.next_delay(result, attempt)
+            if kind:
+                downloader.count_metric('failures', kind=kind)
+            if delay is None:
+                break
+            print(downloader.retry_message(url, kind, attempt, delay))
+            await asyncio.to_thread(downloader.set_job_state, url, PENDING, kind)
+            downloader.count_metric('retries', kind=kind)
+            await asyncio.sleep(delay)
+        print(f"{'✅ 完了' if result else '❌ 失敗'}: {url}")
+        await asyncio.to_thread(downloader.finish_job, url, result)
+        return result
+
+    async def _enter_breaker(self):
+        """403/429の多発で遮断中は、新しいジョブを開始できるまで待つ"""
+        breaker = self.downloader.breaker
+        if breaker is None:
+            return None
+        while True:
+            ticket = breaker.try_enter()
+            if ticket is not None:
+                return ticket
+            await asyncio.sleep(max(0.05, breaker.wait_time()))
+
+    def _exit_breaker(self, ticket, result):
+        if ticket is not None:
+            self.downloader.breaker.exit(ticket, result)
+
+    async def download_all(self, urls, **options):
+        """
+        複数の動画を同時実行数の範囲で並行ダウンロード
+
+        URLの取り出しは別タスクで行い、形式を自動選択する場合は
+        次に開始するdownloader.prefetch件程度の動画情報を先読みします。
+
+        Args:
+            urls (iterable): 動画URL（リスト・ジェネレータ・非同期イテレータ）
+            **options: downloadに渡すオプション（quality, format_id等）
+
+        Returns:
+            dict: URLをキーとしたDownloadResult
+        """
+        limiter = self.downloader.limiter
+        semaphore = asyncio.Semaphore(self.max_concurrency) if limiter is None else None
+        prefetch = 0 if options.get('format_id') else self.downloader.prefetch
+        quality = options.get('quality', "720p")
+        results = {}
+        tasks = set()
+        # 先読み済みで開始待ちの(URL, 先読みタスク)。prefetch件を超えると列挙側が待つ
+        ahead = asyncio.Queue(maxsize=max(1, prefetch))
+
+        def on_done(task, url):
+            (limiter or semaphore).release()
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is None:
+                results[url] = task.result()
+
+        async def feed():
+            try:
+                async for url in _aiter(urls):
+                    probe = asyncio.create_task(self.prefetch(url, quality)) if prefetch else None
+                    await ahead.put((url, probe))
+            finally:
+                await ahead.put(None)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                item = await ahead.get()
+                if item is None:
+                    break
+                url, probe = item
+                # 空きができるまで次のタスクを生成しない
+                if limiter is None:
+                    await semaphore.acquire()
+                else:
+                    while not limiter.acquire(blocking=False):
+                        if tasks:
+                            await asyncio.wait(set(tasks), return_when=asyncio.FIRST_COMPLETED)
+                        else:
+                            # 実行中のジョブがない（枠を他で使用中）: asyncio.waitは空の集合を受け付けないため待って再確認
+                            await asyncio.sleep(LIMITER_POLL_INTERVAL)
+                task = asyncio.create_task(self._download_safely(url, options, probe))
+                task.add_done_callback(lambda t, u=url: on_done(t, u))
+                tasks.add(task)
+            await feeder
+            while tasks:
+                await asyncio.wait(set(tasks))
+        except asyncio.CancelledError:
+            # 中断: 列挙・先読み・実行中のジョブを取り消し、子プロセスの終了を待つ
+            pending = [feeder] + list(tasks)
+            while not ahead.empty():
+                item = ahead.get_nowait()
+                if item and item[1] is not None:
+                    pending.append(item[1])
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+        return results
+
+    async def iter_playlist_ids(self, playlist_url, limit=None):
+        """
+        プレイリストの動画IDを列挙され次第返す
+
+        列挙に失敗した場合はエラーを表示し、enumeration_failedをTrueにして終了します。
+
+        Yields:
+            str: 動画ID
+        """
+        self.enumeration_failed = False
+        process = await asyncio.create_subprocess_exec(
+            self.yt_dlp_path, *self.downloader.playlist_args(playlist_url, limit),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            limit=STREAM_LIMIT,
+        )
+        self._processes.add(process)
+        stderr = asyncio.create_task(process.stderr.read())
+        try:
+            async for raw in process.stdout:
+                video_id = raw.decode('utf-8', 'replace').strip()
+                if video_id:
+                    yield video_id
+            await process.wait()
+        except (asyncio.CancelledError, GeneratorExit):
+            await self._terminate(process)
+            raise
+        finally:
+            self._processes.discard(process)
+            details = (await stderr).decode('utf-8', 'replace').strip()
+        if process.returncode != 0:
+            self.enumeration_failed = True
+            print(f"❌ プレイリスト情報の取得エラー: 終了コード {process.returncode}")
+            if details:
+                print(f"エラー詳細: {details}")
+
+    def run(self, coro):
+        """
+        コルーチンを実行（Ctrl-Cで実行中のジョブを取り消す）
+
+        Raises:
+            KeyboardInterrupt: 中断された場合
+        """
+        async def main():
+            task = asyncio.current_task()
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGINT, task.cancel)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows等: asyncio.runの既定の動作に任せる
+            return await coro
+
+        try:
+            return asyncio.run(main())
+        except asyncio.CancelledError:
+            raise KeyboardInterrupt
+
+
+async def _aiter(items):
+    """通常のイテラブルと非同期イテレータを同じように扱う"""
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+実行全体の帯域・接続数の上限
+--max-rate / --max-connectionsの予算を実行中のジョブに分配し、
+ジョブの終了時に空いた分を再分配します
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+
+# 各ジョブに与える最低限の帯域（バイト/秒）。これを割り当てられない場合は空きを待つ
+MIN_RATE = 50 * 1024
+# aria2cの-x/-sの上限
+ARIA2C_MAX_CONNECTIONS = 16
+
+_RATE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*$', re.IGNORECASE)
+_RATE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_rate(text):
+    """
+    帯域の指定をバイト/秒に変換（yt-dlpの--limit-rateと同じ表記）
+
+    Args:
+        text (str): 例: "200M", "1.5M", "500K", "1048576"
+
+    Returns:
+        int: バイト/秒
+
+    Raises:
+        ValueError: 解釈できない場合
+    """
+    match = _RATE_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"帯域の指定を解釈できません: {text}")
+    number, unit = match.groups()
+    return int(float(number) * _RATE_UNITS[unit.upper()])
+
+
+class Lease:
+    """1ジョブに割り当てた帯域・接続数"""
+
+    def __init__(self, rate, connections, adjustable):
+        self.rate = rate                # バイト/秒（上限なしの場合None）
+        self.connections = connections  # 接続数（上限なしの場合None）
+        self.adjustable = adjustable    # 実行中に帯域を変更できるか
+        self._on_change = None
+
+    def bind(self, on_change):
+        """
+        実行中の帯域変更を反映する関数を登録（登録時に現在の値を反映）
+
+        Args:
+            on_change (callable): 新しい帯域（バイト/秒）を受け取る関数
+        """
+        self._on_change = on_change
+        if self.rate is not None:
+            on_change(self.rate)
+
+    def _set_rate(self, rate):
+        self.rate = rate
+        if self._on_change is not None:
+            self._on_change(rate)
+
+
+class BandwidthBudget:
+    """
+    実行全体の帯域・接続数の予算
+
+    実行中に変更できないジョブ（サブプロセス）には開始時に「予算÷並列数」を上限として固定で割り当て、
+    変更できるジョブ（プロセス内実行）には残りを均等に分け、ジョブの開始・終了のたびに再分配します。
+    接続数は開始時に決まるため、常に固定で割り当てます。
+    固定の割り当ては終了まで変わらず、空いた分は次に開始するジョブに使われます。
+    最低限の帯域（MIN_RATE）・接続数1を割り当てられない場合、ジョブは空きができるまで開始を待つため、
+    割り当ての合計がmax_rate・max_connectionsを超えることはありません。
+    """
+
+    def __init__(self, max_rate=None, max_connections=None, slots=None):
+        """
+        Args:
+            max_rate (int): 実行全体の帯域（バイト/秒、Noneで無制限）
+            max_connections (int): 実行全体の接続数（Noneで無制限）
+            slots (callable): 現在の並列数を返す関数
+        """
+        self.max_rate = max_rate
+        self.max_connections = max_connections
+        # 予算がMIN_RATEより小さい場合は予算全体を最低限とする（1ジョブずつ実行）
+        self.min_rate = min(MIN_RATE, max_rate) if max_rate else None
+        self.slots = slots or (lambda: 1)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._active = []
+
+    def _allocate(self, adjustable):
+        """割り当てを作成（最低限を割り当てられない場合None、ロック取得済みで呼び出す）"""
+        share_count = max(self.slots(), len(self._active) + 1)
+
+        connections = None
+        if self.max_connections:
+            free = self.max_connections - sum(lease.connections for lease in self._active)
+            if free < 1:
+                return None
+            connections = max(1, min(self.max_connections // share_count, free))
+
+        rate = None
+        if self.max_rate:
+            fixed_total = sum(lease.rate for lease in self._active if not lease.adjustable)
+            adjustable_count = sum(1 for lease in self._active if lease.adjustable)
+            if adjustable:
+                # 変更可能なジョブ全体で最低限を確保できるか
+                if (self.max_rate - fixed_total) // (adjustable_count + 1) < self.min_rate:
+                    return None
+                rate = 0  # 直後の再分配で決まる
+            else:
+                # 変更可能なジョブの最低限を残した上での空き
+                free = self.max_rate - fixed_total - adjustable_count * self.min_rate
+                if free < self.min_rate:
+                    return None
+                rate = max(self.min_rate, min(self.max_rate // share_count, free))
+
+        lease = Lease(rate, connections, adjustable)
+        self._active.append(lease)
+        self._rebalance()
+        return lease
+
+    def try_acquire(self, adjustable=False):
+        """
+        割り当てを取得（待たない）
+
+        Returns:
+            Lease: 割り当て（空きがない場合None）
+        """
+        with self._lock:
+            return self._allocate(adjustable)
+
+    def acquire(self, adjustable=False):
+        """
+        割り当てを取得（空きがない場合は他のジョブの終了を待つ）
+
+        Returns:
+            Lease: 割り当て
+        """
+        with self._released:
+            while True:
+                lease = self._allocate(adjustable)
+                if lease is not None:
+                    return lease
+                self._released.wait()
+
+    def release(self, lease):
+        """割り当てを返却し、待っているジョブと変更可能なジョブに再分配"""
+        with self._released:
+            self._active.remove(lease)
+            self._rebalance()
+            self._released.notify_all()
+
+    def _rebalance(self):
+        """固定割り当ての残りを変更可能なジョブで均等に分ける"""
+        if not self.max_rate:
+            return
+        adjustable = [lease for lease in self._active if lease.adjustable]
+        if not adjustable:
+            return
+        fixed_total = sum(lease.rate for lease in self._active if not lease.adjustable)
+        share = (self.max_rate - fixed_total) // len(adjustable)
+        for lease in adjustable:
+            if lease.rate != share:
+                lease._set_rate(share)
+
+    @contextmanager
+    def lease(self, adjustable=False):
+        """
+        ジョブの実行中、帯域・接続数を割り当てる（空きがない場合は開始を待つ）
+
+        Args:
+            adjustable (bool): 実行中に帯域を変更できるジョブか
+
+        Yields:
+            Lease: 割り当て
+        """
+        lease = self.acquire(adjustable)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def allocated(self):
+        """
+        現在の割り当て合計
+
+        Returns:
+            tuple: (帯域の合計, 接続数の合計)
+        """
+        with self._lock:
+            return (sum(lease.rate or 0 for lease in self._active),
+                    sum(lease.connections or 0 for lease in self._active))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音声の保存形式ごとのCPU時間のベンチマーク
+MP3への再エンコードと、m4a/opusへの無変換の格納（ストリームコピー）で、
+音声1時間あたりに消費するCPU時間（ffmpegのユーザー+システム時間）を比較します
+
+入力を省略した場合は、ffmpegで生成した音声（YouTubeの音声と同じOpus/AAC）を使用します。
+実際にダウンロードした音声（yt-dlp -f bestaudio で保存したファイル）も指定できます。
+CPU時間の計測にresourceモジュールを使用するため、macOS/Linuxのみ対応です。
+
+使用例:
+  python benchmarks/bench_audio.py --duration 600
+  python benchmarks/bench_audio.py --input "song.webm" --input "song.m4a" --json audio.json
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# 生成する音声（YouTubeが配信する主な音声の形式）
+GENERATED_SOURCES = [
+    ('opus', 'webm', ['-c:a', 'libopus', '-b:a', '160k']),
+    ('aac', 'm4a', ['-c:a', 'aac', '-b:a', '128k']),
+]
+# 無変換で格納する場合のコンテナ（youtube_to_mp3.py --audio-format best と同じ対応）
+COPY_EXTENSIONS = {'opus': 'opus', 'aac': 'm4a'}
+
+
+def children_cpu_time():
+    """終了した子プロセスのCPU時間の合計（秒）"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_ffmpeg(ffmpeg, args):
+    """
+    ffmpegを実行し、消費したCPU時間を返す
+
+    Returns:
+        float: CPU時間（秒）
+    """
+    before = children_cpu_time()
+    subprocess.run([ffmpeg, '-y', '-loglevel', 'error', *args], check=True)
+    return children_cpu_time() - before
+
+
+def probe(ffprobe, path):
+    """
+    音声の長さ（秒）とコーデック名を取得
+
+    Returns:
+        tuple: (長さ, コーデック名)
+    """
+    result = subprocess.run([ffprobe, '-v', 'error', '-select_streams', 'a:0',
+                             '-show_entries', 'stream=codec_name:format=duration',
+                             '-of', 'json', str(path)], capture_output=True, text=True, check=True)
+    info = json.loads(result.stdout)
+    return float(info['format']['duration']), info['streams'][0]['codec_name']
+
+
+def generate_sources(ffmpeg, tmp, duration):
+    """ベンチマーク用の音声を生成（生成のCPU時間は計測に含めない）"""
+    sources = []
+    for codec, ext, encode in GENERATED_SOURCES:
+        path = Path(tmp) / f"source_{codec}.{ext}"
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'lavfi', '-i',
+                        f'anoisesrc=duration={duration}:color=pink:amplitude=0.3', '-ac', '2',
+                        *encode, str(path)], check=True)
+        sources.append(path)
+    return sources
+
+
+def bench_source(ffmpeg, ffprobe, source, tmp, quality, repeat):
+    """
+    1つの音声をMP3に再エンコードした場合と無変換で格納した場合のCPU時間を計測
+
+    Returns:
+        dict: 計測結果（CPU時間は繰り返しの最小値）
+    """
+    duration, codec = probe(ffprobe, source)
+    copy_ext = COPY_EXTENSIONS.get(codec, 'mka')
+    encode_args = ['-i', str(source), '-vn', '-map', '0:a:0', '-c:a', 'libmp3lame', '-b:a', f'{quality}k',
+                   '-id3v2_version', '3', str(Path(tmp) / 'out.mp3')]
+    copy_args = ['-i', str(source), '-vn', '-map', '0:a:0', '-c:a', 'copy', str(Path(tmp) / f'out.{copy_ext}')]
+
+    encode_cpu = min(run_ffmpeg(ffmpeg, encode_args) for _ in range(repeat))
+    copy_cpu = min(run_ffmpeg(ffmpeg, copy_args) for _ in range(repeat))
+    hours = duration / 3600
+    return {
+        'source': source.name,
+        'codec': codec,
+        'duration_s': round(duration, 2),
+        'mp3_cpu_s': round(encode_cpu, 4),
+        'copy_cpu_s': round(copy_cpu, 4),
+        'mp3_cpu_s_per_hour': round(encode_cpu / hours, 2),
+        'copy_cpu_s_per_hour': round(copy_cpu / hours, 2),
+        'saved_cpu_s_per_hour': round((encode_cpu - copy_cpu) / hours, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音声の保存形式ごとのCPU時間のベンチマーク")
+    parser.add_argument('--input', action='append', type=Path,
+                        help='計測に使用する音声ファイル（複数指定可、省略時は生成）')
+    parser.add_argument('--duration', type=int, default=600, help='生成する音声の長さ（秒, デフォルト: 600）')
+    parser.add_argument('--quality', default='320', help='MP3の音質（kbps, デフォルト: 320）')
+    parser.add_argument('--repeat', type=int, default=3, help='繰り返し回数 (デフォルト: 3)')
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='ffmpegのパス')
+    parser.add_argument('--ffprobe', default='ffprobe', help='ffprobeのパス')
+    parser.add_argument('--json', help='結果をJSONで保存するファイル')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = args.input or generate_sources(args.ffmpeg, tmp, args.duration)
+        for source in sources:
+            print(f"計測中: {source.name}")
+            sys.stdout.flush()
+            results.append(bench_source(args.ffmpeg, args.ffprobe, source, tmp, args.quality, args.repeat))
+
+    print("-" * 78)
+    print(f"{'source':24} {'codec':>6} {'audio(s)':>9} {'mp3 cpu/h':>10} {'copy cpu/h':>11} {'saved cpu/h':>12}")
+    for r in results:
+        print(f"{r['source'][:24]:24} {r['codec']:>6} {r['duration_s']:9.1f} {r['mp3_cpu_s_per_hour']:10.1f} "
+              f"{r['copy_cpu_s_per_hour']:11.1f} {r['saved_cpu_s_per_hour']:12.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
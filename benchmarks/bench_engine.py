@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yt-dlp実行エンジンのベンチマーク
+サブプロセス版とプロセス内版で、動画1本あたりのオーバーヘッドを比較します
+
+実際のダウンロードは行わず（--simulate）、起動・エクストラクタ初期化・
+メタデータ抽出までの時間を計測します。ネットワーク接続が必要です。
+
+使用例:
+  python benchmarks/bench_engine.py "URL1" "URL2" "URL3" --repeat 2
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from yt_dlp_engine import ENGINE_CHOICES, create_engine
+
+DEFAULT_URLS = [
+    "https://www.youtube.com/watch?v=jNQXAC9IVRw",
+]
+
+
+def bench_backend(backend, urls, repeat, yt_dlp_path):
+    """
+    1つのバックエンドで全URLを順に処理し、1本ごとの所要時間を計測
+
+    Returns:
+        dict: 計測結果
+    """
+    engine = create_engine(backend, yt_dlp_path)
+    timings = []
+    failures = 0
+
+    for _ in range(repeat):
+        for url in urls:
+            start = time.perf_counter()
+            result = engine.run(['--simulate', '--no-playlist', '--quiet', url])
+            timings.append(time.perf_counter() - start)
+            if not result.ok:
+                failures += 1
+
+    # 初回（エクストラクタ初期化を含む）と2回目以降を分けて集計
+    warm = timings[1:] or timings
+    return {
+        'backend': backend,
+        'videos': len(timings),
+        'failures': failures,
+        'first_s': round(timings[0], 4),
+        'mean_s': round(statistics.mean(warm), 4),
+        'median_s': round(statistics.median(warm), 4),
+        'total_s': round(sum(timings), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yt-dlp実行エンジンのベンチマーク")
+    parser.add_argument('urls', nargs='*', default=DEFAULT_URLS, help='計測に使用する動画URL')
+    parser.add_argument('--repeat', type=int, default=3, help='URL一覧を繰り返す回数 (デフォルト: 3)')
+    parser.add_argument('--backends', nargs='+', default=ENGINE_CHOICES, choices=ENGINE_CHOICES,
+                        help='計測するバックエンド')
+    parser.add_argument('--yt-dlp-path', default='yt-dlp', help='サブプロセス版で使用するyt-dlpのパス')
+    parser.add_argument('--json', help='結果をJSONで保存するファイル')
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        print(f"計測中: {backend} ({len(args.urls) * args.repeat}本)")
+        results.append(bench_backend(backend, args.urls, args.repeat, args.yt_dlp_path))
+
+    print("-" * 70)
+    print(f"{'backend':12} {'videos':>6} {'fail':>5} {'first(s)':>9} {'mean(s)':>9} {'median(s)':>10} {'total(s)':>9}")
+    for r in results:
+        print(f"{r['backend']:12} {r['videos']:6d} {r['failures']:5d} {r['first_s']:9.3f} "
+              f"{r['mean_s']:9.3f} {r['median_s']:10.3f} {r['total_s']:9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
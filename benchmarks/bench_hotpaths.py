@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python側の処理のマイクロベンチマーク
+生成データのみを使用し、ネットワークやyt-dlpなしで実行できます
+
+対象:
+  urls     : get_video_id
+  formats  : parse_formats_output, FormatModel, select_best_format, select_best_video_format
+  index    : ダウンロード済みインデックスの読み込み・書き込み・検索（1万〜100万件）
+  listing  : list_downloads（大きなディレクトリツリーの走査・インデックスからの一覧）
+
+使用例:
+  python benchmarks/bench_hotpaths.py --json bench.json
+  python benchmarks/bench_hotpaths.py --full --json bench.json --compare previous.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import fixtures
+from benchmarks.harness import BenchRun, compare, measure
+from download_index import DownloadIndex, make_cache_key
+from format_model import FormatModel
+from youtube_video_downloader import YouTubeVideoDownloader
+
+GROUPS = ['urls', 'formats', 'index', 'listing']
+
+
+def new_downloader(output_dir):
+    return YouTubeVideoDownloader(output_dir=output_dir, enable_cache=False)
+
+
+def bench_urls(run, downloader, scale):
+    urls = fixtures.make_urls(10000)
+
+    def extract_all():
+        for url in urls:
+            downloader.get_video_id(url)
+
+    run.add('get_video_id', measure(extract_all, repeat=5), urls=len(urls))
+
+
+def bench_formats(run, downloader, scale):
+    for count in (50, 300, 1000):
+        text = fixtures.make_formats_text(count)
+        info = fixtures.make_info(count)
+        legacy = downloader.parse_formats_output(text)
+        model = FormatModel.from_info(info)
+        legacy_videos = {k: v for k, v in legacy.items() if v['is_video']}
+
+        run.add('parse_formats_output', measure(lambda: downloader.parse_formats_output(text), repeat=5),
+                formats=count)
+        run.add('FormatModel.from_info', measure(lambda: FormatModel.from_info(info), repeat=5),
+                formats=count)
+        run.add('select_best_format[legacy]',
+                measure(lambda: downloader.select_best_format("720p", legacy), repeat=5), formats=count)
+        run.add('select_best_format[model]',
+                measure(lambda: downloader.select_best_format("720p", model), number=1000, repeat=5),
+                formats=count)
+        run.add('select_best_video_format',
+                measure(lambda: downloader.select_best_video_format(720, legacy_videos), repeat=5),
+                formats=count)
+
+
+def _fill_index(index, count):
+    """インデックスに記録をまとめて投入"""
+    conn = index._connect()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO downloads (cache_key, video_id, quality, filename, timestamp, filesize, format_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((make_cache_key(f"vid{i:08d}", "720p"), f"vid{i:08d}", "720p", f"video {i}.mp4",
+          float(i), 1000 + i, "137+140") for i in range(count)))
+    conn.execute("COMMIT")
+
+
+def bench_index(run, downloader, scale):
+    sizes = [10000, 100000] + ([1000000] if scale == 'full' else [])
+    rng = random.Random(0)
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "index.sqlite3"
+            index = DownloadIndex(db_path)
+            start = time.perf_counter()
+            _fill_index(index, count)
+            fill = time.perf_counter() - start
+            run.add('index.bulk_fill', {'min_s': fill, 'median_s': fill, 'mean_s': fill, 'number': 1, 'repeat': 1},
+                    entries=count)
+            index.close()
+
+            def open_index():
+                opened = DownloadIndex(db_path)
+                len(opened)
+                opened.close()
+
+            run.add('index.load', measure(open_index, repeat=5), entries=count)
+
+            counter = iter(range(10 ** 9))
+            run.add('index.save', measure(
+                lambda: index.put(make_cache_key(f"new{next(counter)}", "720p"), "new.mp4", "720p"),
+                number=200, repeat=5), entries=count)
+
+            keys = [make_cache_key(f"vid{rng.randrange(count):08d}", "720p") for _ in range(1000)]
+            key_iter = iter(keys * 10)
+            run.add('index.lookup', measure(lambda: index.get(next(key_iter)), number=1000, repeat=5),
+                    entries=count)
+            index.close()
+
+
+def bench_listing(run, downloader, scale):
+    sizes = [10000] + ([100000] if scale == 'full' else [])
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "tree"
+            fixtures.make_tree(root, count)
+            lister = new_downloader(root)
+
+            def list_all():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    lister.list_downloads()
+
+            run.add('list_downloads', measure(list_all, repeat=3), files=count)
+
+            # インデックスから一覧（走査なし、記録ごとにstat）
+            indexed = YouTubeVideoDownloader(output_dir=root, enable_cache=True)
+            for path in sorted(root.rglob("*.mp4")):
+                i = int(path.stem.split()[-1])
+                indexed.download_index.put(make_cache_key(f"vid{i:08d}", "720p"), str(path.relative_to(root)),
+                                           "720p", video_id=f"vid{i:08d}", filesize=i)
+
+            def list_indexed():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    indexed.list_downloads(sort='size', reverse=True, page_size=50)
+
+            run.add('list_downloads.index', measure(list_indexed, repeat=3), files=count)
+            indexed.download_index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python側の処理のマイクロベンチマーク")
+    parser.add_argument('--only', nargs='+', choices=GROUPS, help='実行するグループ')
+    parser.add_argument('--full', action='store_true', help='大規模（100万件インデックス・10万ファイル）も計測')
+    parser.add_argument('--json', help='結果をJSONで保存するファイル')
+    parser.add_argument('--compare', help='比較対象の前回結果（JSON）')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='前回比でこの倍率を超えて遅くなったら劣化とみなす (デフォルト: 1.2)')
+    args = parser.parse_args()
+
+    scale = 'full' if args.full else 'default'
+    run = BenchRun()
+    run.metadata['scale'] = scale
+    benches = {'urls': bench_urls, 'formats': bench_formats, 'index': bench_index, 'listing': bench_listing}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = new_downloader(tmp)
+        for group in args.only or GROUPS:
+            print(f"== {group} ==")
+            benches[group](run, downloader, scale)
+
+    if args.json:
+        run.write(args.json)
+        print(f"結果を保存しました: {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, run.to_dict(), args.threshold)
+        if regressions:
+            print(f"⚠️  前回より遅くなった項目 ({len(regressions)}件):")
+            for name, params, old, new, ratio in regressions:
+                print(f"  {name} {params}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms (x{ratio:.2f})")
+            sys.exit(1)
+        print("✅ 劣化はありません")
+
+
+if __name__ == "__main__":
+    main()
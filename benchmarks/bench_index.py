@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みインデックスのベンチマーク
+旧形式（追加のたびにJSON全体を書き直す）とSQLiteインデックスを比較します
+
+使用例:
+  python benchmarks/bench_index.py --entries 100000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from download_index import DownloadIndex, make_cache_key
+
+
+def legacy_entries(n):
+    return {
+        make_cache_key(f"vid{i:08d}", "720p"): {
+            'filename': f"video {i}.mp4", 'timestamp': float(i), 'quality': "720p"
+        } for i in range(n)
+    }
+
+
+def bench_legacy(tmp, n, samples):
+    """旧形式: n件の状態から1件追加するたびにJSON全体を書き直す"""
+    cache = legacy_entries(n)
+    path = Path(tmp) / ".download_cache.json"
+
+    start = time.perf_counter()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    initial_save = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    load = time.perf_counter() - start
+
+    adds = []
+    for i in range(samples):
+        start = time.perf_counter()
+        cache[make_cache_key(f"new{i}", "720p")] = {'filename': "x.mp4", 'timestamp': 0.0, 'quality': "720p"}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        adds.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, n, max(n // samples, 1)):
+        _ = make_cache_key(f"vid{i:08d}", "720p") in cache
+    lookup = (time.perf_counter() - start) / samples
+
+    return {
+        'backend': 'json',
+        'entries': n,
+        'bulk_write_s': round(initial_save, 4),
+        'open_s': round(load, 4),
+        'add_mean_ms': round(statistics.mean(adds) * 1000, 3),
+        'lookup_mean_us': round(lookup * 1e6, 3),
+        'file_bytes': path.stat().st_size,
+    }
+
+
+def bench_sqlite(tmp, n, samples):
+    """SQLite: n件の状態から1件ずつ追記"""
+    legacy = Path(tmp) / ".download_cache.json"
+    with open(legacy, 'w', encoding='utf-8') as f:
+        json.dump(legacy_entries(n), f)
+    db_path = Path(tmp) / "index.sqlite3"
+
+    # 旧形式からの移行時間を初回書き込みとして計測
+    start = time.perf_counter()
+    index = DownloadIndex(db_path, legacy_json=legacy)
+    migrate = time.perf_counter() - start
+    index.close()
+
+    start = time.perf_counter()
+    index = DownloadIndex(db_path)
+    open_time = time.perf_counter() - start
+
+    adds = []
+    for i in range(samples):
+        start = time.perf_counter()
+        index.put(make_cache_key(f"new{i}", "720p"), "x.mp4", "720p", video_id=f"new{i}")
+        adds.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, n, max(n // samples, 1)):
+        index.get(make_cache_key(f"vid{i:08d}", "720p"))
+    lookup = (time.perf_counter() - start) / samples
+
+    return {
+        'backend': 'sqlite',
+        'entries': n,
+        'bulk_write_s': round(migrate, 4),
+        'open_s': round(open_time, 4),
+        'add_mean_ms': round(statistics.mean(adds) * 1000, 3),
+        'lookup_mean_us': round(lookup * 1e6, 3),
+        'file_bytes': db_path.stat().st_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ダウンロード済みインデックスのベンチマーク")
+    parser.add_argument('--entries', type=int, default=100000, help='既存の記録件数 (デフォルト: 100000)')
+    parser.add_argument('--samples', type=int, default=20, help='追加・検索の計測回数 (デフォルト: 20)')
+    parser.add_argument('--json', help='結果をJSONで保存するファイル')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results.append(bench_legacy(tmp, args.entries, args.samples))
+    with tempfile.TemporaryDirectory() as tmp:
+        results.append(bench_sqlite(tmp, args.entries, args.samples))
+
+    print(f"{'backend':8} {'entries':>8} {'bulk(s)':>8} {'open(s)':>8} {'add(ms)':>9} {'lookup(us)':>11} {'bytes':>12}")
+    for r in results:
+        print(f"{r['backend']:8} {r['entries']:8d} {r['bulk_write_s']:8.3f} {r['open_s']:8.3f} "
+              f"{r['add_mean_ms']:9.3f} {r['lookup_mean_us']:11.3f} {r['file_bytes']:12d}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の生成データ
+ネットワークを使わずに、形式一覧・URL・インデックス・ディレクトリツリーを生成します
+"""
+
+import random
+
+HEIGHTS = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+VIDEO_CODECS = ['avc1.4d401f', 'vp9', 'av01.0.08M.08']
+AUDIO_CODECS = [('m4a', 'mp4a.40.2'), ('webm', 'opus')]
+
+
+def make_format_dicts(count, seed=0):
+    """
+    yt-dlpの形式辞書（info['formats']）を生成
+
+    Args:
+        count (int): 形式の数（うち約1/5が音声のみ）
+    """
+    rng = random.Random(seed)
+    formats = [{'format_id': 'sb0', 'ext': 'mhtml', 'vcodec': 'none', 'acodec': 'none', 'height': 90}]
+    for i in range(count):
+        if i % 5 == 0:
+            ext, acodec = rng.choice(AUDIO_CODECS)
+            formats.append({
+                'format_id': f"a{i}", 'ext': ext, 'protocol': 'https',
+                'vcodec': 'none', 'acodec': acodec, 'abr': rng.uniform(32, 256),
+                'tbr': rng.uniform(32, 256), 'filesize': rng.randint(10 ** 5, 10 ** 8),
+            })
+        else:
+            height = rng.choice(HEIGHTS)
+            formats.append({
+                'format_id': f"v{i}", 'ext': rng.choice(['mp4', 'webm']), 'protocol': 'https',
+                'vcodec': rng.choice(VIDEO_CODECS), 'acodec': 'none',
+                'width': height * 16 // 9, 'height': height, 'fps': rng.choice([24, 30, 60]),
+                'tbr': rng.uniform(50, 20000),
+                'filesize': rng.choice([None, rng.randint(10 ** 6, 10 ** 9)]),
+            })
+    return formats
+
+
+def make_info(count, seed=0):
+    """yt-dlpの情報辞書を生成"""
+    return {'id': 'benchvideo1', 'title': 'benchmark', 'formats': make_format_dicts(count, seed)}
+
+
+def make_formats_text(count, seed=0):
+    """yt-dlp --list-formats の表形式出力を生成"""
+    lines = [
+        "[info] Available formats for benchvideo1:",
+        "ID      EXT  RESOLUTION FPS │   FILESIZE   TBR PROTO │ VCODEC          VBR ACODEC      ABR",
+        "─" * 90,
+    ]
+    for fmt in make_format_dicts(count, seed)[1:]:
+        size = f"{(fmt.get('filesize') or 0) / 2 ** 20:.2f}MiB" if fmt.get('filesize') else "~"
+        if fmt['vcodec'] == 'none':
+            lines.append(f"{fmt['format_id']:7} {fmt['ext']:4} audio only     │ {size:>10} {fmt['tbr']:4.0f}k "
+                         f"https │ audio only          {fmt['acodec']:11} {fmt['tbr']:4.0f}k")
+        else:
+            resolution = f"{fmt['width']}x{fmt['height']}"
+            lines.append(f"{fmt['format_id']:7} {fmt['ext']:4} {resolution:10} {fmt['fps']:3} │ {size:>10} "
+                         f"{fmt['tbr']:4.0f}k https │ {fmt['vcodec']:15} {fmt['tbr']:4.0f}k video only")
+    return "\n".join(lines)
+
+
+def make_urls(count, seed=0):
+    """様々な形式のYouTube URLを生成"""
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+    urls = []
+    for i in range(count):
+        video_id = ''.join(rng.choice(alphabet) for _ in range(11))
+        kind = i % 3
+        if kind == 0:
+            urls.append(f"https://www.youtube.com/watch?v={video_id}")
+        elif kind == 1:
+            urls.append(f"https://www.youtube.com/watch?v={video_id}&list=PL{video_id}&index={i}")
+        else:
+            urls.append(f"https://youtu.be/{video_id}?t={i}")
+    return urls
+
+
+def make_tree(root, files, per_dir=200, extensions=('mp4', 'webm', 'mkv', 'mp3', 'part')):
+    """
+    ダウンロード済みディレクトリを模したツリーを生成（中身は空ファイル）
+
+    Args:
+        root (Path): 作成先
+        files (int): ファイル数
+        per_dir (int): 1ディレクトリあたりのファイル数
+    """
+    for i in range(files):
+        directory = root / f"playlist{i // per_dir:04d}"
+        if i % per_dir == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"video {i:07d}.{extensions[i % len(extensions)]}").touch()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク共通処理
+計測・結果のJSON保存・前回結果との比較を行います
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def measure(func, number=1, repeat=5):
+    """
+    関数の実行時間を計測
+
+    Args:
+        func (callable): 計測する関数（引数なし）
+        number (int): 1回の計測で呼び出す回数
+        repeat (int): 計測の繰り返し回数
+
+    Returns:
+        dict: 1呼び出しあたりの秒数（min, median, mean）
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'min_s': min(samples),
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.mean(samples),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+class BenchRun:
+    """1回分のベンチマーク結果"""
+
+    def __init__(self):
+        self.results = []
+        self.metadata = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        }
+
+    def add(self, name, stats, **params):
+        """
+        結果を追加して表示
+
+        Args:
+            name (str): ベンチマーク名
+            stats (dict): measureの結果
+            **params: 規模などのパラメータ
+        """
+        entry = {'name': name, 'params': params, **stats}
+        self.results.append(entry)
+        label = name + (' ' + ' '.join(f"{k}={v}" for k, v in params.items()) if params else '')
+        print(f"{label:50} {stats['median_s'] * 1000:12.4f} ms (min {stats['min_s'] * 1000:.4f})")
+        sys.stdout.flush()
+
+    def to_dict(self):
+        return {'metadata': self.metadata, 'results': self.results}
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def result_key(entry):
+    """比較用のキー（名前+パラメータ）"""
+    return (entry['name'], json.dumps(entry.get('params', {}), sort_keys=True))
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    前回の結果と比較し、遅くなったものを返す
+
+    Args:
+        baseline (dict): 前回のBenchRun.to_dict()
+        current (dict): 今回のBenchRun.to_dict()
+        threshold (float): 最小値の比がこれを超えたら劣化とみなす（最小値は揺らぎが小さいため）
+
+    Returns:
+        list: (名前, パラメータ, 前回秒数, 今回秒数, 比)のリスト
+    """
+    previous = {result_key(e): e for e in baseline.get('results', [])}
+    regressions = []
+    for entry in current.get('results', []):
+        old = previous.get(result_key(entry))
+        if not old or old['min_s'] <= 0:
+            continue
+        ratio = entry['min_s'] / old['min_s']
+        if ratio > threshold:
+            regressions.append((entry['name'], entry.get('params', {}), old['min_s'], entry['min_s'], ratio))
+    return regressions
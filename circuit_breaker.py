@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+403多発時のサーキットブレーカー
+直近のジョブの403/429率が閾値を超えたら実行全体で新しいジョブの開始を止め、
+待機後に1本だけ試験的に実行し、成功すれば段階的に並列数を戻します
+"""
+
+import threading
+import time
+from collections import deque
+
+from concurrency import is_throttled
+
+# 状態
+CLOSED = 'closed'        # 通常
+OPEN = 'open'            # 新しいジョブの開始を停止中
+HALF_OPEN = 'half_open'  # 試験的に1本だけ実行中
+RECOVERING = 'recovering'  # 段階的に並列数を戻している
+
+
+class Ticket:
+    """開始を許可したジョブ（結果の報告に使用）"""
+
+    def __init__(self, generation, canary):
+        self.generation = generation  # 開始時の遮断回数（遮断前に始まったジョブの結果を区別）
+        self.canary = canary          # 試験的に実行するジョブか
+
+
+class CircuitBreaker:
+    """
+    実行全体で共有するサーキットブレーカー
+
+    ジョブは開始前にenter（asyncioではtry_enter）で許可を得て、終了時にexitで結果を報告します。
+    window秒以内に終わったジョブのうちmin_throttled件以上かつthreshold以上の割合が403/429なら遮断し、
+    cooldown秒後に1本だけ試験的に開始します。試験が403/429なら待ち時間を倍にして再び遮断し、
+    成功すれば同時に開始できる数を2から1つずつ増やし、full件に達したら通常に戻します。
+    """
+
+    def __init__(self, full=3, window=60.0, threshold=0.3, min_throttled=3, cooldown=30.0, max_cooldown=300.0,
+                 clock=time.monotonic):
+        """
+        Args:
+            full (int): 通常時の並列数（段階的な再開の到達点）
+            window (float): 403/429率を計算する期間（秒）
+            threshold (float): 遮断する403/429率
+            min_throttled (int): 遮断に必要な403/429の件数
+            cooldown (float): 遮断してから試験的に開始するまでの時間（秒）
+            max_cooldown (float): 試験が失敗し続けた場合の待ち時間の上限（秒）
+            clock (callable): 時刻の取得関数
+        """
+        self.full = max(1, full)
+        self.window = window
+        self.threshold = threshold
+        self.min_throttled = min_throttled
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._state = CLOSED
+        self._recent = deque()  # (終了時刻, 403/429か)
+        self._generation = 0
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._opened_at = None
+        self._canary_running = False
+        self._running = 0
+        self._allowed = self.full
+
+        self.trips = 0             # 遮断した回数
+        self.canary_failures = 0   # 試験が403/429で失敗した回数
+        self.open_seconds = 0.0    # 新しいジョブの開始を止めていた時間の合計（秒）
+
+    @property
+    def state(self):
+        return self._state
+
+    def try_enter(self):
+        """
+        新しいジョブの開始を試みる（待たない）
+
+        Returns:
+            Ticket: 許可した場合（開始できない場合None）
+        """
+        with self._cond:
+            now = self.clock()
+            if self._state == OPEN and now >= self._open_until:
+                self._state = HALF_OPEN
+                print("🐤 403の多発による停止を解除し、1本だけ試験的にダウンロードします")
+            if self._state == OPEN:
+                return None
+            if self._state == HALF_OPEN:
+                if self._canary_running:
+                    return None
+                self._canary_running = True
+                self._running += 1
+                return Ticket(self._generation, canary=True)
+            if self._state == RECOVERING and self._running >= self._allowed:
+                return None
+            self._running += 1
+            return Ticket(self._generation, canary=False)
+
+    def wait_time(self):
+        """
+        開始できるようになるまでの目安（秒）
+
+        遮断中は試験開始までの残り時間、それ以外は実行中のジョブの終了を待つための短い間隔を返します。
+        """
+        with self._cond:
+            return self._wait_time()
+
+    def _wait_time(self):
+        if self._state == OPEN:
+            return max(0.0, self._open_until - self.clock())
+        return 1.0
+
+    def enter(self):
+        """
+        新しいジョブの開始が許可されるまで待つ
+
+        Returns:
+            Ticket: 許可
+        """
+        while True:
+            ticket = self.try_enter()
+            if ticket is not None:
+                return ticket
+            with self._cond:
+                self._cond.wait(timeout=max(0.05, self._wait_time()))
+
+    def exit(self, ticket, result):
+        """
+        ジョブの結果を報告
+
+        Args:
+            ticket (Ticket): enter/try_enterで得た許可
+            result (DownloadResult): ダウンロード結果
+        """
+        with self._cond:
+            self._running -= 1
+            now = self.clock()
+            counted = not (result.skipped or result.interrupted)
+            throttled = not result and is_throttled(result.error_output)
+
+            if ticket.canary:
+                self._canary_running = False
+                if counted:
+                    self._finish_canary(now, throttled)
+            elif counted and ticket.generation == self._generation:
+                self._recent.append((now, throttled))
+                if self._state == RECOVERING:
+                    if throttled:
+                        self._trip(now, reason="段階的な再開中に403/429")
+                    else:
+                        self._allowed += 1
+                        if self._allowed >= self.full:
+                            self._state = CLOSED
+                            print("✅ 403の多発から回復し、通常の並列数に戻しました")
+                elif self._state == CLOSED:
+                    self._check(now)
+            self._cond.notify_all()
+
+    def _check(self, now):
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+        throttled = sum(1 for _, t in self._recent if t)
+        if throttled >= self.min_throttled and throttled / len(self._recent) >= self.threshold:
+            self._cooldown = self.base_cooldown
+            self._trip(now, reason=f"直近{len(self._recent)}件中{throttled}件が403/429")
+
+    def _trip(self, now, reason):
+        if self._opened_at is None:
+            self._opened_at = now
+        self._state = OPEN
+        self._open_until = now + self._cooldown
+        self._generation += 1
+        self._recent.clear()
+        self.trips += 1
+        print(f"🧯 {reason}のため、新しいダウンロードの開始を{self._cooldown:.0f}秒停止します")
+
+    def _finish_canary(self, now, throttled):
+        if throttled:
+            self.canary_failures += 1
+            self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+            self._state = OPEN
+            self._open_until = now + self._cooldown
+            self._generation += 1
+            print(f"🧯 試験ダウンロードも403/429のため、{self._cooldown:.0f}秒停止します")
+            return
+        self.open_seconds += now - self._opened_at
+        self._opened_at = None
+        self._allowed = 2
+        if self._allowed >= self.full:
+            self._state = CLOSED
+            print("✅ 試験ダウンロードに成功し、通常の並列数に戻しました")
+        else:
+            self._state = RECOVERING
+            print(f"✅ 試験ダウンロードに成功し、段階的に再開します（{self._allowed}/{self.full}個同時）")
+
+    def stats(self):
+        """
+        集計
+
+        Returns:
+            dict: trips（遮断回数）・canary_failures（試験の失敗回数）・open_seconds（停止時間の合計、秒）
+        """
+        with self._cond:
+            open_seconds = self.open_seconds
+            if self._opened_at is not None:
+                open_seconds += self.clock() - self._opened_at
+            return {'trips': self.trips, 'canary_failures': self.canary_failures,
+                    'open_seconds': open_seconds}
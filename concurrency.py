@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+並列数の自動調整
+ダウンロードの合計スループット・エラー率・403率・CPU負荷を一定間隔で評価し、
+AIMD（加算増加・乗算減少）で同時実行数を増減します
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ADAPTIVE_LOG_FILENAME = ".adaptive_concurrency.jsonl"
+DEFAULT_MAX_LIMIT = 16
+
+# スロットリング（アクセス制限）とみなすyt-dlpの出力
+THROTTLE_MARKERS = ('HTTP Error 403', '403: Forbidden', 'HTTP Error 429')
+
+
+def is_throttled(output):
+    """yt-dlpの出力がスロットリングによる失敗か判定"""
+    return bool(output) and any(marker in output for marker in THROTTLE_MARKERS)
+
+
+def cpu_load():
+    """
+    CPU負荷（1分間のロードアベレージ÷コア数）
+
+    Returns:
+        float: 負荷（取得できない環境ではNone）
+    """
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    同時実行数を自動調整するリミッター
+
+    ジョブはacquire/releaseで実行枠を確保し、終了時にrecord_resultで結果を報告します。
+    interval秒ごと（かつmin_samples件以上の完了があれば）に次の順で判定します:
+      - 403/429率・エラー率・CPU負荷のいずれかが閾値超え: 同時実行数をdecrease_factor倍に減らす
+      - 前回の増加後にスループットが落ちた: 1つ戻す
+      - 枠を使い切っていてスループットが落ちていない: 1つ増やす
+      - それ以外: 維持
+    判定はすべてlog_fileにJSON Linesで記録します。
+    """
+
+    def __init__(self, initial=3, min_limit=1, max_limit=DEFAULT_MAX_LIMIT, interval=30.0, min_samples=2,
+                 error_threshold=0.2, throttle_threshold=0.05, cpu_threshold=0.9, decrease_factor=0.5,
+                 throughput_tolerance=0.1, log_file=None, load_func=cpu_load, clock=time.monotonic):
+        """
+        Args:
+            initial (int): 開始時の同時実行数
+            min_limit (int): 同時実行数の下限
+            max_limit (int): 同時実行数の上限
+            interval (float): 評価間隔（秒）
+            min_samples (int): 評価に必要な完了ジョブ数
+            error_threshold (float): 減少させるエラー率
+            throttle_threshold (float): 減少させる403/429率
+            cpu_threshold (float): 減少させるCPU負荷（ロードアベレージ÷コア数）
+            decrease_factor (float): 減少時の倍率
+            throughput_tolerance (float): スループット低下とみなす割合
+            log_file (str|Path): 判定の記録先（省略時は記録しない）
+            load_func (callable): CPU負荷の取得関数
+            clock (callable): 時刻の取得関数
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.interval = interval
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.throttle_threshold = throttle_threshold
+        self.cpu_threshold = cpu_threshold
+        self.decrease_factor = decrease_factor
+        self.throughput_tolerance = throughput_tolerance
+        self.log_file = log_file
+        self.load_func = load_func
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._limit = min(max(initial, self.min_limit), self.max_limit)
+        self._active = 0
+        self._last_action = None
+        self._last_throughput = None
+        self._reset_window(clock())
+        self.decisions = []
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._completed = 0
+        self._failed = 0
+        self._throttled = 0
+        self._bytes = 0
+        self._peak_active = self._active
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def active(self):
+        return self._active
+
+    def acquire(self, blocking=True):
+        """
+        実行枠を確保
+
+        Args:
+            blocking (bool): 空きができるまで待つか
+
+        Returns:
+            bool: 確保できた場合True
+        """
+        with self._cond:
+            while self._active >= self._limit:
+                if not blocking:
+                    return False
+                self._cond.wait()
+            self._active += 1
+            self._peak_active = max(self._peak_active, self._active)
+            return True
+
+    def release(self):
+        """実行枠を解放"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """実行枠を確保して処理を実行"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record(self, ok, nbytes=0, output=""):
+        """
+        ジョブの結果を報告
+
+        Args:
+            ok (bool): 成功したか
+            nbytes (int): ダウンロードしたバイト数
+            output (str): 失敗時のyt-dlpの出力
+
+        Returns:
+            dict: 評価を行った場合はその判定（それ以外はNone）
+        """
+        with self._cond:
+            self._completed += 1
+            self._bytes += nbytes or 0
+            if not ok:
+                self._failed += 1
+                if is_throttled(output):
+                    self._throttled += 1
+            now = self.clock()
+            if self._completed < self.min_samples or now - self._window_start < self.interval:
+                return None
+            return self._evaluate(now)
+
+    def record_result(self, result):
+        """
+        DownloadResultを報告（ダウンロード済みでスキップしたもの・中断されたものは数えない）
+
+        Returns:
+            dict: 評価を行った場合はその判定（それ以外はNone）
+        """
+        if result.skipped or result.interrupted:
+            return None
+        nbytes = sum(f.filesize or 0 for f in result.files)
+        return self.record(bool(result), nbytes, result.error_output)
+
+    def _evaluate(self, now):
+        elapsed = max(now - self._window_start, 1e-9)
+        throughput = self._bytes / elapsed
+        error_rate = self._failed / self._completed
+        throttle_rate = self._throttled / self._completed
+        load = self.load_func() if self.load_func else None
+        saturated = self._peak_active >= self._limit
+        dropped = (self._last_throughput is not None
+                   and throughput < self._last_throughput * (1 - self.throughput_tolerance))
+
+        old_limit = self._limit
+        if throttle_rate > self.throttle_threshold:
+            action, reason = 'decrease', 'throttled'
+        elif error_rate > self.error_threshold:
+            action, reason = 'decrease', 'errors'
+        elif load is not None and load > self.cpu_threshold:
+            action, reason = 'decrease', 'cpu'
+        elif dropped and self._last_action == 'increase':
+            action, reason = 'backoff', 'throughput_drop'
+        elif saturated:
+            action, reason = 'increase', 'probe'
+        else:
+            action, reason = 'hold', 'not_saturated'
+
+        if action == 'decrease':
+            new_limit = max(self.min_limit, int(old_limit * self.decrease_factor))
+        elif action == 'backoff':
+            new_limit = max(self.min_limit, old_limit - 1)
+        elif action == 'increase':
+            new_limit = min(self.max_limit, old_limit + 1)
+        else:
+            new_limit = old_limit
+        if new_limit == old_limit and action != 'hold':
+            action = 'hold'
+        self._limit = new_limit
+        if new_limit > old_limit:
+            self._cond.notify(new_limit - old_limit)
+
+        decision = {
+            'time': time.time(),
+            'action': action,
+            'reason': reason,
+            'old_limit': old_limit,
+            'new_limit': new_limit,
+            'jobs': self._completed,
+            'throughput_bps': round(throughput),
+            'error_rate': round(error_rate, 3),
+            'throttle_rate': round(throttle_rate, 3),
+            'cpu_load': round(load, 2) if load is not None else None,
+            'peak_active': self._peak_active,
+        }
+        self.decisions.append(decision)
+        self._log(decision)
+
+        self._last_action = action
+        self._last_throughput = throughput
+        self._reset_window(now)
+        return decision
+
+    def _log(self, decision):
+        if decision['old_limit'] != decision['new_limit']:
+            print(f"🎛️  並列数を調整: {decision['old_limit']} → {decision['new_limit']} ({decision['reason']})")
+        if not self.log_file:
+            return
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(decision, ensure_ascii=False) + "\n")
+        except IOError as e:
+            print(f"警告: 並列数の調整記録を保存できませんでした: {e}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みファイルの重複排除
+同じ内容のファイル（別のURL・画質・プレイリストのフォルダで保存されたもの）を、
+reflink（対応するファイルシステムのみ）に置き換えます（ハードリンクは指定した場合のみ）
+内容のハッシュ（SHA-256）は同じサイズのファイルがある場合のみ計算し、インデックスに保存します
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+HASH_CHUNK = 1024 * 1024
+# Linuxのreflink（btrfs・XFSなどで内容を共有するコピーを作成するioctl）
+FICLONE = 0x40049409
+# ダウンロード途中・変換途中のファイル
+INCOMPLETE_SUFFIXES = ('.part', '.ytdl', '.tmp')
+
+
+def file_digest(path):
+    """ファイルの内容のSHA-256（16進数）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source, target):
+    """sourceと内容を共有するtargetを作成（対応していない場合OSError）"""
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(source), os.fsencode(target), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinkに対応していません")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+
+def link_duplicate(original, duplicate, hardlink=False):
+    """
+    duplicateをoriginalのreflink（hardlinkの場合、できなければハードリンク）に置き換える
+
+    一時ファイルを作成してから置き換えるため、途中で失敗してもduplicateは元のまま残ります。
+    ハードリンクは同じファイルを共有するため、片方を編集（タグの書き換えなど）すると他方も変わります。
+
+    Args:
+        hardlink (bool): reflinkできない場合にハードリンクを使用するか
+
+    Returns:
+        str: 'reflink' または 'hardlink'（どちらもできない場合None）
+    """
+    duplicate = Path(duplicate)
+    temp = duplicate.with_name(f".{duplicate.name}.dedup")
+    methods = [('reflink', _reflink)] + ([('hardlink', os.link)] if hardlink else [])
+    for method, make_link in methods:
+        try:
+            if temp.exists():
+                temp.unlink()
+            make_link(original, temp)
+        except OSError:
+            continue
+        os.replace(temp, duplicate)
+        return method
+    return None
+
+
+def is_candidate(name):
+    """重複排除の対象にするファイル名か（隠しファイル・ダウンロード途中のファイルを除く）"""
+    return not name.startswith('.') and '.temp.' not in name and not name.endswith(INCOMPLETE_SUFFIXES)
+
+
+class Deduplicator:
+    """
+    出力ディレクトリ内のファイルの重複排除
+
+    scanは出力ディレクトリ全体をregisterで1ファイルずつ処理します（--dedup）。
+    記録済みでサイズ・更新時刻が変わっていないファイルは再計算しないため、scanは増分で動作します。
+    """
+
+    def __init__(self, index, root, hardlink=False):
+        """
+        Args:
+            index (DownloadIndex): ダウンロード済みインデックス（ファイルの記録を保存）
+            root (str|Path): 出力ディレクトリ
+            hardlink (bool): reflinkに対応していない場合にハードリンクに置き換えるか
+        """
+        self.index = index
+        self.root = Path(root)
+        self.hardlink = hardlink
+        self._lock = threading.Lock()
+        self.stats = {'scanned': 0, 'unchanged': 0, 'hashed': 0, 'duplicates': 0,
+                      'reflink': 0, 'hardlink': 0, 'unsupported': 0, 'failed': 0, 'saved_bytes': 0}
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def relative(self, path):
+        """出力ディレクトリからの相対パス（インデックスのキー）"""
+        path = Path(path).resolve()
+        try:
+            return str(path.relative_to(self.root.resolve()))
+        except ValueError:
+            return str(path)
+
+    def _digest(self, path, rel, st):
+        digest = file_digest(path)
+        self.index.put_file(rel, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, digest)
+        self._count(hashed=1)
+        return digest
+
+    def register(self, path, rel=None):
+        """
+        ファイルを記録し、同じ内容の記録済みファイルがあればリンクに置き換える
+
+        同じサイズのファイルがない場合はハッシュを計算しません。
+
+        Args:
+            path (str|Path): 完了したファイル
+            rel (str): 出力ディレクトリからの相対パス（省略時はpathから計算）
+
+        Returns:
+            int: 削減したバイト数（置き換えなかった場合0）
+        """
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return 0
+        rel = rel or self.relative(path)
+        self.index.put_file(rel, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino)
+        if st.st_size == 0:
+            return 0
+
+        digest = None
+        for record in self.index.files_with_size(st.st_size):
+            if record['path'] == rel:
+                continue
+            other = self.root / record['path']
+            try:
+                other_st = other.stat()
+            except OSError:
+                self.index.delete_files([record['path']])
+                continue
+            if (other_st.st_dev, other_st.st_ino) == (st.st_dev, st.st_ino):
+                return 0  # 既にハードリンク済み
+            if other_st.st_dev != st.st_dev:
+                continue  # 別のファイルシステムにはリンクできない
+            other_digest = record['digest']
+            if other_digest is None or record['mtime_ns'] != other_st.st_mtime_ns:
+                other_digest = self._digest(other, record['path'], other_st)
+            if digest is None:
+                digest = self._digest(path, rel, st)
+            if other_digest != digest:
+                continue
+
+            method = link_duplicate(other, path, self.hardlink)
+            if method is None:
+                self._count(**{'failed' if self.hardlink else 'unsupported': 1})
+                return 0
+            linked = path.stat()
+            self.index.put_file(rel, linked.st_size, linked.st_mtime_ns, linked.st_dev, linked.st_ino, digest)
+            self._count(duplicates=1, saved_bytes=st.st_size, **{method: 1})
+            return st.st_size
+        return 0
+
+    def _walk(self):
+        """出力ディレクトリ以下の対象ファイルを(パス, 相対パス, stat)で返す（シンボリックリンクはたどらない）"""
+        pending = [self.root]
+        while pending:
+            try:
+                entries = list(os.scandir(pending.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if not is_candidate(entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield (Path(entry.path), os.path.relpath(entry.path, self.root),
+                           entry.stat(follow_symlinks=False))
+
+    def scan(self):
+        """
+        出力ディレクトリ全体の重複排除（新規・変更されたファイルのみ処理し、削除されたファイルの記録は消す）
+
+        Returns:
+            dict: 集計（stats）
+        """
+        known = self.index.file_states()
+        seen = set()
+        for path, rel, st in self._walk():
+            seen.add(rel)
+            self._count(scanned=1)
+            if known.get(rel) == (st.st_size, st.st_mtime_ns):
+                self._count(unchanged=1)
+                continue
+            self.register(path, rel)
+        self.index.delete_files([rel for rel in known if rel not in seen])
+        return self.stats
+
+    def print_summary(self):
+        """集計を表示"""
+        stats = self.stats
+        print(f"🔗 重複排除: 走査 {stats['scanned']}件 (変更なし {stats['unchanged']}件, "
+              f"ハッシュ計算 {stats['hashed']}件)")
+        print(f"   同じ内容のファイル {stats['duplicates']}件を置き換え "
+              f"(reflink {stats['reflink']}件, ハードリンク {stats['hardlink']}件, 失敗 {stats['failed']}件), "
+              f"削減 {stats['saved_bytes'] / (1024 * 1024):.1f} MB")
+        if stats['unsupported']:
+            print(f"   reflinkに対応していないため置き換えなかったファイル: {stats['unsupported']}件 "
+                  f"(--hardlinkでハードリンクに置き換え)")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みインデックス
+ダウンロード完了の記録をSQLite（WALモード）に1件ずつ書き込みます
+複数スレッド・複数プロセスから同時に利用でき、旧形式の.download_cache.jsonは自動で移行されます
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+INDEX_FILENAME = ".download_index.sqlite3"
+# get_manyで1回のクエリに含めるキーの数（SQLiteの変数の上限より小さく）
+LOOKUP_CHUNK = 500
+LEGACY_CACHE_FILENAME = ".download_cache.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    cache_key TEXT PRIMARY KEY,
+    video_id  TEXT,
+    quality   TEXT,
+    filename  TEXT NOT NULL,
+    timestamp REAL,
+    filesize  INTEGER,
+    format_id TEXT
+);
+CREATE INDEX IF NOT EXISTS downloads_video_id ON downloads (video_id);
+CREATE INDEX IF NOT EXISTS downloads_filename ON downloads (filename);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    device   INTEGER,
+    inode    INTEGER,
+    digest   TEXT
+);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+"""
+
+# 後から追加した列（既存のデータベースにはALTER TABLEで追加）
+_ADDED_COLUMNS = {
+    'filesize': 'INTEGER',
+    'format_id': 'TEXT',
+}
+
+
+def make_cache_key(video_id, quality):
+    """インデックスのキー（動画ID_画質）"""
+    return f"{video_id}_{quality}"
+
+
+class DownloadIndex:
+    """
+    ダウンロード済みファイルのインデックス
+
+    接続はスレッドごとに作成し、書き込みは1件ずつのトランザクションで行います。
+    """
+
+    def __init__(self, db_path, legacy_json=None):
+        """
+        Args:
+            db_path (str|Path): SQLiteデータベースのパス
+            legacy_json (str|Path): 移行元の.download_cache.json（存在する場合のみ移行）
+        """
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        self._migrate_schema(conn)
+        if legacy_json:
+            self.migrate_legacy(legacy_json)
+
+    def _connect(self):
+        """現在のスレッド用の接続を取得"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _migrate_schema(self, conn):
+        """古いデータベースに不足している列を追加"""
+        existing = {row['name'] for row in conn.execute("PRAGMA table_info(downloads)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                try:
+                    conn.execute(f"ALTER TABLE downloads ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError:
+                    pass  # 別プロセスが同時に追加した場合
+
+    def migrate_legacy(self, legacy_json):
+        """
+        旧形式のJSONキャッシュを取り込む
+
+        取り込み後、JSONファイルは.migratedを付けた名前に変更します。
+        複数プロセスが同時に起動しても1度だけ取り込まれます。
+
+        Returns:
+            int: 取り込んだ件数
+        """
+        legacy_json = Path(legacy_json)
+        if not legacy_json.exists():
+            return 0
+
+        try:
+            with open(legacy_json, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return 0
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'legacy_migrated'").fetchone()
+            if row is not None:
+                conn.execute("ROLLBACK")
+                return 0
+
+            rows = []
+            for cache_key, info in entries.items():
+                if not isinstance(info, dict) or 'filename' not in info:
+                    continue
+                video_id, _, quality = cache_key.rpartition('_')
+                rows.append((cache_key, video_id, info.get('quality', quality),
+                             info['filename'], info.get('timestamp')))
+            # 既存の記録（新しい形式で書かれたもの）を優先
+            conn.executemany(
+                "INSERT OR IGNORE INTO downloads (cache_key, video_id, quality, filename, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)", (str(time.time()),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        try:
+            os.replace(legacy_json, legacy_json.with_name(legacy_json.name + ".migrated"))
+        except OSError:
+            pass
+        return len(rows)
+
+    def get(self, cache_key):
+        """
+        記録を取得
+
+        Returns:
+            dict: 記録（存在しない場合None）
+        """
+        row = self._connect().execute(
+            "SELECT * FROM downloads WHERE cache_key = ?", (cache_key,)).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, cache_keys):
+        """
+        複数の記録をまとめて取得
+
+        Args:
+            cache_keys (iterable): キー
+
+        Returns:
+            dict: キーをキーとした記録（存在するもののみ）
+        """
+        cache_keys = list(cache_keys)
+        conn = self._connect()
+        found = {}
+        for start in range(0, len(cache_keys), LOOKUP_CHUNK):
+            chunk = cache_keys[start:start + LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f"SELECT * FROM downloads WHERE cache_key IN ({placeholders})", chunk):
+                found[row['cache_key']] = dict(row)
+        return found
+
+    def find_by_video_id(self, video_id):
+        """
+        動画IDの記録を画質を問わず取得
+
+        Returns:
+            list: 記録（新しい順）
+        """
+        cursor = self._connect().execute(
+            "SELECT * FROM downloads WHERE video_id = ? ORDER BY timestamp DESC", (video_id,))
+        return [dict(row) for row in cursor]
+
+    def has_filename(self, filename):
+        """いずれかの記録のファイルとして記録されているか（出力ディレクトリからの相対パス）"""
+        return self._connect().execute(
+            "SELECT 1 FROM downloads WHERE filename = ? LIMIT 1", (filename,)).fetchone() is not None
+
+    def put(self, cache_key, filename, quality, video_id=None, timestamp=None, filesize=None, format_id=None):
+        """
+        記録を追加・更新
+
+        Args:
+            cache_key (str): キー（動画ID_画質）
+            filename (str): 出力ディレクトリからの相対パス
+            quality (str): 画質
+            video_id (str): 動画ID
+            timestamp (float): 記録時刻（省略時は現在時刻）
+            filesize (int): ファイルサイズ（バイト）
+            format_id (str): ダウンロードした形式ID
+        """
+        self._connect().execute(
+            "INSERT OR REPLACE INTO downloads "
+            "(cache_key, video_id, quality, filename, timestamp, filesize, format_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache_key, video_id, quality, filename,
+             timestamp if timestamp is not None else time.time(), filesize, format_id))
+
+    def files_with_size(self, size):
+        """同じサイズのファイルの記録（重複の候補）"""
+        cursor = self._connect().execute("SELECT * FROM files WHERE size = ? ORDER BY rowid", (size,))
+        return [dict(row) for row in cursor]
+
+    def file_states(self):
+        """
+        全ファイルの記録の状態
+
+        Returns:
+            dict: パスをキーとした(サイズ, 更新時刻ns)
+        """
+        cursor = self._connect().execute("SELECT path, size, mtime_ns FROM files")
+        return {row['path']: (row['size'], row['mtime_ns']) for row in cursor}
+
+    def put_file(self, path, size, mtime_ns, device=None, inode=None, digest=None):
+        """
+        重複排除用のファイルの記録を追加・更新
+
+        Args:
+            path (str): 出力ディレクトリからの相対パス
+            size (int): ファイルサイズ（バイト）
+            mtime_ns (int): 更新時刻（ナノ秒、変更の検出に使用）
+            device (int): デバイス番号
+            inode (int): iノード番号（ハードリンク済みの検出に使用）
+            digest (str): 内容のハッシュ（未計算の場合None）
+        """
+        self._connect().execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, device, inode, digest) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, device, inode, digest))
+
+    def delete_files(self, paths):
+        """ファイルの記録を削除"""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+        conn.execute("COMMIT")
+
+    def delete(self, cache_key):
+        """記録を削除"""
+        self._connect().execute("DELETE FROM downloads WHERE cache_key = ?", (cache_key,))
+
+    def entries(self):
+        """全記録を順に返す"""
+        cursor = self._connect().execute("SELECT * FROM downloads ORDER BY timestamp")
+        for row in cursor:
+            yield dict(row)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    def __contains__(self, cache_key):
+        return self._connect().execute(
+            "SELECT 1 FROM downloads WHERE cache_key = ?", (cache_key,)).fetchone() is not None
+
+    def close(self):
+        """現在のスレッドの接続を閉じる"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+動画形式モデル
+yt-dlpのJSON情報（--dump-single-json / extract_info）から形式一覧を構築し、
+画質ごとの最適な形式IDを一度の走査で求めます
+"""
+
+from typing import NamedTuple, Optional
+
+# 画質文字列と目標高さの対応
+QUALITY_HEIGHTS = {
+    "144p": 144,
+    "240p": 240,
+    "360p": 360,
+    "480p": 480,
+    "720p": 720,
+    "1080p": 1080,
+    "1440p": 1440,
+    "2160p": 2160
+}
+
+
+class FormatRecord(NamedTuple):
+    """1つの形式の情報"""
+    format_id: str
+    ext: str
+    height: int
+    width: int
+    fps: float
+    tbr: float
+    filesize: Optional[int]
+    protocol: str
+    vcodec: str
+    acodec: str
+
+    @property
+    def has_video(self):
+        return self.vcodec != 'none' and self.height > 0
+
+    @property
+    def has_audio(self):
+        return self.acodec != 'none'
+
+    @property
+    def is_video(self):
+        return self.has_video
+
+    @property
+    def is_audio(self):
+        """音声のみの形式か"""
+        return self.has_audio and not self.has_video
+
+    @property
+    def resolution(self):
+        if self.has_video:
+            return f"{self.width}x{self.height}" if self.width else f"{self.height}p"
+        return "audio only"
+
+
+def _number(value, cast=float):
+    """数値フィールドを変換（欠損・不正値は0）"""
+    try:
+        return cast(value) if value is not None else cast(0)
+    except (TypeError, ValueError):
+        return cast(0)
+
+
+def _size_to_bytes(text):
+    """--list-formats表記のサイズ（例: "12.3MiB", "~1.2GiB"）をバイト数に変換"""
+    units = {'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'B': 1}
+    text = (text or '').lstrip('~≈')
+    for unit, factor in units.items():
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * factor)
+            except ValueError:
+                return None
+    return None
+
+
+def record_from_dict(fmt):
+    """
+    yt-dlpの形式辞書からFormatRecordを生成
+
+    Args:
+        fmt (dict): info['formats']の要素
+
+    Returns:
+        FormatRecord: 形式情報（動画も音声も含まない形式の場合None）
+    """
+    vcodec = fmt.get('vcodec') or 'none'
+    acodec = fmt.get('acodec') or 'none'
+    if vcodec == 'none' and acodec == 'none':
+        return None  # ストーリーボード等
+
+    height = _number(fmt.get('height'), int)
+    if vcodec != 'none' and height == 0:
+        return None  # 解像度不明の動画
+
+    return FormatRecord(
+        format_id=str(fmt.get('format_id')),
+        ext=fmt.get('ext') or '',
+        height=height,
+        width=_number(fmt.get('width'), int),
+        fps=_number(fmt.get('fps')),
+        tbr=_number(fmt.get('tbr') or fmt.get('abr') or fmt.get('vbr')),
+        filesize=fmt.get('filesize') or fmt.get('filesize_approx'),
+        protocol=fmt.get('protocol') or '',
+        vcodec=vcodec,
+        acodec=acodec,
+    )
+
+
+class FormatModel:
+    """
+    1本の動画の形式一覧
+
+    動画形式は(高さ, ビットレート)の降順、音声形式はビットレートの降順に保持し、
+    構築時に全画質分の推奨形式（画質ラダー）を求めておきます。
+    """
+
+    def __init__(self, records, video_id=None, title=None):
+        self.video_id = video_id
+        self.title = title
+        self.records = list(records)
+        self.video_formats = sorted((r for r in self.records if r.is_video),
+                                    key=lambda r: (r.height, r.tbr), reverse=True)
+        self.audio_formats = sorted((r for r in self.records if r.is_audio),
+                                    key=lambda r: r.tbr, reverse=True)
+        self.best_audio = self.audio_formats[0] if self.audio_formats else None
+        self.ladder = self._build_ladder()
+
+    @classmethod
+    def from_info(cls, info):
+        """
+        yt-dlpのJSON情報から構築
+
+        Args:
+            info (dict): yt-dlpの情報辞書
+
+        Returns:
+            FormatModel: 形式モデル
+        """
+        records = []
+        for fmt in info.get('formats') or []:
+            record = record_from_dict(fmt)
+            if record is not None:
+                records.append(record)
+        return cls(records, video_id=info.get('id'), title=info.get('title'))
+
+    @classmethod
+    def from_legacy(cls, formats):
+        """
+        parse_formats_outputの結果（形式IDをキーとした辞書）から構築
+
+        Args:
+            formats (dict): 形式IDをキーとした形式情報の辞書
+
+        Returns:
+            FormatModel: 形式モデル
+        """
+        records = []
+        for format_id, info in formats.items():
+            is_video = info.get('is_video', False)
+            records.append(FormatRecord(
+                format_id=format_id,
+                ext=info.get('ext', ''),
+                height=info.get('height', 0) if is_video else 0,
+                width=0,
+                fps=_number(info.get('fps')),
+                tbr=_number(str(info.get('tbr', '0')).replace('k', '')),
+                filesize=_size_to_bytes(info.get('filesize')),
+                protocol=info.get('protocol', ''),
+                vcodec=info.get('vcodec', '') if is_video else 'none',
+                acodec=info.get('acodec', '') or 'unknown',
+            ))
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def _build_ladder(self):
+        """
+        全画質の推奨形式を一度の走査で求める
+
+        動画形式は高さの降順に並んでいるため、画質を高い順に見ながら
+        目標高さを超える形式を読み飛ばすだけで各画質の最良形式が決まります。
+        """
+        ladder = {}
+        formats = self.video_formats
+        index = 0
+        for quality, target in sorted(QUALITY_HEIGHTS.items(), key=lambda item: item[1], reverse=True):
+            while index < len(formats) and formats[index].height > target:
+                index += 1
+            if index < len(formats):
+                best_video = formats[index]
+            elif formats:
+                # 目標高さ以下がない場合、最も近い（最も低い）高さを選択
+                lowest = formats[-1].height
+                best_video = next(r for r in formats if r.height == lowest)
+            else:
+                best_video = None
+            ladder[quality] = self._format_spec(best_video)
+        return ladder
+
+    def _format_spec(self, best_video):
+        if best_video and self.best_audio:
+            return f"{best_video.format_id}+{self.best_audio.format_id}"
+        elif best_video:
+            return best_video.format_id
+        # フォールバック: 利用可能な最高品質
+        return "best"
+
+    def best_video(self, target_height):
+        """
+        目標高さ以下の最高品質の動画形式を取得
+
+        Args:
+            target_height (int): 目標高さ
+
+        Returns:
+            FormatRecord: 動画形式（存在しない場合None）
+        """
+        for record in self.video_formats:
+            if record.height <= target_height:
+                return record
+        if self.video_formats:
+            lowest = self.video_formats[-1].height
+            return next(r for r in self.video_formats if r.height == lowest)
+        return None
+
+    def select(self, quality):
+        """
+        画質に応じた形式指定を取得
+
+        Args:
+            quality (str): 要求画質（例: "1080p"）
+
+        Returns:
+            str: 形式指定（例: "137+140"）
+        """
+        if quality in self.ladder:
+            return self.ladder[quality]
+        return self._format_spec(self.best_video(QUALITY_HEIGHTS.get(quality, 720)))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+動画情報キャッシュ
+yt-dlpが抽出した動画情報（JSON）を動画IDごとにファイルへ保存し、
+形式一覧の表示やダウンロードで再抽出を省略します
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+INFO_CACHE_DIRNAME = ".info_cache"
+DEFAULT_TTL = 3600          # ストリームURLの有効期限（約6時間）より十分短くする
+DEFAULT_MAX_ENTRIES = 500
+
+
+class InfoCache:
+    """
+    動画IDをキーとした動画情報キャッシュ
+
+    - 有効期限: yt-dlpが情報に記録する抽出時刻（epoch）からttl秒
+    - 容量制限: max_entriesを超えた場合、最も長く使われていないものから削除（LRU）
+      利用時刻はファイルの更新時刻で管理します
+    """
+
+    def __init__(self, cache_dir, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._count = None
+
+    def path_for(self, video_id):
+        """動画IDに対応するキャッシュファイルのパス"""
+        return self.cache_dir / f"{video_id}.json"
+
+    def _is_fresh(self, info):
+        return time.time() - info.get('epoch', 0) < self.ttl
+
+    def get(self, video_id, record=True):
+        """
+        キャッシュから動画情報を取得
+
+        Args:
+            video_id (str): 動画ID
+            record (bool): ヒット・ミスとして集計するか（同じ動画を1度の処理で複数回参照する場合は2回目以降False）
+
+        Returns:
+            dict: 動画情報（存在しない・期限切れの場合None）
+        """
+        path = self.path_for(video_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            if record:
+                with self.lock:
+                    self.misses += 1
+            return None
+
+        if not self._is_fresh(info):
+            removed = self._remove(path)
+            with self.lock:
+                if record:
+                    self.expired += 1
+                    self.misses += 1
+                if removed and self._count:
+                    self._count -= 1
+            return None
+
+        # 利用時刻を更新（LRU）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        if record:
+            with self.lock:
+                self.hits += 1
+        return info
+
+    def fresh_path(self, video_id, record=True):
+        """
+        有効期限内のキャッシュファイルのパスを取得（yt-dlpの--load-info-json用）
+
+        Args:
+            video_id (str): 動画ID
+            record (bool): ヒット・ミスとして集計するか（getで取得済みの動画の場合False）
+
+        Returns:
+            Path: キャッシュファイル（存在しない・期限切れの場合None）
+        """
+        return self.path_for(video_id) if self.get(video_id, record) is not None else None
+
+    def put(self, video_id, info):
+        """
+        動画情報をキャッシュに保存
+
+        Args:
+            video_id (str): 動画ID
+            info (dict): yt-dlpの情報辞書
+        """
+        info.setdefault('epoch', int(time.time()))
+        path = self.path_for(video_id)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        existed = path.exists()
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except IOError:
+            self._remove(tmp_path)
+            return
+
+        with self.lock:
+            if self._count is None:
+                self._count = sum(1 for _ in self.cache_dir.glob("*.json"))
+            elif not existed:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """利用時刻の古いものから容量制限まで削除（ロック取得済みで呼び出す）"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.json'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        continue
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        for _, path in entries[:max(excess, 0)]:
+            self._remove(path)
+            self.evictions += 1
+        self._count = min(len(entries), self.max_entries)
+
+    def _remove(self, path):
+        """ファイルを削除（削除した場合True）"""
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def stats(self):
+        """
+        ヒット・ミスの集計を取得
+
+        Returns:
+            dict: 集計値
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+再開可能なジョブキュー
+複数動画・プレイリストの一括ダウンロードの各ジョブの状態をSQLite（WALモード）に記録し、
+中断された実行を--resumeで続きから再開できるようにします
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+JOB_QUEUE_FILENAME = ".job_queue.sqlite3"
+
+# ジョブの状態
+PENDING = 'pending'
+PROBING = 'probing'
+DOWNLOADING = 'downloading'
+MERGING = 'merging'
+DONE = 'done'
+FAILED = 'failed'
+
+# 中断時に実行中だった状態（再開時にもう一度実行する）
+UNFINISHED_STATES = (PENDING, PROBING, DOWNLOADING, MERGING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id   TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    source     TEXT,
+    options    TEXT,
+    enumerated INTEGER NOT NULL DEFAULT 0,
+    finished   INTEGER NOT NULL DEFAULT 0,
+    created    REAL,
+    updated    REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    batch_id TEXT NOT NULL,
+    seq      INTEGER NOT NULL,
+    url      TEXT NOT NULL,
+    state    TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error    TEXT,
+    updated  REAL,
+    PRIMARY KEY (batch_id, url)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (batch_id, state, seq);
+"""
+
+
+class JobQueue:
+    """
+    ジョブキュー（出力ディレクトリの.job_queue.sqlite3）
+
+    接続はスレッドごとに作成し、状態の変更は1件ずつのトランザクションで行います。
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str|Path): SQLiteデータベースのパス
+        """
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        """現在のスレッド用の接続を取得"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create_batch(self, kind, source=None, options=None):
+        """
+        一括ダウンロードを登録
+
+        Args:
+            kind (str): 'urls' または 'playlist'
+            source (str): プレイリストのURL
+            options (dict): 画質などのオプション（再開時に復元）
+
+        Returns:
+            JobBatch: 登録した一括ダウンロード
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO batches (batch_id, kind, source, options, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (batch_id, kind, source, json.dumps(options or {}, ensure_ascii=False), now, now))
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id):
+        """登録済みの一括ダウンロードを取得（存在しない場合None）"""
+        row = self._connect().execute("SELECT * FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return JobBatch(self, row) if row else None
+
+    def latest_unfinished(self):
+        """
+        最後に中断された一括ダウンロードを取得
+
+        Returns:
+            JobBatch: 一括ダウンロード（ない場合None）
+        """
+        row = self._connect().execute(
+            "SELECT * FROM batches WHERE finished = 0 ORDER BY created DESC LIMIT 1").fetchone()
+        return JobBatch(self, row) if row else None
+
+    def close(self):
+        """現在のスレッドの接続を閉じる"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class JobBatch:
+    """1回の一括ダウンロード（複数動画またはプレイリスト）のジョブ"""
+
+    def __init__(self, queue, row):
+        self.queue = queue
+        self.batch_id = row['batch_id']
+        self.kind = row['kind']
+        self.source = row['source']
+        self.options = json.loads(row['options'] or '{}')
+        self.enumerated = bool(row['enumerated'])
+        self.created = row['created']
+
+    def _execute(self, sql, params=()):
+        return self.queue._connect().execute(sql, params)
+
+    def add(self, url):
+        """
+        ジョブを追加（同じURLが登録済みの場合は何もしない）
+
+        Returns:
+            bool: 新しく追加した場合True
+        """
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO jobs (batch_id, seq, url, state, updated) "
+            "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM jobs WHERE batch_id = ?",
+            (self.batch_id, url, PENDING, time.time(), self.batch_id))
+        return cursor.rowcount > 0
+
+    def add_all(self, urls):
+        """複数のジョブを順に追加"""
+        for url in urls:
+            self.add(url)
+
+    def set_state(self, url, state, error=None):
+        """
+        ジョブの状態を更新
+
+        完了（done）は何度記録しても同じ結果になり、完了後に他の状態へ戻ることはありません。
+        """
+        if state == DOWNLOADING:
+            # ダウンロードを開始した回数（再開時の再実行を含む）
+            sql = ("UPDATE jobs SET state = ?, error = ?, updated = ?, attempts = attempts + 1 "
+                   "WHERE batch_id = ? AND url = ? AND state != 'done'")
+        else:
+            sql = ("UPDATE jobs SET state = ?, error = ?, updated = ? "
+                   "WHERE batch_id = ? AND url = ? AND state != 'done'")
+        self._execute(sql, (state, error, time.time(), self.batch_id, url))
+
+    def state(self, url):
+        """ジョブの状態（登録されていない場合None）"""
+        row = self._execute("SELECT state FROM jobs WHERE batch_id = ? AND url = ?",
+                            (self.batch_id, url)).fetchone()
+        return row['state'] if row else None
+
+    def unfinished_urls(self):
+        """
+        未完了（中断時に実行待ち・実行中だった）ジョブのURLを登録順に返す
+
+        Returns:
+            list: URL
+        """
+        placeholders = ','.join('?' * len(UNFINISHED_STATES))
+        rows = self._execute(
+            f"SELECT url FROM jobs WHERE batch_id = ? AND state IN ({placeholders}) ORDER BY seq",
+            (self.batch_id, *UNFINISHED_STATES))
+        return [row['url'] for row in rows]
+
+    def counts(self):
+        """
+        状態ごとのジョブ数
+
+        Returns:
+            dict: {状態: 件数}
+        """
+        rows = self._execute("SELECT state, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY state",
+                             (self.batch_id,))
+        return {row['state']: row['n'] for row in rows}
+
+    def mark_enumerated(self):
+        """プレイリストの列挙が完了したことを記録"""
+        self.enumerated = True
+        self._execute("UPDATE batches SET enumerated = 1, updated = ? WHERE batch_id = ?",
+                      (time.time(), self.batch_id))
+
+    def finish(self):
+        """
+        全ジョブが完了・失敗していれば、一括ダウンロードを終了済みにする
+
+        Returns:
+            bool: 終了済みにした場合True
+        """
+        if not self.enumerated or self.unfinished_urls():
+            return False
+        self._execute("UPDATE batches SET finished = 1, updated = ? WHERE batch_id = ?",
+                      (time.time(), self.batch_id))
+        return True
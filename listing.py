@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みファイルの一覧
+ダウンロード済みインデックスの記録から一覧を作成し（ディレクトリの走査は不要）、
+インデックスを使用しない場合はos.scandirで出力ディレクトリを1度だけ走査します
+どちらも1件ずつ順に処理し、フィルタ・並べ替え・ページ分割と表・JSON・CSV形式の出力に対応します
+"""
+
+import csv
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mkv')
+OUTPUT_FORMATS = ['text', 'json', 'csv']
+SORT_KEYS = ['name', 'size', 'time', 'path']
+FIELDS = ['path', 'name', 'size', 'time', 'video_id', 'quality', 'format_id']
+
+
+def make_entry(path, size, mtime, video_id=None, quality=None, format_id=None):
+    """一覧の1件（pathは出力ディレクトリからの相対パス、timeはダウンロード・更新時刻のUNIX時間）"""
+    return {
+        'path': path,
+        'name': os.path.basename(path),
+        'size': size or 0,
+        'time': mtime or 0.0,
+        'video_id': video_id,
+        'quality': quality,
+        'format_id': format_id,
+    }
+
+
+def index_entries(index, root, extensions):
+    """
+    インデックスの記録から一覧を作成（記録順）
+
+    対象の拡張子の記録ごとに1度statを取得し、削除済みのファイルは除きます。
+    サイズが記録されていない古い記録はstatのサイズを使用します。
+    インデックスに記録されていないファイル（--no-cacheでダウンロードしたものなど）は含まれません。
+
+    Args:
+        index (DownloadIndex): ダウンロード済みインデックス
+        root (Path): 出力ディレクトリ
+        extensions (tuple): 対象の拡張子（小文字）
+
+    Yields:
+        dict: 一覧の1件
+    """
+    for record in index.entries():
+        filename = record['filename']
+        if not filename.lower().endswith(extensions):
+            continue
+        try:
+            st = os.stat(Path(root) / filename)
+        except OSError:
+            continue  # 削除済み
+        size = record['filesize'] if record['filesize'] is not None else st.st_size
+        yield make_entry(filename, size, record['timestamp'], record['video_id'],
+                         record['quality'], record['format_id'])
+
+
+def scanned_entries(root, extensions):
+    """
+    出力ディレクトリを1度だけ走査して一覧を作成（隠しファイル・隠しフォルダは除く）
+
+    拡張子が一致したファイルのみstatを取得します。
+
+    Yields:
+        dict: 一覧の1件
+    """
+    root = str(root)
+    pending = [root]
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                yield make_entry(os.path.relpath(entry.path, root), st.st_size, st.st_mtime)
+
+
+def positive_int(text):
+    """
+    1以上の整数に変換（--page・--page-sizeの引数の型）
+
+    Raises:
+        ValueError: 整数でない場合・1未満の場合
+    """
+    value = int(text)
+    if value < 1:
+        raise ValueError(f"1以上の整数を指定してください: {text}")
+    return value
+
+
+def select_entries(entries, match=None, quality=None, sort=None, reverse=False, page=1, page_size=None):
+    """
+    フィルタ・並べ替え・ページ分割
+
+    ページ分割と並べ替えを併用した場合は、heapqで必要な件数（ページの末尾まで）だけを保持します。
+
+    Args:
+        entries (iterable): 一覧
+        match (str): ファイル名に含まれる文字列（大文字・小文字を区別しない）
+        quality (str): 画質（インデックスの記録のみ）
+        sort (str): 並べ替えのキー（SORT_KEYS、Noneの場合は記録順・走査順）
+        reverse (bool): 降順にするか
+        page (int): ページ番号（1から）
+        page_size (int): 1ページの件数（Noneの場合はすべて）
+
+    Returns:
+        iterator: 選択した一覧
+
+    Raises:
+        ValueError: pageまたはpage_sizeが1未満の場合
+    """
+    if page < 1 or (page_size is not None and page_size < 1):
+        raise ValueError(f"ページ番号・1ページの件数は1以上を指定してください: page={page}, page_size={page_size}")
+    if match:
+        needle = match.lower()
+        entries = (e for e in entries if needle in e['name'].lower())
+    if quality:
+        entries = (e for e in entries if e['quality'] == quality)
+
+    start = (page - 1) * page_size if page_size else 0
+    stop = start + page_size if page_size else None
+    if sort:
+        key = lambda e: e[sort]
+        if stop is not None:
+            entries = (heapq.nlargest if reverse else heapq.nsmallest)(stop, entries, key=key)
+        else:
+            entries = sorted(entries, key=key, reverse=reverse)
+    return itertools.islice(entries, start, stop)
+
+
+def write_entries(entries, output='text', root=None, title="ダウンロード済みファイル", out=None):
+    """
+    一覧を出力（1件ずつ書き出す）
+
+    Args:
+        entries (iterable): 一覧
+        output (str): 形式（text, json, csv）
+        root (Path): 出力ディレクトリ（表形式でのパスの表示に使用）
+        title (str): 表形式の見出し
+        out (file): 出力先（省略時は標準出力）
+
+    Returns:
+        int: 出力した件数
+    """
+    out = out or sys.stdout
+    count = 0
+    if output == 'json':
+        out.write('[')
+        for count, entry in enumerate(entries, 1):
+            out.write((',\n ' if count > 1 else '\n ') + json.dumps(entry, ensure_ascii=False))
+        out.write('\n]\n' if count else ']\n')
+        return count
+    if output == 'csv':
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+        for count, entry in enumerate(entries, 1):
+            writer.writerow(entry)
+        return count
+
+    total_size = 0
+    for count, entry in enumerate(entries, 1):
+        if count == 1:
+            print(f"{title}:", file=out)
+            print("-" * 50, file=out)
+        total_size += entry['size']
+        print(f"{count:2d}. {entry['name']}", file=out)
+        details = f"    サイズ: {entry['size'] / (1024 * 1024):.1f} MB"
+        if entry['time']:
+            details += f"  日時: {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['time']))}"
+        if entry['quality']:
+            details += f"  画質: {entry['quality']}"
+        print(details, file=out)
+        print(f"    パス: {Path(root) / entry['path'] if root else entry['path']}", file=out)
+        print(file=out)
+    if count:
+        print(f"合計: {count}個 ({total_size / (1024 * 1024):.1f} MB)", file=out)
+    return count
+
+
+def list_files(index, root, extensions, output='text', scan=False, title="ダウンロード済みファイル", **options):
+    """
+    ダウンロード済みファイルの一覧を出力
+
+    インデックスに記録がある場合はインデックスから、ない場合（またはscan=True）は出力ディレクトリを走査します。
+    インデックスに記録されていないファイル（--no-cacheでダウンロードしたものなど）はscan=Trueの場合のみ含まれます。
+
+    Args:
+        index (DownloadIndex): ダウンロード済みインデックス（使用しない場合None）
+        root (Path): 出力ディレクトリ
+        extensions (tuple): 対象の拡張子（小文字）
+        output (str): 形式（text, json, csv）
+        scan (bool): インデックスを使用せずに走査するか
+        title (str): 表形式の見出し
+        **options: select_entriesの引数（match, quality, sort, reverse, page, page_size）
+
+    Returns:
+        int: 出力した件数
+    """
+    if index is not None and not scan and len(index):
+        entries = index_entries(index, root, extensions)
+    else:
+        entries = scanned_entries(root, extensions)
+    return write_entries(select_entries(entries, **options), output, root, title)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus/OpenMetrics形式のメトリクス
+長時間の一括ダウンロードの状態（状態ごとのジョブ数・ダウンロード量・スループット・段階ごとの所要時間・
+キャッシュのヒット率・再試行回数・403/429の回数）を集計し、ローカルのHTTPエンドポイントで公開します
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from progress import DOWNLOAD, FAILED, FINISHED, POSTPROCESS
+
+DEFAULT_METRICS_HOST = '127.0.0.1'
+METRICS_PATH = '/metrics'
+PREFIX = 'ytdl_'
+# 段階ごとの所要時間のヒストグラムの境界（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# カウンターの説明（名前は接頭辞・_totalを除いたもの）
+COUNTERS = {
+    'retries': "再試行の回数（失敗の分類ごと）",
+    'failures': "失敗した試行の回数（失敗の分類ごと、throttledはHTTP 403/429）",
+    'index_skips': "ダウンロード済みインデックスにあったためダウンロードしなかった動画の数",
+}
+
+
+class Histogram:
+    """累積バケットのヒストグラム"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 末尾は+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(境界, 累積件数)のリスト（最後は+Inf）"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_bound(bound):
+    """ヒストグラムの境界（le）の表示（OpenMetricsと同じく1.0のように小数で表す）"""
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+class DownloadMetrics:
+    """
+    一括ダウンロードのメトリクス
+
+    値はどのスレッドからでも記録でき、render()でPrometheusのテキスト形式（またはOpenMetrics）に変換します。
+    状態ごとのジョブ数やキャッシュの集計など、他のオブジェクトが持つ値はadd_collectorで登録した関数から取得時に読み出します。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.downloaded_bytes = 0
+        self._file_bytes = {}  # ジョブ -> ダウンロード中のファイルのバイト数
+        self._speeds = {}      # ジョブ -> 直近の速度（バイト/秒）
+        self.counters = Counter()  # (名前, ラベル) -> 値
+        self.histograms = {}   # 段階 -> Histogram
+        self._collectors = []
+
+    def record_progress(self, event):
+        """進捗イベントからダウンロード量・現在の速度を記録（ProgressReporterのlistenersに登録）"""
+        with self._lock:
+            if event.stage == DOWNLOAD:
+                downloaded = event.downloaded_bytes or 0
+                previous = self._file_bytes.get(event.job, 0)
+                if downloaded >= previous:
+                    self.downloaded_bytes += downloaded - previous
+                if event.status == 'finished':
+                    self._file_bytes.pop(event.job, None)  # 次のファイル（動画・音声の別）は0から数え直される
+                    self._speeds.pop(event.job, None)
+                else:
+                    self._file_bytes[event.job] = downloaded
+                    self._speeds[event.job] = event.speed or 0.0
+            elif event.stage in (FINISHED, FAILED):
+                self._file_bytes.pop(event.job, None)
+                self._speeds.pop(event.job, None)
+            elif event.stage == POSTPROCESS:
+                self._speeds.pop(event.job, None)
+
+    def inc(self, name, amount=1, **labels):
+        """カウンター（COUNTERSの名前）を増やす"""
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, stage, seconds):
+        """段階の所要時間を記録"""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """ブロックの所要時間を段階の所要時間として記録"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def add_collector(self, collect):
+        """
+        取得時に値を読み出す関数を登録
+
+        Args:
+            collect (callable): (名前, 型, 説明, [(ラベル, 値)])のリストを返す関数（名前は接頭辞なし）
+        """
+        self._collectors.append(collect)
+
+    def families(self):
+        """
+        メトリクスの一覧
+
+        Returns:
+            list: (名前, 型, 説明, サンプル)のリスト。サンプルは(接尾辞, ラベル, 値)
+        """
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            downloaded = self.downloaded_bytes
+            speed = sum(self._speeds.values())
+            counters = dict(self.counters)
+            histograms = {stage: (h.cumulative(), h.sum, h.count) for stage, h in self.histograms.items()}
+
+        families = [
+            ('uptime_seconds', 'gauge', "計測開始からの経過時間（秒）", [('', {}, uptime)]),
+            ('downloaded_bytes', 'counter', "ダウンロードしたバイト数", [('_total', {}, downloaded)]),
+            ('throughput_bytes_per_second', 'gauge', "実行中のダウンロードの合計速度（バイト/秒）",
+             [('', {}, speed)]),
+            ('average_throughput_bytes_per_second', 'gauge', "計測開始からの平均速度（バイト/秒）",
+             [('', {}, downloaded / uptime if uptime > 0 else 0.0)]),
+        ]
+        for name, help_text in COUNTERS.items():
+            samples = [('_total', dict(labels), value) for (key, labels), value in sorted(counters.items())
+                       if key == name]
+            families.append((name, 'counter', help_text, samples or [('_total', {}, 0)]))
+
+        samples = []
+        for stage, (buckets, total, count) in sorted(histograms.items()):
+            samples.extend(('_bucket', {'stage': stage, 'le': _format_bound(bound)}, cumulative)
+                           for bound, cumulative in buckets)
+            samples.append(('_sum', {'stage': stage}, total))
+            samples.append(('_count', {'stage': stage}, count))
+        families.append(('stage_duration_seconds', 'histogram', "段階ごとの所要時間（秒）", samples))
+
+        for collect in self._collectors:
+            for name, kind, help_text, values in collect():
+                suffix = '_total' if kind == 'counter' else ''
+                families.append((name, kind, help_text, [(suffix, labels, value) for labels, value in values]))
+        return families
+
+    def render(self, openmetrics=False):
+        """
+        テキスト形式に変換
+
+        Args:
+            openmetrics (bool): OpenMetrics形式にするか（Falseの場合はPrometheusのテキスト形式）
+
+        Returns:
+            str: メトリクスのテキスト
+        """
+        lines = []
+        for name, kind, help_text, samples in self.families():
+            family = PREFIX + name
+            # Prometheusの形式ではカウンターのファミリー名にも_totalを付ける
+            declared = family + '_total' if kind == 'counter' and not openmetrics else family
+            lines.append(f"# HELP {declared} {help_text}")
+            lines.append(f"# TYPE {declared} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{family}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """メトリクスを公開するHTTPサーバー（GET /metrics、デーモンスレッドで応答）"""
+
+    def __init__(self, metrics, port, host=DEFAULT_METRICS_HOST):
+        """
+        Args:
+            metrics (DownloadMetrics): 公開するメトリクス
+            port (int): 待ち受けるポート（0の場合は空いているポート）
+            host (str): 待ち受けるアドレス（デフォルトはローカルのみ）
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}{METRICS_PATH}"
+
+    def start(self):
+        """
+        待ち受けを開始
+
+        Raises:
+            OSError: ポートを使用できない場合
+        """
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in (METRICS_PATH, '/'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                body = metrics.render(openmetrics).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 取得のたびにアクセスログを表示しない
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """待ち受けを終了"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
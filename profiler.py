@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+段階ごとの所要時間のプロファイル（--profile）
+各ジョブの段階（スレッドプールの待ち時間・yt-dlpの確認・動画情報の取得・ダウンロード・結合・インデックスへの記録など）を
+区間として記録し、Chrome/Perfetto形式のトレースJSONと段階ごとのp50/p95/p99の表を出力します
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+DEFAULT_PROFILE_FILENAME = "profile_trace.json"
+# 表の並び順（ここにない段階は後ろに名前順）
+STAGE_ORDER = ('queue_wait', 'job', 'check_yt_dlp', 'probe', 'download', 'merge_wait', 'merge', 'index')
+
+
+class Span(NamedTuple):
+    """記録した区間"""
+    stage: str
+    start: float           # time.perf_counter()の値
+    end: float
+    job: Optional[str]     # ジョブ（URL）
+    lane: int              # トレースの行（スレッド、asyncioの場合はタスクごと）
+
+
+def percentile(values, q):
+    """
+    パーセンタイル（線形補間）
+
+    Args:
+        values (list): 昇順に並べた値
+        q (float): 0〜100
+    """
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Profiler:
+    """
+    段階ごとの区間の記録
+
+    recordはどのスレッド・asyncioのタスクからでも呼べます。
+    トレースの行はスレッドごと（asyncioではタスクごと）に分け、同じ行の区間は入れ子になります。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lanes = {}  # スレッド・タスク -> (行番号, 表示名)
+
+    def _lane(self):
+        """現在のスレッド（asyncioのタスク内ではタスク）の行番号"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            key, name = ('task', id(task)), f"asyncio {task.get_name()}"
+        else:
+            thread = threading.current_thread()
+            key, name = ('thread', thread.ident), thread.name
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = (len(self._lanes) + 1, name)
+        return lane[0]
+
+    def record(self, stage, start, end, job=None):
+        """
+        区間を記録
+
+        Args:
+            stage (str): 段階
+            start (float): 開始時刻（time.perf_counter()）
+            end (float): 終了時刻（time.perf_counter()）
+            job (str): ジョブ（URL）
+        """
+        with self._lock:
+            self.spans.append(Span(stage, start, end, job, self._lane()))
+
+    def trace(self):
+        """
+        Chrome/Perfetto形式のトレース（Trace Event Format）
+
+        Returns:
+            dict: traceEventsを含むトレース
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+            lanes = list(self._lanes.values())
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': 'youtube_video_downloader'}}]
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lane, 'args': {'name': name}}
+                      for lane, name in lanes)
+        # 同じ開始時刻では長い区間を先に置き、入れ子として表示させる
+        for span in sorted(spans, key=lambda s: (s.start, s.start - s.end)):
+            events.append({
+                'name': span.stage,
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 3),
+                'dur': round((span.end - span.start) * 1e6, 3),
+                'pid': pid,
+                'tid': span.lane,
+                'args': {'job': span.job} if span.job else {},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        """トレースをJSONファイルに書き出す（chrome://tracing・ui.perfetto.devで開ける）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f, ensure_ascii=False)
+
+    def summary(self):
+        """
+        段階ごとの集計
+
+        Returns:
+            list: 段階ごとの辞書（stage, count, total, p50, p95, p99, max、時間は秒）
+        """
+        with self._lock:
+            spans = list(self.spans)
+        durations = {}
+        for span in spans:
+            durations.setdefault(span.stage, []).append(span.end - span.start)
+        order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+        rows = []
+        for stage in sorted(durations, key=lambda s: (order.get(s, len(order)), s)):
+            values = sorted(durations[stage])
+            rows.append({'stage': stage, 'count': len(values), 'total': sum(values),
+                         'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                         'p99': percentile(values, 99), 'max': values[-1]})
+        return rows
+
+    def print_summary(self):
+        """段階ごとの件数・合計・p50/p95/p99・最大を表示"""
+        rows = self.summary()
+        if not rows:
+            print("⏱️  プロファイル: 記録された区間はありません")
+            return
+        print("⏱️  段階ごとの所要時間（秒）:")
+        # 全角の見出しは2文字分の幅で表示されるため、その分だけ詰めて揃える
+        print(f"   {'段階':<14} {'件数':>4} {'合計':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'最大':>6}")
+        for row in rows:
+            print(f"   {row['stage']:<16} {row['count']:>6} {row['total']:>9.2f} {row['p50']:>8.3f} "
+                  f"{row['p95']:>8.3f} {row['p99']:>8.3f} {row['max']:>8.3f}")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロードの進捗イベントと集約表示
+yt-dlpに--progress-templateで出力させた進捗行を型付きのイベント（バイト数・速度・残り時間・段階）に変換し、
+キュー経由で1つの表示スレッドに集めます
+表示スレッドはジョブごとと全体のスループットを表示し、同じイベントをJSON Linesでも書き出します
+"""
+
+import contextlib
+import json
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from yt_dlp_engine import PROGRESS_MARKER
+
+# イベントの段階
+DOWNLOAD = 'download'
+POSTPROCESS = 'postprocess'
+FINISHED = 'finished'
+FAILED = 'failed'
+MESSAGE = 'message'
+
+# 表示の更新間隔（秒）。端末以外（ファイルへのリダイレクト等）では間隔を空けて1行ずつ出力
+RENDER_INTERVAL = 0.5
+LOG_RENDER_INTERVAL = 10.0
+
+_STOP = object()
+
+
+class ProgressEvent(NamedTuple):
+    """進捗イベント"""
+    job: Optional[str]                    # ジョブ（URL、ジョブに属さないメッセージの場合None）
+    stage: str                            # 段階（download, postprocess, finished, failed, message）
+    status: Optional[str] = None          # yt-dlpの状態（downloading, finished, started, processing等）
+    video_id: Optional[str] = None
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None     # 不明な場合はyt-dlpの推定値
+    speed: Optional[float] = None         # バイト/秒
+    eta: Optional[float] = None           # 残り時間（秒）
+    detail: Optional[str] = None          # 後処理の名前・メッセージ・エラー
+    time: float = 0.0                     # 発生時刻（UNIX時間）
+
+
+def _number(value):
+    """yt-dlpの値を数値に変換（値がない場合はyt-dlpが"NA"を出力するためNone）"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def _text(value):
+    return value if isinstance(value, str) and value != 'NA' else None
+
+
+def parse_progress_line(line, job=None):
+    """
+    進捗行（PROGRESS_TEMPLATE_ARGSの出力）を解析
+
+    Args:
+        line (str): yt-dlpの出力行
+        job (str): ジョブ（URL）
+
+    Returns:
+        ProgressEvent: 進捗イベント（進捗行でない場合None）
+    """
+    if not line.startswith(PROGRESS_MARKER):
+        return None
+    try:
+        fields = json.loads(line[len(PROGRESS_MARKER):])
+    except ValueError:
+        return None
+    if not isinstance(fields, list) or len(fields) < 3:
+        return None
+    stage, video_id, status = fields[:3]
+    if stage == POSTPROCESS:
+        postprocessor = fields[3] if len(fields) > 3 else None
+        return ProgressEvent(job, POSTPROCESS, _text(status), _text(video_id), detail=_text(postprocessor),
+                             time=time.time())
+    if stage != DOWNLOAD:
+        return None
+    downloaded, total, estimate, speed, eta = (fields[3:] + [None] * 5)[:5]
+    total = _number(total) or _number(estimate)
+    return ProgressEvent(job, DOWNLOAD, _text(status), _text(video_id), _number(downloaded),
+                         int(total) if total else None, _number(speed), _number(eta), time=time.time())
+
+
+def format_bytes(size):
+    """バイト数の表示（MiB）"""
+    return f"{(size or 0) / (1024 * 1024):.1f} MiB"
+
+
+def format_eta(seconds):
+    """残り時間の表示（例: 1:05）"""
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class _JobProgress:
+    """表示スレッドが保持する1ジョブの進捗"""
+
+    __slots__ = ('label', 'stage', 'status', 'completed', 'downloaded', 'total', 'speed', 'eta', 'detail')
+
+    def __init__(self, label):
+        self.label = label
+        self.stage = DOWNLOAD
+        self.status = None
+        self.completed = 0     # ダウンロードが終わったファイル（動画・音声）の合計バイト数
+        self.downloaded = 0    # ダウンロード中のファイルのバイト数
+        self.total = None
+        self.speed = None
+        self.eta = None
+        self.detail = None
+
+    @property
+    def bytes(self):
+        return self.completed + self.downloaded
+
+    def line(self):
+        """ジョブの表示行"""
+        if self.stage == POSTPROCESS:
+            return f"   [{self.label}] 後処理中 ({self.detail or '-'})"
+        if self.total:
+            percent = f"{min(100.0, 100.0 * self.downloaded / self.total):5.1f}%"
+            size = f"{format_bytes(self.downloaded)} / {format_bytes(self.total)}"
+        else:
+            percent, size = "  ---%", format_bytes(self.downloaded)
+        return (f"   [{self.label}] {percent} {size}  {format_bytes(self.speed)}/s  "
+                f"残り {format_eta(self.eta)}")
+
+
+class _QueueWriter:
+    """
+    sys.stdoutの代わりに書かれた内容を行ごとにメッセージイベントとして表示スレッドへ送るファイル風オブジェクト
+
+    書きかけの行はスレッドごとに保持するため、複数のスレッドの出力が1行の中で混ざりません。
+    """
+
+    encoding = 'utf-8'
+
+    def __init__(self, reporter):
+        self.reporter = reporter
+        self._local = threading.local()
+
+    def write(self, text):
+        pending = getattr(self._local, 'pending', '') + text
+        *lines, self._local.pending = pending.split('\n')
+        for line in lines:
+            self.reporter.message(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class ProgressReporter:
+    """
+    進捗イベントを1つの表示スレッドで集約して表示
+
+    各ジョブのスレッドはemit等でキューにイベントを入れるだけで、表示・JSON Linesの書き出しは
+    表示スレッドのみが行います（ジョブの数が増えても標準出力のロックを奪い合いません）。
+    端末ではジョブごとの行と全体の行を一定間隔で書き換え、端末以外では全体の行を間隔を空けて出力します。
+    """
+
+    def __init__(self, out=None, json_out=None, interval=None, live=None, render=True, listeners=None):
+        """
+        Args:
+            out (file): 表示先（省略時は標準出力）
+            json_out (file): イベントをJSON Linesで書き出す先（省略時は書き出さない）
+            interval (float): 表示の更新間隔（秒、省略時は端末かどうかで決定）
+            live (bool): 表示を書き換えるか（省略時は表示先が端末の場合True）
+            render (bool): 進捗を表示するか（Falseの場合はメッセージとJSON Linesのみ）
+            listeners (list): 表示スレッドで各イベントを受け取る関数（メトリクスの集計など）
+        """
+        self.out = out or sys.stdout
+        self.json_out = json_out
+        self.live = self.out.isatty() if live is None else live
+        self.interval = interval or (RENDER_INTERVAL if self.live else LOG_RENDER_INTERVAL)
+        self.render = render
+        self.listeners = list(listeners or [])
+        self.events = queue.Queue()
+        self.jobs = {}  # 実行中のジョブ（表示スレッドのみが参照）
+        self.finished = 0
+        self.failed = 0
+        self.total_bytes = 0  # 完了・失敗したジョブのバイト数
+        self.started = time.monotonic()
+        self._drawn = 0  # 端末に描画中の行数
+        self._thread = threading.Thread(target=self._run, name='progress', daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+
+    def close(self):
+        """キューに残ったイベントを処理してから表示スレッドを終了"""
+        self.events.put(_STOP)
+        self._thread.join()
+
+    def emit(self, event):
+        """イベントを表示スレッドに送る（どのスレッドからでも呼べる）"""
+        self.events.put(event)
+
+    def observe(self, job, line):
+        """
+        yt-dlpの出力行が進捗行であればイベントとして送る
+
+        Returns:
+            bool: 進捗行だった場合True
+        """
+        event = parse_progress_line(line, job)
+        if event is None:
+            return line.startswith(PROGRESS_MARKER)
+        self.emit(event)
+        return True
+
+    def message(self, text, job=None):
+        """進捗の表示の上に1行表示"""
+        self.emit(ProgressEvent(job, MESSAGE, detail=text, time=time.time()))
+
+    def finish(self, job, ok, error=None):
+        """ジョブの完了・失敗を記録"""
+        self.emit(ProgressEvent(job, FINISHED if ok else FAILED, detail=error, time=time.time()))
+
+    @contextlib.contextmanager
+    def capture_stdout(self):
+        """実行中、全スレッドのprintを表示スレッド経由で出力"""
+        with contextlib.redirect_stdout(_QueueWriter(self)):
+            yield
+
+    def snapshot(self):
+        """
+        全体の進捗
+
+        Returns:
+            dict: active（実行中の件数）, finished, failed, speed（合計のバイト/秒）, bytes（合計バイト数）
+        """
+        active = self.jobs.values()
+        return {
+            'active': len(self.jobs),
+            'finished': self.finished,
+            'failed': self.failed,
+            'speed': sum(job.speed or 0 for job in active if job.stage == DOWNLOAD),
+            'bytes': self.total_bytes + sum(job.bytes for job in active),
+        }
+
+    def _run(self):
+        next_render = time.monotonic() + self.interval
+        while True:
+            try:
+                event = self.events.get(timeout=max(0.0, next_render - time.monotonic()))
+            except queue.Empty:
+                event = None
+            if event is _STOP:
+                break
+            if event is not None:
+                self._handle(event)
+            if time.monotonic() >= next_render:
+                if self.render and self.jobs:
+                    self._draw()
+                if self.json_out is not None:
+                    self.json_out.flush()
+                next_render = time.monotonic() + self.interval
+        self._clear()
+        self._print_summary()
+        if self.json_out is not None:
+            self.json_out.flush()
+
+    def _handle(self, event):
+        for listener in self.listeners:
+            listener(event)
+        if self.json_out is not None:
+            self.json_out.write(json.dumps(event._asdict(), ensure_ascii=False) + '\n')
+        if event.stage == MESSAGE:
+            self._clear()
+            print(event.detail, file=self.out)
+            return
+        if event.stage in (FINISHED, FAILED):
+            job = self.jobs.pop(event.job, None)
+            self.total_bytes += job.bytes if job else 0
+            if event.stage == FINISHED:
+                self.finished += 1
+            else:
+                self.failed += 1
+            return
+
+        job = self.jobs.get(event.job)
+        if job is None:
+            job = self.jobs[event.job] = _JobProgress(event.video_id or event.job)
+        job.stage, job.status = event.stage, event.status
+        if event.stage == POSTPROCESS:
+            job.detail = event.detail
+            return
+        if event.status == 'finished':
+            # 動画・音声を別々にダウンロードする場合は、ファイルごとに0から数え直される
+            job.completed += event.downloaded_bytes or event.total_bytes or job.downloaded
+            job.downloaded, job.total, job.speed, job.eta = 0, None, None, None
+        else:
+            job.downloaded = event.downloaded_bytes or 0
+            job.total, job.speed, job.eta = event.total_bytes, event.speed, event.eta
+
+    def _aggregate_line(self):
+        stats = self.snapshot()
+        return (f"📶 全体: 実行中 {stats['active']}件 / 完了 {stats['finished']}件 / 失敗 {stats['failed']}件  "
+                f"{format_bytes(stats['speed'])}/s  (計 {format_bytes(stats['bytes'])})")
+
+    def _draw(self):
+        """進捗を表示（端末ではジョブごとの行を書き換え、端末以外では全体の行のみ追記）"""
+        if not self.live:
+            print(self._aggregate_line(), file=self.out)
+            return
+        lines = [job.line() for job in self.jobs.values()]
+        rows = max(1, shutil.get_terminal_size().lines - 2)
+        if len(lines) > rows:
+            lines = lines[:rows - 1] + [f"   … 他{len(lines) - rows + 1}件"]
+        lines.append(self._aggregate_line())
+        self._clear()
+        self.out.write("\n".join(lines) + "\n")
+        self.out.flush()
+        self._drawn = len(lines)
+
+    def _clear(self):
+        """端末に描画中の進捗を消す（カーソルを戻して以降を消去）"""
+        if self._drawn:
+            self.out.write(f"\x1b[{self._drawn}F\x1b[J")
+            self._drawn = 0
+
+    def _print_summary(self):
+        stats = self.snapshot()
+        if not self.render or not stats['bytes']:
+            return
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        print(f"📶 合計: {format_bytes(stats['bytes'])} (平均 {format_bytes(stats['bytes'] / elapsed)}/s, "
+              f"{elapsed:.1f}秒)", file=self.out)
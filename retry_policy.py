@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョブの再試行
+yt-dlpの失敗を一時的・スロットリング・恒久的に分類し、
+一時的な失敗のみジッター付き指数バックオフで再試行します
+"""
+
+import random
+import time
+
+from concurrency import is_throttled
+
+# 失敗の分類
+TRANSIENT = 'transient'    # 通信の切断・フラグメントの取得失敗など（再試行する）
+THROTTLED = 'throttled'    # HTTP 403/429（間隔を長めにとって再試行する）
+PERMANENT = 'permanent'    # 非公開・削除済み・Pythonの非推奨など（再試行しない）
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# 再試行しても結果が変わらない失敗を示すyt-dlpの出力
+PERMANENT_MARKERS = (
+    'Python version 3.9 has been deprecated',
+    'Please update to Python 3.10',
+    'Video unavailable',
+    'Private video',
+    'This video has been removed',
+    'This video is not available',
+    'members-only',
+    'Sign in to confirm your age',
+    'Unsupported URL',
+    'is not a valid URL',
+    'Requested format is not available',
+    'HTTP Error 404',
+    'HTTP Error 410',
+)
+
+# 再試行で回復する見込みのある失敗を示すyt-dlpの出力
+TRANSIENT_MARKERS = (
+    'Connection reset',
+    'Connection aborted',
+    'Connection refused',
+    'timed out',
+    'Temporary failure in name resolution',
+    'Network is unreachable',
+    'Remote end closed connection',
+    'IncompleteRead',
+    'fragment',
+    'Unable to download',
+    'Got error',
+    'HTTP Error 5',
+)
+
+
+def classify_failure(output):
+    """
+    yt-dlpの失敗時の出力を分類
+
+    ERROR行に既知の恒久的なエラーがあればそれを最優先し、次に403/429、一時的なエラーの順に判定します。
+    恒久的なエラーの文言はERROR行のみで照合します（Pythonの非推奨の警告はWARNINGとして毎回出力されるため）。
+    いずれにも当てはまらない失敗（未知のERROR・出力のない内部の例外など）は、再試行しても結果が変わらない
+    可能性が高いため恒久的とみなします（形式IDの誤り・ログインが必要な動画などを何度も再試行しないよう）。
+
+    Args:
+        output (str): yt-dlpの出力（末尾）
+
+    Returns:
+        str: TRANSIENT / THROTTLED / PERMANENT
+    """
+    if not output:
+        return PERMANENT
+    errors = [line for line in output.splitlines() if 'ERROR' in line]
+    if any(marker in line for line in errors for marker in PERMANENT_MARKERS):
+        return PERMANENT
+    if is_throttled(output):
+        return THROTTLED
+    if any(marker in output for marker in TRANSIENT_MARKERS):
+        return TRANSIENT
+    return PERMANENT
+
+
+class RetryPolicy:
+    """
+    ジョブごとの再試行回数と待ち時間
+
+    待ち時間はフルジッターの指数バックオフ（0〜min(max_delay, base_delay×2^(n-1))の一様乱数）で、
+    403/429の場合はbase_delayをthrottle_multiplier倍にします。
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=2.0, max_delay=60.0, throttle_multiplier=4.0,
+                 rng=random.random, sleep=time.sleep):
+        """
+        Args:
+            max_attempts (int): 1ジョブの最大試行回数（1で再試行しない）
+            base_delay (float): 1回目の再試行までの待ち時間の上限（秒）
+            max_delay (float): 待ち時間の上限（秒）
+            throttle_multiplier (float): 403/429の場合の待ち時間の倍率
+            rng (callable): 0以上1未満の乱数を返す関数
+            sleep (callable): 待機する関数
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttle_multiplier = throttle_multiplier
+        self.rng = rng
+        self.sleep = sleep
+
+    def should_retry(self, kind, attempt):
+        """
+        attempt回目の失敗後に再試行するか
+
+        Args:
+            kind (str): 失敗の分類
+            attempt (int): 失敗した試行の回数（1から）
+        """
+        return kind != PERMANENT and attempt < self.max_attempts
+
+    def delay(self, kind, attempt):
+        """
+        attempt回目の失敗後の待ち時間（秒）
+        """
+        base = self.base_delay * (self.throttle_multiplier if kind == THROTTLED else 1)
+        return self.rng() * min(self.max_delay, base * 2 ** (attempt - 1))
+
+    def next_delay(self, result, attempt):
+        """
+        失敗したダウンロードを再試行する場合の待ち時間
+
+        Args:
+            result (DownloadResult): attempt回目の結果
+            attempt (int): 試行の回数（1から）
+
+        Returns:
+            tuple: (失敗の分類, 待ち時間（秒）。再試行しない場合None)
+        """
+        if result or result.interrupted:
+            return None, None
+        kind = classify_failure(result.error_output)
+        if not self.should_retry(kind, attempt):
+            return kind, None
+        return kind, self.delay(kind, attempt)
+
+
+def describe_failure(kind):
+    """失敗の分類の表示名"""
+    return {TRANSIENT: '一時的なエラー', THROTTLED: 'アクセス制限（403/429）', PERMANENT: '恒久的なエラー'}[kind]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード（I/O）と結合・変換（CPU）の2段のパイプライン
+ダウンロードを終えたジョブは上限付きのキューを経由してCPUステージ（コア数のスレッド）に渡し、
+ダウンロードの実行枠を結合・変換の間も占有しないようにします
+"""
+
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+
+
+class CpuStep:
+    """
+    CPUステージで実行する処理
+
+    I/Oステージの関数がこれを返すと、その処理の戻り値がジョブの結果になります。
+    """
+
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        return self.fn(*self.args)
+
+
+class StageStats:
+    """ステージごとの集計"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.jobs = 0
+        self.busy = 0.0  # 処理中だった時間の合計（秒）
+
+    def utilization(self, wall):
+        """稼働率（処理中の時間÷(スレッド数×経過時間)）"""
+        return self.busy / (self.workers * wall) if wall > 0 else 0.0
+
+
+class StagedPipeline:
+    """
+    2段のパイプライン（concurrent.futures.Executorと同じくsubmitでFutureを返す）
+
+    submitした関数はI/Oステージ（io_workersスレッド）で実行し、CpuStepを返した場合は
+    上限queue_size件のキューを経由してCPUステージ（cpu_workersスレッド）で続きを実行します。
+    キューが満杯の間はI/Oステージのスレッドが待つため、結合・変換が追いつかない場合は
+    ダウンロードの開始も抑えられます。
+    """
+
+    def __init__(self, io_workers, cpu_workers=None, queue_size=None, clock=time.perf_counter):
+        """
+        Args:
+            io_workers (int): ダウンロードのスレッド数
+            cpu_workers (int): 結合・変換のスレッド数（省略時はCPUのコア数）
+            queue_size (int): ステージ間のキューの上限（省略時はcpu_workers）
+            clock (callable): 時刻の取得関数
+        """
+        self.cpu_workers = max(1, cpu_workers or os.cpu_count() or 1)
+        self.io = StageStats('download', max(1, io_workers))
+        self.cpu = StageStats('postprocess', self.cpu_workers)
+        self.clock = clock
+        self.queue_wait = 0.0      # キューで待った時間の合計（秒）
+        self.blocked = 0.0         # キューが満杯でI/Oステージが待った時間の合計（秒）
+        self.max_queue_depth = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max(1, queue_size or self.cpu_workers))
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.io.workers)
+        self._cpu_threads = [threading.Thread(target=self._cpu_loop, daemon=True) for _ in range(self.cpu_workers)]
+        self._started = clock()
+        self._finished = None
+        for thread in self._cpu_threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        return False
+
+    def submit(self, fn, *args):
+        """
+        ジョブを投入
+
+        Returns:
+            concurrent.futures.Future: 最終的な結果（CPUステージがある場合はその完了後に確定）
+        """
+        future = concurrent.futures.Future()
+        self._io_pool.submit(self._run_io, future, fn, args)
+        return future
+
+    def _add(self, stage, elapsed):
+        with self._lock:
+            stage.jobs += 1
+            stage.busy += elapsed
+
+    def _run_io(self, future, fn, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        start = self.clock()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._add(self.io, self.clock() - start)
+            future.set_exception(e)
+            return
+        enqueued = self.clock()
+        self._add(self.io, enqueued - start)
+        if not isinstance(result, CpuStep):
+            future.set_result(result)
+            return
+        self._queue.put((future, result, enqueued))
+        with self._lock:
+            self.blocked += self.clock() - enqueued
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _cpu_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, step, enqueued = item
+            start = self.clock()
+            with self._lock:
+                self.queue_wait += start - enqueued
+            try:
+                future.set_result(step.run())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._add(self.cpu, self.clock() - start)
+
+    def shutdown(self):
+        """投入済みのジョブの完了を待って終了"""
+        self._io_pool.shutdown(wait=True)
+        for _ in self._cpu_threads:
+            self._queue.put(None)
+        for thread in self._cpu_threads:
+            thread.join()
+        if self._finished is None:
+            self._finished = self.clock()
+
+    def report(self):
+        """
+        ステージごとの稼働状況
+
+        Returns:
+            dict: 経過時間・各ステージの件数と稼働率・キューの待ち時間
+        """
+        wall = (self._finished or self.clock()) - self._started
+        with self._lock:
+            return {
+                'wall_s': wall,
+                'download': {'workers': self.io.workers, 'jobs': self.io.jobs,
+                             'busy_s': self.io.busy, 'utilization': self.io.utilization(wall)},
+                'postprocess': {'workers': self.cpu.workers, 'jobs': self.cpu.jobs,
+                                'busy_s': self.cpu.busy, 'utilization': self.cpu.utilization(wall)},
+                'queue_wait_s': self.queue_wait,
+                'blocked_s': self.blocked,
+                'max_queue_depth': self.max_queue_depth,
+            }
+
+    def print_report(self):
+        """ステージごとの稼働状況を表示"""
+        report = self.report()
+        download, postprocess = report['download'], report['postprocess']
+        print(f"📊 ステージ稼働率: ダウンロード {download['utilization']:.0%} "
+              f"({download['workers']}スレッド, {download['jobs']}件) / "
+              f"結合・変換 {postprocess['utilization']:.0%} "
+              f"({postprocess['workers']}スレッド, {postprocess['jobs']}件)")
+        waited = report['queue_wait_s'] / postprocess['jobs'] if postprocess['jobs'] else 0.0
+        print(f"   キュー待ち 平均{waited:.2f}秒 (最大{report['max_queue_depth']}件), "
+              f"キュー満杯でダウンロードが待った時間 計{report['blocked_s']:.1f}秒")
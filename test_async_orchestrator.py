@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncioによる並列ダウンロードのテスト
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from async_orchestrator import AsyncOrchestrator
+from concurrency import AdaptiveLimiter
+from download_index import make_cache_key
+from youtube_video_downloader import YouTubeVideoDownloader
+
+# 偽のyt-dlp: URLの動画IDでファイルを作成して報告行を出力する（hang_dirの指定時はPIDを書いて待ち続ける）
+FAKE_YT_DLP = '''#!{python}
+import json, os, sys, time
+video_id = sys.argv[-1].rsplit("=", 1)[-1]
+hang_dir = {hang_dir!r}
+if hang_dir:
+    with open(os.path.join(hang_dir, video_id + ".pid"), "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+path = os.path.join({output_dir!r}, video_id + ".mp4")
+with open(path, "wb") as f:
+    f.write(b"x" * 10)
+print("[download] Destination: " + path)
+print("YTDL_RESULT\\t" + json.dumps([video_id, "18", path]))
+'''
+
+
+def make_orchestrator(tmp, hang=False, max_workers=2):
+    output_dir = Path(tmp) / "downloads"
+    hang_dir = Path(tmp) / "pids"
+    hang_dir.mkdir()
+    fake = Path(tmp) / "yt-dlp"
+    fake.write_text(FAKE_YT_DLP.format(python=sys.executable, output_dir=str(output_dir),
+                                       hang_dir=str(hang_dir) if hang else ''), encoding='utf-8')
+    fake.chmod(0o755)
+    downloader = YouTubeVideoDownloader(output_dir=str(output_dir), max_workers=max_workers)
+    orchestrator = AsyncOrchestrator(downloader)
+    orchestrator.yt_dlp_path = str(fake)
+    return orchestrator, hang_dir
+
+
+def urls(count):
+    return [f"https://www.youtube.com/watch?v=vid{i}" for i in range(count)]
+
+
+async def started_pids(hang_dir, count):
+    """偽のyt-dlpがcount個起動するまで待ち、PIDを返す"""
+    deadline = time.monotonic() + 10
+    while len(list(hang_dir.glob("*.pid"))) < count:
+        assert time.monotonic() < deadline, "yt-dlpが起動しません"
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.1)  # PIDの書き込み完了を待つ
+    return [int(path.read_text()) for path in hang_dir.glob("*.pid")]
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_batch_downloads_and_indexes_files():
+    """偽のyt-dlpで複数の動画を並行ダウンロードし、報告されたファイルをインデックスに記録することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, _ = make_orchestrator(tmp)
+        results = orchestrator.run(orchestrator.download_all(urls(5), quality="720p", format_id="18"))
+
+        assert sorted(results) == urls(5) and all(results.values())
+        index = orchestrator.downloader.download_index
+        record = index.get(make_cache_key("vid3", "720p"))
+        assert record['filename'] == "vid3.mp4" and record['filesize'] == 10 and record['format_id'] == "18"
+        assert not orchestrator._processes
+
+        # 2回目はインデックスから判定し、yt-dlpを起動しない
+        orchestrator.yt_dlp_path = "/nonexistent/yt-dlp"
+        again = orchestrator.run(orchestrator.download_all(urls(5), quality="720p", format_id="18"))
+        assert all(again.values())
+
+
+def test_cancel_terminates_child_processes():
+    """取り消した場合に実行中のyt-dlpプロセスを終了させてから戻ることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, hang_dir = make_orchestrator(tmp, hang=True)
+
+        async def main():
+            batch = asyncio.create_task(orchestrator.download_all(urls(4), format_id="18"))
+            pids = await started_pids(hang_dir, 2)
+            batch.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await batch
+            return pids
+
+        pids = asyncio.run(main())
+        assert len(pids) == 2 and not any(is_running(pid) for pid in pids)
+        assert not orchestrator._processes
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="SIGINTのハンドラーはPOSIXのみ")
+def test_ctrl_c_terminates_child_processes():
+    """Ctrl-C（SIGINT）で実行中のyt-dlpプロセスを終了させ、KeyboardInterruptとして戻ることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, hang_dir = make_orchestrator(tmp, hang=True)
+        pids = []
+
+        async def interrupt():
+            pids.extend(await started_pids(hang_dir, 2))
+            os.kill(os.getpid(), signal.SIGINT)
+
+        async def batch():
+            asyncio.create_task(interrupt())
+            return await orchestrator.download_all(urls(4), format_id="18")
+
+        with pytest.raises(KeyboardInterrupt):
+            orchestrator.run(batch())
+        assert len(pids) == 2 and not any(is_running(pid) for pid in pids)
+
+
+def test_job_state_writes_run_off_the_event_loop():
+    """ジョブキューへの書き込みをイベントループのスレッドで行わないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, _ = make_orchestrator(tmp)
+        downloader = orchestrator.downloader
+        threads = []
+        set_job_state = downloader.set_job_state
+        downloader.set_job_state = lambda *args: (threads.append(threading.get_ident()), set_job_state(*args))
+
+        async def main():
+            loop_thread = threading.get_ident()
+            await orchestrator.download_all(urls(2), format_id="18")
+            return loop_thread
+
+        loop_thread = asyncio.run(main())
+        assert threads and loop_thread not in threads
+
+
+def test_adaptive_limit_waits_without_running_jobs():
+    """可変の同時実行数の枠がすべて他で使用中で、実行中のジョブがない場合も空きを待って開始することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator, _ = make_orchestrator(tmp)
+        limiter = orchestrator.downloader.limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        assert limiter.acquire(blocking=False)
+        threading.Timer(0.3, limiter.release).start()
+
+        results = orchestrator.run(orchestrator.download_all(urls(2), format_id="18"))
+        assert sorted(results) == urls(2) and all(results.values())
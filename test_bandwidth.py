@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帯域・接続数の予算のテスト
+"""
+
+import threading
+
+import pytest
+
+from bandwidth import MIN_RATE, BandwidthBudget, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("200M") == 200 * 1024 * 1024
+    assert parse_rate("1.5K") == 1536
+    assert parse_rate("500KiB") == 500 * 1024
+    assert parse_rate("1048576") == 1048576
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_fixed_leases_never_exceed_budget():
+    """開始時に固定で割り当てるジョブの合計が予算を超えないことを確認"""
+    budget = BandwidthBudget(max_rate=1000 * 1024, max_connections=64, slots=lambda: 4)
+
+    with budget.lease() as first, budget.lease() as second:
+        assert first.rate == 250 * 1024
+        assert first.connections == 16
+        with budget.lease(), budget.lease():
+            rate, connections = budget.allocated()
+            assert rate <= 1000 * 1024
+            assert connections <= 64
+        assert budget.allocated() == (500 * 1024, 32)
+    assert budget.allocated() == (0, 0)
+
+
+def test_adjustable_leases_are_rebalanced():
+    """変更可能なジョブは開始・終了のたびに残りの帯域を分け合うことを確認"""
+    budget = BandwidthBudget(max_rate=900 * 1024, slots=lambda: 3)
+    changes = []
+
+    with budget.lease(adjustable=True) as first:
+        first.bind(changes.append)
+        assert first.rate == 900 * 1024
+        with budget.lease(adjustable=True) as second:
+            assert first.rate == second.rate == 450 * 1024
+            with budget.lease() as fixed:
+                assert fixed.rate == 300 * 1024
+                assert first.rate == 300 * 1024
+        assert first.rate == 900 * 1024
+
+    assert changes == [900 * 1024, 450 * 1024, 300 * 1024, 450 * 1024, 900 * 1024]
+
+
+def test_jobs_wait_when_the_floor_cannot_be_met():
+    """最低限の帯域・接続数を割り当てられないジョブは開始を待ち、合計が上限を超えないことを確認"""
+    budget = BandwidthBudget(max_rate=3 * MIN_RATE, max_connections=4, slots=lambda: 10)
+    leases = [budget.try_acquire() for _ in range(3)]
+    assert all(leases) and budget.allocated() == (3 * MIN_RATE, 3)
+    assert budget.try_acquire() is None
+    assert budget.try_acquire(adjustable=True) is None
+
+    started = threading.Event()
+
+    def job():
+        with budget.lease() as lease:
+            assert lease.rate == MIN_RATE
+            started.set()
+
+    waiting = threading.Thread(target=job)
+    waiting.start()
+    assert not started.wait(0.2)
+    budget.release(leases[0])
+    assert started.wait(5)
+    waiting.join()
+
+    # 接続数の上限でも待つ
+    connections = BandwidthBudget(max_connections=2, slots=lambda: 10)
+    assert connections.try_acquire() and connections.try_acquire()
+    assert connections.try_acquire() is None and connections.allocated() == (0, 2)
+
+
+def test_adjustable_jobs_keep_their_floor():
+    """固定の割り当ては変更可能なジョブの最低限を残し、予算がMIN_RATE未満でも1ジョブは実行できることを確認"""
+    budget = BandwidthBudget(max_rate=4 * MIN_RATE, slots=lambda: 1)
+    adjustable = budget.try_acquire(adjustable=True)
+    assert adjustable.rate == 4 * MIN_RATE
+    first = budget.try_acquire()
+    assert first.rate == 2 * MIN_RATE and adjustable.rate == 2 * MIN_RATE
+    second = budget.try_acquire()
+    assert second.rate == MIN_RATE and adjustable.rate == MIN_RATE
+    assert budget.try_acquire() is None and budget.try_acquire(adjustable=True) is None
+    budget.release(first)
+    budget.release(second)
+    assert adjustable.rate == 4 * MIN_RATE
+
+    small = BandwidthBudget(max_rate=1024)
+    lease = small.try_acquire()
+    assert lease.rate == 1024 and small.try_acquire() is None
+
+
+def test_aria2c_connections_stay_within_the_lease():
+    """aria2c使用時、並列フラグメント数×aria2cの接続数が割り当てた接続数を超えないことを確認"""
+    import tempfile
+
+    from bandwidth import ARIA2C_MAX_CONNECTIONS, Lease
+    from toolchain import Toolchain
+    from youtube_video_downloader import YouTubeVideoDownloader
+
+    def option(args, name):
+        return args[args.index(name) + 1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeVideoDownloader(output_dir=tmp, enable_cache=False)
+        downloader.toolchain = Toolchain({'aria2c': {'path': '/usr/bin/aria2c', 'version': 'test'}})
+        for connections in (1, 3, 16, 64):
+            args = downloader.build_download_args("URL", "22", "192", "mp3", lease=Lease(None, connections, False))
+            fragments = int(option(args, '--concurrent-fragments'))
+            x, s = (int(value) for value in option(args, '--downloader-args').split()[1::2])
+            assert x == s and fragments * x <= connections
+            assert x == min(connections, ARIA2C_MAX_CONNECTIONS)
+
+        # aria2cを使用しない場合は割り当てをそのまま並列フラグメント数にする
+        downloader.toolchain = Toolchain({})
+        args = downloader.build_download_args("URL", "22", "192", "mp3", lease=Lease(None, 6, False))
+        assert option(args, '--concurrent-fragments') == "6" and '--downloader-args' not in args
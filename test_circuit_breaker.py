@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+403多発時のサーキットブレーカーのテスト
+"""
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, RECOVERING, CircuitBreaker
+from yt_dlp_engine import DownloadResult
+
+FORBIDDEN = DownloadResult(False, error_output="ERROR: HTTP Error 403: Forbidden")
+OK = DownloadResult(True)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(full=4, window=60, threshold=0.3, min_throttled=3, cooldown=30, max_cooldown=300, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def trip(breaker):
+    tickets = [breaker.try_enter() for _ in range(4)]
+    for ticket in tickets:
+        breaker.exit(ticket, FORBIDDEN)
+
+
+def test_opens_on_403_burst_and_probes_with_one_canary():
+    """403が閾値を超えると開始を止め、待機後は1本だけ試験的に開始することを確認"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    # 閾値未満の403では止めない
+    for result in (FORBIDDEN, OK, OK, FORBIDDEN, OK):
+        breaker.exit(breaker.try_enter(), result)
+    assert breaker.state == CLOSED
+
+    trip(breaker)
+    assert breaker.state == OPEN
+    assert breaker.try_enter() is None
+
+    clock.now += 30
+    canary = breaker.try_enter()
+    assert canary.canary and breaker.state == HALF_OPEN
+    assert breaker.try_enter() is None  # 試験中は他のジョブを開始しない
+
+    # 試験も403なら待ち時間を倍にして再び止める
+    breaker.exit(canary, FORBIDDEN)
+    assert breaker.state == OPEN
+    clock.now += 30
+    assert breaker.try_enter() is None
+    clock.now += 30
+    assert breaker.try_enter().canary
+
+
+def test_resumes_gradually_and_counts_open_time():
+    """試験に成功すると並列数を段階的に戻し、停止していた時間を集計することを確認"""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+
+    clock.now += 30
+    canary = breaker.try_enter()
+    clock.now += 5
+    breaker.exit(canary, OK)
+    assert breaker.state == RECOVERING
+
+    first, second = breaker.try_enter(), breaker.try_enter()
+    assert breaker.try_enter() is None  # 2個同時まで
+    breaker.exit(first, OK)
+    third = breaker.try_enter()
+    breaker.exit(second, OK)
+    assert breaker.state == CLOSED
+    breaker.exit(third, OK)
+
+    assert breaker.stats() == {'trips': 1, 'canary_failures': 0, 'open_seconds': 35.0}
+
+
+def test_results_from_before_the_trip_are_ignored():
+    """遮断前に開始していたジョブの403で、再び遮断しないことを確認"""
+    clock = FakeClock()
+    breaker = make_breaker(clock, full=2)
+    in_flight = [breaker.try_enter() for _ in range(3)]
+    trip(breaker)
+
+    clock.now += 30
+    breaker.exit(breaker.try_enter(), OK)
+    for ticket in in_flight:
+        breaker.exit(ticket, FORBIDDEN)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['trips'] == 1
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+並列数の自動調整のテスト
+"""
+
+import json
+import os
+import tempfile
+
+from concurrency import AdaptiveLimiter, is_throttled
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, **kwargs):
+    options = dict(initial=2, max_limit=8, interval=10, min_samples=2, load_func=lambda: 0.1, clock=clock)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+
+def run_window(limiter, clock, jobs, ok=True, nbytes=1000, output=""):
+    """実行枠を使い切った状態でjobs件完了させ、最後の判定を返す"""
+    for _ in range(limiter.limit):
+        limiter.acquire()
+    for _ in range(limiter.limit):
+        limiter.release()
+    decision = None
+    for i in range(jobs):
+        if i == jobs - 1:
+            clock.now += limiter.interval
+        decision = limiter.record(ok, nbytes, output) or decision
+    return decision
+
+
+def test_additive_increase_when_saturated():
+    """枠を使い切っていて問題がなければ1つずつ増やすことを確認"""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    decision = run_window(limiter, clock, 4)
+    assert decision['action'] == 'increase'
+    assert limiter.limit == 3
+
+    run_window(limiter, clock, 4)
+    assert limiter.limit == 4
+
+
+def test_multiplicative_decrease_on_403():
+    """403が続いたら同時実行数を半分にすることを確認"""
+    clock = FakeClock()
+    limiter = make_limiter(clock, initial=8)
+
+    decision = run_window(limiter, clock, 4, ok=False, output="ERROR: unable to download video data: HTTP Error 403: Forbidden")
+    assert decision['reason'] == 'throttled'
+    assert limiter.limit == 4
+
+    run_window(limiter, clock, 4, ok=False, output="HTTP Error 403")
+    run_window(limiter, clock, 4, ok=False, output="HTTP Error 403")
+    run_window(limiter, clock, 4, ok=False, output="HTTP Error 403")
+    assert limiter.limit == limiter.min_limit
+
+
+def test_cpu_load_and_throughput_drop():
+    """CPU負荷が高い場合と、増加後にスループットが落ちた場合に減らすことを確認"""
+    clock = FakeClock()
+    load = [2.0]
+    limiter = make_limiter(clock, initial=4, load_func=lambda: load[0])
+
+    assert run_window(limiter, clock, 4)['reason'] == 'cpu'
+    assert limiter.limit == 2
+
+    load[0] = 0.1
+    assert run_window(limiter, clock, 4, nbytes=10000)['action'] == 'increase'
+    assert limiter.limit == 3
+    decision = run_window(limiter, clock, 4, nbytes=100)
+    assert decision['reason'] == 'throughput_drop'
+    assert limiter.limit == 2
+
+
+def test_decisions_are_logged():
+    """判定がJSON Linesで記録されることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "decisions.jsonl")
+        clock = FakeClock()
+        limiter = make_limiter(clock, log_file=log_file)
+
+        limiter.record(True, 1000)
+        clock.now += 10
+        limiter.record(True, 1000)  # 枠を使っていないため維持
+
+        with open(log_file, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f]
+        assert len(entries) == 1
+        assert entries[0]['action'] == 'hold'
+        assert entries[0]['throughput_bps'] == 200
+
+
+def test_non_blocking_acquire():
+    """空きがない場合はブロックせずにFalseを返すことを確認"""
+    limiter = AdaptiveLimiter(initial=1)
+    assert limiter.acquire(blocking=False)
+    assert not limiter.acquire(blocking=False)
+    limiter.release()
+    assert limiter.acquire(blocking=False)
+
+
+def test_is_throttled():
+    assert is_throttled("ERROR: HTTP Error 429: Too Many Requests")
+    assert not is_throttled("ERROR: Video unavailable")
+    assert not is_throttled("")
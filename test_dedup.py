@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みファイルの重複排除のテスト
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from dedup import Deduplicator
+from download_index import DownloadIndex
+
+
+def make_deduplicator(tmp, hardlink=True):
+    return Deduplicator(DownloadIndex(Path(tmp) / ".index.sqlite3"), tmp, hardlink=hardlink)
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_register_links_identical_files_and_hashes_only_same_size():
+    """同じ内容のファイルはリンクに置き換え、同じサイズのファイルがない場合はハッシュを計算しないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup = make_deduplicator(tmp)
+        first = write(Path(tmp) / "a.mp4", b"x" * 1000)
+        other = write(Path(tmp) / "b.mp4", b"y" * 500)
+        copy = write(Path(tmp) / "Playlist" / "a.mp4", b"x" * 1000)
+
+        assert dedup.register(first) == 0
+        assert dedup.register(other) == 0
+        assert dedup.stats['hashed'] == 0
+        assert dedup.register(copy) == 1000
+
+        assert copy.read_bytes() == b"x" * 1000
+        assert dedup.stats['duplicates'] == 1 and dedup.stats['hashed'] == 2
+        if dedup.stats['hardlink']:
+            assert os.path.samefile(first, copy)
+        assert all(r['digest'] for r in dedup.index.files_with_size(1000))
+
+
+def test_scan_is_incremental():
+    """2回目の走査では変更のないファイルのハッシュを計算せず、削除されたファイルの記録を消すことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for folder in ("", "List A", "List B"):
+            write(Path(tmp) / folder / "song.mp3", b"same" * 100)
+        write(Path(tmp) / "song.mp3.part", b"same" * 100)
+
+        stats = make_deduplicator(tmp).scan()
+        assert stats['scanned'] == 3
+        assert stats['duplicates'] == 2 and stats['saved_bytes'] == 800
+
+        (Path(tmp) / "List B" / "song.mp3").unlink()
+        dedup = make_deduplicator(tmp)
+        stats = dedup.scan()
+        assert stats['unchanged'] == 2 and stats['hashed'] == 0 and stats['duplicates'] == 0
+        assert set(dedup.index.file_states()) == {"song.mp3", os.path.join("List A", "song.mp3")}
+
+
+def test_hardlink_is_opt_in():
+    """既定ではreflinkのみを使用し、reflinkできない場合もハードリンクに置き換えないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup = make_deduplicator(tmp, hardlink=False)
+        first = write(Path(tmp) / "a.mp3", b"x" * 1000)
+        copy = write(Path(tmp) / "Playlist" / "a.mp3", b"x" * 1000)
+        dedup.scan()
+
+        assert dedup.stats['hardlink'] == 0
+        assert not os.path.samefile(first, copy)
+        assert dedup.stats['reflink'] + dedup.stats['unsupported'] == 1
+        copy.write_bytes(b"edited")
+        assert first.read_bytes() == b"x" * 1000
+
+
+def test_download_completion_does_not_hash_files():
+    """ダウンロード完了時はインデックスへの記録のみ行い、ハッシュの計算・リンクは--dedupに任せることを確認"""
+    from youtube_video_downloader import YouTubeVideoDownloader
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeVideoDownloader(output_dir=tmp)
+        first = write(Path(tmp) / "a.mp4", b"x" * 1000)
+        copy = write(Path(tmp) / "Playlist" / "a.mp4", b"x" * 1000)
+        downloader.add_to_cache("https://www.youtube.com/watch?v=a", "720p", "a.mp4")
+        downloader.add_to_cache("https://www.youtube.com/watch?v=b", "720p", os.path.join("Playlist", "a.mp4"))
+
+        assert not os.path.samefile(first, copy)
+        assert downloader.download_index.file_states() == {}
+        assert downloader.dedup_downloads(hardlink=True)
+        assert downloader.deduplicator.stats['hashed'] == 2
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みインデックスのテスト
+"""
+
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from download_index import DownloadIndex, make_cache_key
+
+
+def test_put_and_get():
+    """記録の追加・取得・上書きを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DownloadIndex(Path(tmp) / "index.sqlite3")
+        key = make_cache_key("abc", "720p")
+
+        assert index.get(key) is None
+        index.put(key, "a.mp4", "720p", video_id="abc")
+        index.put(key, "b.mp4", "720p", video_id="abc")
+
+        assert index.get(key)['filename'] == "b.mp4"
+        assert key in index
+        assert len(index) == 1
+
+
+def test_legacy_json_migration():
+    """旧形式の.download_cache.jsonが1度だけ取り込まれることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / ".download_cache.json"
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dQw4w9WgXcQ_720p": {'filename': "x.mp4", 'timestamp': 1.0, 'quality': "720p"},
+                "a_b_c_1080p": {'filename': "y.mp4", 'timestamp': 2.0, 'quality': "1080p"},
+            }, f)
+
+        index = DownloadIndex(Path(tmp) / "index.sqlite3", legacy_json=legacy)
+
+        assert not legacy.exists()
+        assert (Path(tmp) / ".download_cache.json.migrated").exists()
+        assert index.get("a_b_c_1080p")['video_id'] == "a_b_c"
+        assert len(index) == 2
+
+        # 再度JSONが置かれても二重に取り込まない
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({"new_720p": {'filename': "z.mp4"}}, f)
+        assert index.migrate_legacy(legacy) == 0
+        assert len(index) == 2
+
+
+def test_concurrent_writers():
+    """複数スレッドから同時に書き込めることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DownloadIndex(Path(tmp) / "index.sqlite3")
+
+        def writer(n):
+            for i in range(50):
+                index.put(make_cache_key(f"{n}-{i}", "720p"), f"{n}-{i}.mp4", "720p")
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(index) == 200
+
+
+def test_get_many_in_chunks():
+    """チャンクの上限を超えるキーもまとめて取得できることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DownloadIndex(Path(tmp) / "index.sqlite3")
+        for i in range(0, 1200, 2):
+            index.put(make_cache_key(f"v{i}", "720p"), f"v{i}.mp4", "720p", video_id=f"v{i}")
+
+        found = index.get_many(make_cache_key(f"v{i}", "720p") for i in range(1200))
+
+        assert len(found) == 600
+        assert found[make_cache_key("v10", "720p")]['filename'] == "v10.mp4"
+        assert make_cache_key("v11", "720p") not in found
+
+
+def test_skip_downloaded_playlist_entries():
+    """列挙した動画IDのうち、ファイルが残っているダウンロード済みのものだけを除くことを確認"""
+    from youtube_video_downloader import SkipStats, YouTubeVideoDownloader
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeVideoDownloader(output_dir=tmp)
+        (Path(tmp) / "a.mp4").touch()
+        downloader.download_index.put(make_cache_key("a", "720p"), "a.mp4", "720p", video_id="a")
+        downloader.download_index.put(make_cache_key("b", "720p"), "gone.mp4", "720p", video_id="b")
+        downloader.download_index.put(make_cache_key("c", "1080p"), "c.mp4", "1080p", video_id="c")
+        (Path(tmp) / "c.mp4").touch()
+
+        stats = SkipStats()
+        pending = list(downloader.skip_downloaded(iter(["a", "b", "c", "d"]), "720p", stats))
+
+        assert pending == ["b", "c", "d"]
+        assert stats.checked == 4
+        assert stats.skipped == 1
+
+
+def test_reported_files_are_indexed_relative_to_output_dir():
+    """yt-dlpが報告したファイルを出力ディレクトリからの相対パスで、サイズ・形式IDとともに記録することを確認"""
+    from youtube_video_downloader import YouTubeVideoDownloader
+    from yt_dlp_engine import DownloadedFile, EngineResult
+
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as elsewhere:
+        downloader = YouTubeVideoDownloader(output_dir=tmp)
+        (Path(tmp) / "sub").mkdir()
+        inside = Path(tmp) / "sub" / "タイトル\t[a].mp4"
+        outside = Path(elsewhere) / "b.mp4"
+        inside.write_bytes(b"a" * 3)
+        outside.write_bytes(b"b" * 4)
+
+        for video_id, path in (("a", inside), ("b", outside)):
+            result = EngineResult(0, files=[DownloadedFile(video_id, "22", str(path), path.stat().st_size)])
+            assert downloader.finish_download(f"https://www.youtube.com/watch?v={video_id}", "720p", result)
+
+        a = downloader.download_index.get(make_cache_key("a", "720p"))
+        b = downloader.download_index.get(make_cache_key("b", "720p"))
+        assert (a['filename'], a['filesize'], a['format_id']) == (str(Path("sub") / inside.name), 3, "22")
+        assert b['filename'] == str(outside.resolve()) and b['filesize'] == 4
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+形式モデルのテスト（記録済みのyt-dlp JSON情報を使用）
+"""
+
+import json
+from pathlib import Path
+
+from format_model import QUALITY_HEIGHTS, FormatModel
+from youtube_video_downloader import YouTubeVideoDownloader
+
+FIXTURES = Path(__file__).parent / "test_fixtures"
+
+
+def load_fixture(name):
+    with open(FIXTURES / name, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_records_from_info():
+    """JSON情報から形式レコードを構築できることを確認"""
+    model = FormatModel.from_info(load_fixture("info_full.json"))
+    ids = {r.format_id for r in model.records}
+
+    assert model.video_id == "aqz-KE-bpKQ"
+    assert "sb0" not in ids  # ストーリーボードは除外
+    assert [r.format_id for r in model.audio_formats] == ["251", "140", "249", "139"]
+
+    by_id = {r.format_id: r for r in model.records}
+    assert by_id["249"].filesize == 4372000  # filesize_approxで補完
+    assert by_id["134"].filesize is None
+    assert by_id["18"].is_video and by_id["18"].has_audio
+    assert by_id["299"].resolution == "1920x1080"
+
+
+def test_quality_ladder():
+    """画質ラダーが各画質の最適な形式を返すことを確認"""
+    model = FormatModel.from_info(load_fixture("info_full.json"))
+
+    assert model.ladder == {
+        "2160p": "315+251",
+        "1440p": "308+251",
+        "1080p": "299+251",
+        "720p": "298+251",
+        "480p": "135+251",
+        "360p": "18+251",
+        "240p": "133+251",
+        "144p": "160+251",
+    }
+
+    # ラダーと画質ごとの個別検索の結果が一致すること
+    for quality, height in QUALITY_HEIGHTS.items():
+        assert model.ladder[quality] == f"{model.best_video(height).format_id}+251"
+
+
+def test_combined_only_formats():
+    """音声のみの形式がない動画では動画形式のみを返すことを確認"""
+    model = FormatModel.from_info(load_fixture("info_combined_only.json"))
+
+    assert model.best_audio is None
+    assert model.select("144p") == "17"
+    assert model.select("2160p") == "18"
+
+
+def test_no_formats():
+    """形式が取得できない場合はbestにフォールバックすることを確認"""
+    model = FormatModel.from_info({'id': 'x', 'formats': []})
+
+    assert not model
+    assert model.select("720p") == "best"
+
+
+def test_select_best_format_accepts_legacy_dict():
+    """parse_formats_outputの辞書を渡しても選択できることを確認"""
+    downloader = YouTubeVideoDownloader.__new__(YouTubeVideoDownloader)
+    legacy = {
+        '136': {'ext': 'mp4', 'height': 720, 'tbr': '1189k', 'is_video': True, 'is_audio': True},
+        '135': {'ext': 'mp4', 'height': 480, 'tbr': '650k', 'is_video': True, 'is_audio': True},
+        '140': {'ext': 'm4a', 'height': 0, 'tbr': '129k', 'is_video': False, 'is_audio': True},
+    }
+
+    assert downloader.select_best_format("720p", legacy) == "136+140"
+    assert downloader.select_best_format("480p", legacy) == "135+140"
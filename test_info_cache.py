@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+動画情報キャッシュのテスト
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from info_cache import InfoCache
+from youtube_video_downloader import YouTubeVideoDownloader
+
+FIXTURES = Path(__file__).parent / "test_fixtures"
+
+
+def test_hit_and_miss_counters():
+    """ヒット・ミスが集計されることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = InfoCache(tmp, ttl=60)
+
+        assert cache.get("abc") is None
+        cache.put("abc", {'id': 'abc', 'formats': []})
+        assert cache.get("abc")['id'] == "abc"
+
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+
+def test_expired_entry_is_dropped():
+    """有効期限切れの情報は返さず削除することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = InfoCache(tmp, ttl=60)
+        cache.put("old", {'id': 'old', 'epoch': int(time.time()) - 120})
+
+        assert cache.get("old") is None
+        assert cache.fresh_path("old") is None
+        assert not cache.path_for("old").exists()
+        assert cache.stats()['expired'] == 1
+
+
+def test_resolve_format_counts_one_lookup_and_checks_ttl():
+    """形式の決定で同じ動画の情報を2回参照してもヒットは1回と数え、期限切れの情報は使わないことを確認"""
+    info = json.loads((FIXTURES / "info_full.json").read_text(encoding='utf-8'))
+    url = f"https://www.youtube.com/watch?v={info['id']}"
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeVideoDownloader(output_dir=tmp)
+        cache = downloader.info_cache
+        cache.put(info['id'], dict(info))
+
+        formats = downloader.get_available_formats(url)
+        _, info_file = downloader.resolve_format(url, "720p", available_formats=formats)
+        assert info_file == cache.path_for(info['id'])
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 0
+
+        # 形式一覧の取得後に期限切れになった情報は--load-info-jsonに渡さない
+        cache.ttl = 0
+        _, info_file = downloader.resolve_format(url, "720p", available_formats=formats)
+        assert info_file is None and not cache.path_for(info['id']).exists()
+        assert cache.stats()['hits'] == 1
+
+
+def test_entry_count_follows_expired_removals():
+    """期限切れで削除した分だけ件数を減らし、容量制限の判定がずれないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = InfoCache(tmp, ttl=60, max_entries=2)
+        cache.put("old", {'id': 'old', 'epoch': int(time.time()) - 120})
+        cache.put("a", {'id': 'a'})
+        assert cache.get("old") is None
+        assert cache._count == 1
+
+        cache.put("b", {'id': 'b'})
+        assert cache.path_for("a").exists() and cache.path_for("b").exists()
+        assert cache.stats()['evictions'] == 0
+
+
+def test_lru_eviction():
+    """容量制限を超えると最も長く使われていない情報から削除することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = InfoCache(tmp, ttl=60, max_entries=2)
+        cache.put("a", {'id': 'a'})
+        cache.put("b", {'id': 'b'})
+
+        # aを古くしてからbを利用し、aが最も古い状態にする
+        past = time.time() - 100
+        os.utime(cache.path_for("a"), (past, past))
+        assert cache.get("b") is not None
+
+        cache.put("c", {'id': 'c'})
+
+        assert not cache.path_for("a").exists()
+        assert cache.path_for("b").exists()
+        assert cache.path_for("c").exists()
+        assert cache.stats()['evictions'] == 1
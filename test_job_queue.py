@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+再開可能なジョブキューのテスト
+"""
+
+import tempfile
+from pathlib import Path
+
+from job_queue import DONE, DOWNLOADING, FAILED, MERGING, PENDING, PROBING, JobQueue
+
+
+def test_resume_returns_interrupted_jobs_in_order():
+    """中断時に実行待ち・実行中だったジョブを登録順に返すことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3")
+        batch = queue.create_batch('urls', options={'quality': '1080p'})
+        urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(6)]
+        batch.add_all(urls)
+        batch.mark_enumerated()
+
+        batch.set_state(urls[0], DONE)
+        batch.set_state(urls[1], FAILED, "ERROR: Video unavailable")
+        batch.set_state(urls[2], PROBING)
+        batch.set_state(urls[3], DOWNLOADING)
+        batch.set_state(urls[4], MERGING)
+        queue.close()
+
+        # 別のプロセスで再開した場合と同じく、開き直して取得
+        resumed = JobQueue(Path(tmp) / "jobs.sqlite3").latest_unfinished()
+        assert resumed.batch_id == batch.batch_id
+        assert resumed.options == {'quality': '1080p'}
+        assert resumed.unfinished_urls() == urls[2:]
+        assert resumed.counts() == {DONE: 1, FAILED: 1, PROBING: 1, DOWNLOADING: 1, MERGING: 1, PENDING: 1}
+
+
+def test_completion_is_idempotent():
+    """完了は何度記録しても同じで、完了後に状態が戻らないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3")
+        batch = queue.create_batch('playlist', source="https://www.youtube.com/playlist?list=PL1")
+        url = "https://www.youtube.com/watch?v=abc"
+
+        assert batch.add(url)
+        assert not batch.add(url)  # 再列挙で同じ動画が来ても追加しない
+        batch.set_state(url, DOWNLOADING)
+        batch.set_state(url, DONE)
+        batch.set_state(url, DONE)
+        batch.set_state(url, DOWNLOADING)  # 遅れて届いた状態更新
+
+        assert batch.state(url) == DONE
+        assert batch.unfinished_urls() == []
+
+
+def test_batch_finishes_only_after_enumeration():
+    """列挙が終わり、全ジョブが完了・失敗した一括ダウンロードのみ終了済みにすることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3")
+        batch = queue.create_batch('playlist', source="https://www.youtube.com/playlist?list=PL1")
+        batch.add("https://www.youtube.com/watch?v=a")
+        batch.set_state("https://www.youtube.com/watch?v=a", DONE)
+
+        assert not batch.finish()
+        assert queue.latest_unfinished().batch_id == batch.batch_id
+
+        batch.mark_enumerated()
+        assert batch.finish()
+        assert queue.latest_unfinished() is None
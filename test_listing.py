@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード済みファイル一覧のテスト
+"""
+
+import csv
+import io
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from download_index import DownloadIndex, make_cache_key
+from listing import (VIDEO_EXTENSIONS, index_entries, make_entry, positive_int, scanned_entries, select_entries,
+                     write_entries)
+
+
+def test_select_filters_sorts_and_pages():
+    """フィルタ・並べ替え・ページ分割が、全件を並べ替えてから切り出した結果と一致することを確認"""
+    entries = [make_entry(f"dir/video {i}.mp4", size=(i * 37) % 100, mtime=i) for i in range(100)]
+
+    page = list(select_entries(iter(entries), sort='size', reverse=True, page=3, page_size=7))
+    expected = sorted(entries, key=lambda e: e['size'], reverse=True)[14:21]
+    assert [e['size'] for e in page] == [e['size'] for e in expected]
+
+    matched = list(select_entries(iter(entries), match="VIDEO 1", page=2, page_size=5))
+    assert [e['name'] for e in matched] == [f"video {i}.mp4" for i in (14, 15, 16, 17, 18)]
+
+
+def test_scan_and_index_sources():
+    """走査は対象の拡張子のファイルのみ、インデックスは記録のみから一覧を作成することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for name in ("a.mp4", "List/b.webm", "List/c.mp3", "d.mp4.part", ".hidden/e.mp4"):
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_bytes(b"x" * 10)
+
+        scanned = sorted(Path(e['path']) for e in scanned_entries(root, VIDEO_EXTENSIONS))
+        assert scanned == [Path("List/b.webm"), Path("a.mp4")]
+
+        index = DownloadIndex(root / ".index.sqlite3")
+        index.put(make_cache_key("a", "720p"), "a.mp4", "720p", video_id="a", timestamp=1, filesize=123)
+        index.put(make_cache_key("c", "mp3-320"), "List/c.mp3", "mp3-320", video_id="c", timestamp=2)
+        entries = list(index_entries(index, root, VIDEO_EXTENSIONS))
+        assert [(e['path'], e['size'], e['quality']) for e in entries] == [("a.mp4", 123, "720p")]
+
+
+def test_machine_readable_output():
+    """JSON・CSV形式の出力を読み戻せることを確認"""
+    entries = [make_entry("a.mp4", 1, 2.0, "a", "720p", "22"), make_entry("b.mp4", 3, 4.0)]
+
+    out = io.StringIO()
+    assert write_entries(iter(entries), 'json', out=out) == 2
+    assert json.loads(out.getvalue()) == entries
+
+    out = io.StringIO()
+    write_entries(iter([]), 'json', out=out)
+    assert json.loads(out.getvalue()) == []
+
+    out = io.StringIO()
+    write_entries(iter(entries), 'csv', out=out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [row['path'] for row in rows] == ["a.mp4", "b.mp4"] and rows[0]['quality'] == "720p"
+
+
+def test_index_skips_deleted_files_and_rejects_invalid_pages():
+    """インデックスの一覧から削除済みのファイルを除き、1未満のページ番号・件数を受け付けないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "a.mp4").write_bytes(b"x" * 10)
+        index = DownloadIndex(root / ".index.sqlite3")
+        index.put(make_cache_key("a", "720p"), "a.mp4", "720p", video_id="a", timestamp=1)
+        index.put(make_cache_key("b", "720p"), "b.mp4", "720p", video_id="b", timestamp=2, filesize=5)
+        entries = list(index_entries(index, root, VIDEO_EXTENSIONS))
+        assert [(e['path'], e['size']) for e in entries] == [("a.mp4", 10)]
+
+    entries = [make_entry("a.mp4", 1, 1)]
+    for options in ({'page': 0, 'page_size': 5}, {'page': 1, 'page_size': -1}, {'page': 1, 'page_size': 0}):
+        with pytest.raises(ValueError):
+            select_entries(iter(entries), **options)
+    assert positive_int("3") == 3
+    for text in ("0", "-1", "x"):
+        with pytest.raises(ValueError):
+            positive_int(text)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+メトリクスのテスト
+"""
+
+import urllib.request
+
+from metrics import DownloadMetrics, MetricsServer
+from progress import DOWNLOAD, FINISHED, ProgressEvent
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith('#')]
+
+
+def test_render_counts_bytes_histograms_and_collectors():
+    """ダウンロード量をファイルごとの差分で数え、カウンター・ヒストグラム・取得時の値を出力することを確認"""
+    metrics = DownloadMetrics()
+    for downloaded, status in ((400, 'downloading'), (1000, 'finished'), (300, 'downloading')):
+        metrics.record_progress(ProgressEvent("url", DOWNLOAD, status, downloaded_bytes=downloaded, speed=50.0))
+    metrics.record_progress(ProgressEvent("other", DOWNLOAD, 'downloading', downloaded_bytes=10, speed=5.0))
+    metrics.record_progress(ProgressEvent("other", FINISHED))
+    metrics.inc('retries', kind='throttled')
+    metrics.inc('failures', 2, kind='throttled')
+    metrics.observe('download', 0.3)
+    metrics.observe('download', 42)
+    metrics.add_collector(lambda: [('jobs', 'gauge', "ジョブ数", [({'state': 'done'}, 3)])])
+
+    lines = sample_lines(metrics.render())
+    assert "ytdl_downloaded_bytes_total 1310" in lines
+    assert "ytdl_throughput_bytes_per_second 50" in lines
+    assert 'ytdl_retries_total{kind="throttled"} 1' in lines
+    assert 'ytdl_failures_total{kind="throttled"} 2' in lines
+    assert "ytdl_index_skips_total 0" in lines
+    assert 'ytdl_stage_duration_seconds_bucket{stage="download",le="0.5"} 1' in lines
+    assert 'ytdl_stage_duration_seconds_bucket{stage="download",le="+Inf"} 2' in lines
+    assert 'ytdl_stage_duration_seconds_count{stage="download"} 2' in lines
+    assert 'ytdl_jobs{state="done"} 3' in lines
+
+
+def test_server_negotiates_openmetrics():
+    """エンドポイントがAcceptヘッダーに応じてPrometheusのテキスト形式・OpenMetrics形式を返すことを確認"""
+    metrics = DownloadMetrics()
+    metrics.inc('retries', kind='transient')
+    with MetricsServer(metrics, 0) as server:
+        with urllib.request.urlopen(server.url) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            text = response.read().decode('utf-8')
+        request = urllib.request.Request(server.url, headers={'Accept': 'application/openmetrics-text'})
+        with urllib.request.urlopen(request) as response:
+            assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+            openmetrics = response.read().decode('utf-8')
+
+    assert "# TYPE ytdl_retries_total counter" in text and "# EOF" not in text
+    assert "# TYPE ytdl_retries counter" in openmetrics and openmetrics.endswith("# EOF\n")
+    assert 'ytdl_retries_total{kind="transient"} 1' in sample_lines(openmetrics)
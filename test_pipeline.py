@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+並列ダウンロードのパイプライン（列挙・先読み・ダウンロード）のテスト
+"""
+
+import tempfile
+import threading
+
+from yt_dlp_engine import DownloadResult
+from youtube_video_downloader import YouTubeVideoDownloader
+
+
+class RecordingDownloader(YouTubeVideoDownloader):
+    """yt-dlpを実行せず、先読み・ダウンロードの呼び出しを記録"""
+
+    def __init__(self, output_dir, **kwargs):
+        super().__init__(output_dir=output_dir, enable_cache=False, **kwargs)
+        self.events = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.counter_lock = threading.Lock()
+
+    def prefetch_formats(self, url, quality):
+        with self.counter_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.events.append(('prefetch', url))
+        return f"formats:{url}"
+
+    def run_job(self, url, quality="720p", format_id=None, audio_quality="0", audio_format="best",
+                available_formats=None):
+        self.events.append(('download', url, available_formats))
+        with self.counter_lock:
+            self.in_flight -= 1
+        return DownloadResult(True)
+
+
+def test_downloads_start_while_urls_are_still_enumerated():
+    """URLの列挙が終わる前に最初のダウンロードが始まることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = RecordingDownloader(tmp, max_workers=2, prefetch=1)
+        first_started = threading.Event()
+        started_before_end = []
+
+        def urls():
+            for i in range(5):
+                yield f"https://www.youtube.com/watch?v=vid{i}"
+                if i == 0:
+                    first_started.wait(timeout=5)
+            started_before_end.append(first_started.is_set())
+
+        original = downloader.run_job
+
+        def run_job(*args, **kwargs):
+            first_started.set()
+            return original(*args, **kwargs)
+
+        downloader.run_job = run_job
+        results = downloader.download_with_thread_pool(urls())
+
+        assert started_before_end == [True]
+        assert len(results) == 5 and all(results.values())
+        # 先読みした形式一覧がダウンロードに渡される
+        downloads = [event for event in downloader.events if event[0] == 'download']
+        assert all(event[2] == f"formats:{event[1]}" for event in downloads)
+        # 先読み・実行中の合計は並列数+先読み件数まで
+        assert downloader.max_in_flight <= 3
+
+
+def test_format_id_skips_prefetch():
+    """形式IDを指定した場合は先読みしないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = RecordingDownloader(tmp, max_workers=2)
+        urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(3)]
+
+        results = downloader.download_with_thread_pool(urls, format_id="137+140")
+
+        assert len(results) == 3
+        assert not any(event[0] == 'prefetch' for event in downloader.events)
+
+
+def test_transient_failures_are_retried():
+    """一時的な失敗は再試行し、恒久的な失敗は1回で終わることを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeVideoDownloader(output_dir=tmp, enable_cache=False, max_attempts=3)
+        downloader.retry_policy.sleep = lambda delay: None
+        outputs = {
+            "https://www.youtube.com/watch?v=flaky": ["ERROR: Connection reset by peer", None],
+            "https://www.youtube.com/watch?v=gone": ["ERROR: [youtube] gone: Video unavailable"],
+        }
+        calls = []
+
+        def download_video(url, *args):
+            calls.append(url)
+            error = outputs[url].pop(0)
+            return DownloadResult(error is None, error_output=error or "")
+
+        downloader.download_video = download_video
+        assert downloader.run_job("https://www.youtube.com/watch?v=flaky")
+        assert not downloader.run_job("https://www.youtube.com/watch?v=gone")
+        assert calls.count("https://www.youtube.com/watch?v=flaky") == 2
+        assert calls.count("https://www.youtube.com/watch?v=gone") == 1
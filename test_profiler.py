@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+段階ごとの所要時間のプロファイルのテスト
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from profiler import Profiler, percentile
+
+
+def test_summary_percentiles_in_stage_order():
+    """段階ごとの件数・合計・パーセンタイルを、定義した段階の順に集計することを確認"""
+    profiler = Profiler()
+    for i in range(1, 101):
+        profiler.record('download', 0.0, float(i), "url")
+    profiler.record('custom', 0.0, 1.0)
+    profiler.record('queue_wait', 0.0, 0.5, "url")
+
+    rows = profiler.summary()
+    assert [row['stage'] for row in rows] == ['queue_wait', 'download', 'custom']
+    download = rows[1]
+    assert download['count'] == 100 and download['total'] == 5050.0 and download['max'] == 100.0
+    assert (download['p50'], round(download['p95'], 2), round(download['p99'], 2)) == (50.5, 95.05, 99.01)
+    assert percentile([], 50) == 0.0 and percentile([3.0], 99) == 3.0
+
+
+def test_trace_lanes_per_thread_and_task():
+    """トレースの行をスレッド・asyncioのタスクごとに分け、Trace Event Formatで書き出すことを確認"""
+    profiler = Profiler()
+    start = profiler.origin
+
+    def worker():
+        profiler.record('job', start, start + 2, "url-a")
+        profiler.record('download', start, start + 1, "url-a")
+
+    thread = threading.Thread(target=worker, name="worker-1")
+    thread.start()
+    thread.join()
+
+    async def task():
+        profiler.record('download', start + 1, start + 1.5, "url-b")
+
+    async def main():
+        await asyncio.gather(task(), task())
+
+    asyncio.run(main())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trace.json"
+        profiler.write_trace(path)
+        events = json.loads(path.read_text(encoding='utf-8'))['traceEvents']
+
+    names = {e['tid']: e['args']['name'] for e in events if e['name'] == 'thread_name'}
+    spans = [e for e in events if e['ph'] == 'X']
+    assert len(names) == 3 and "worker-1" in names.values()
+    assert [(e['name'], e['ts'], e['dur']) for e in spans[:2]] == [('job', 0.0, 2e6), ('download', 0.0, 1e6)]
+    assert spans[0]['tid'] == spans[1]['tid'] and spans[0]['args'] == {'job': "url-a"}
+    assert spans[2]['tid'] != spans[3]['tid']
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+進捗イベントと集約表示のテスト
+"""
+
+import io
+import json
+import threading
+
+from progress import DOWNLOAD, FAILED, POSTPROCESS, ProgressReporter, parse_progress_line
+from yt_dlp_engine import PROGRESS_MARKER
+
+
+def progress_line(*fields):
+    return PROGRESS_MARKER + json.dumps(list(fields))
+
+
+def test_parse_progress_line():
+    """進捗行を型付きのイベントに変換し、値がない項目（NA）はNone、推定サイズは総バイト数の代わりに使うことを確認"""
+    event = parse_progress_line(progress_line("download", "abc", "downloading", 512, "NA", 2048.7, 100.5, "NA"), "url")
+    assert event.job == "url" and event.stage == DOWNLOAD and event.video_id == "abc"
+    assert (event.downloaded_bytes, event.total_bytes, event.speed, event.eta) == (512, 2048, 100.5, None)
+
+    event = parse_progress_line(progress_line("postprocess", "abc", "started", "Merger"))
+    assert event.stage == POSTPROCESS and event.detail == "Merger"
+
+    assert parse_progress_line("[download]  50.0% of 10.00MiB") is None
+    assert parse_progress_line(PROGRESS_MARKER + "{broken") is None
+
+
+def test_reporter_aggregates_jobs_and_writes_json_lines():
+    """動画・音声を別々にダウンロードしたジョブのバイト数を合算し、全イベントをJSON Linesで書き出すことを確認"""
+    out, json_out = io.StringIO(), io.StringIO()
+    reporter = ProgressReporter(out=out, json_out=json_out, interval=60)
+    with reporter:
+        for line in (progress_line("download", "a", "downloading", 300, 1000, None, 50.0, 14),
+                     progress_line("download", "a", "finished", 1000, 1000, None, None, None),
+                     progress_line("download", "a", "downloading", 200, 400, None, 25.0, 8),
+                     progress_line("download", "b", "downloading", 100, 900, None, 10.0, 80),
+                     "[download] Destination: b.mp4"):
+            reporter.observe("url-" + ("b" if '"b"' in line else "a"), line)
+        reporter.finish("url-b", False, "ERROR: boom")
+    assert reporter.snapshot() == {'active': 1, 'finished': 0, 'failed': 1, 'speed': 25.0, 'bytes': 1300}
+
+    events = [json.loads(line) for line in json_out.getvalue().splitlines()]
+    assert [e['stage'] for e in events] == [DOWNLOAD] * 4 + [FAILED]
+    assert events[-1]['detail'] == "ERROR: boom"
+    assert "📶 合計:" in out.getvalue()
+
+
+def test_captured_prints_are_not_interleaved():
+    """複数のスレッドが少しずつ書いた行が、表示スレッド経由で行単位のまま出力されることを確認"""
+    out = io.StringIO()
+    reporter = ProgressReporter(out=out, interval=60, render=False)
+
+    def worker(name):
+        for i in range(50):
+            print(f"{name}-", end="")
+            print(i)
+
+    with reporter, reporter.capture_stdout():
+        threads = [threading.Thread(target=worker, args=(name,)) for name in "xyz"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        reporter.finish("url", True)
+
+    lines = out.getvalue().splitlines()
+    assert sorted(lines) == sorted(f"{name}-{i}" for name in "xyz" for i in range(50))
+    assert reporter.snapshot()['finished'] == 1
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョブの再試行のテスト
+"""
+
+from retry_policy import PERMANENT, THROTTLED, TRANSIENT, RetryPolicy, classify_failure
+from yt_dlp_engine import DownloadResult
+
+
+def test_classify_failure():
+    assert classify_failure("ERROR: [youtube] abc: Video unavailable") == PERMANENT
+    assert classify_failure("ERROR: Python version 3.9 has been deprecated") == PERMANENT
+    assert classify_failure("ERROR: unable to download video data: HTTP Error 403: Forbidden") == THROTTLED
+    assert classify_failure("ERROR: HTTP Error 429: Too Many Requests") == THROTTLED
+    assert classify_failure("[download] Got error: Connection reset by peer") == TRANSIENT
+    assert classify_failure("ERROR: fragment 12 not found, unable to continue") == TRANSIENT
+    assert classify_failure("ERROR: something new") == PERMANENT
+    assert classify_failure("ERROR: HTTP Error 503: Service Unavailable") == TRANSIENT
+    assert classify_failure("ERROR: [youtube] abc: Read timed out.") == TRANSIENT
+    assert classify_failure("") == PERMANENT
+
+
+def test_deprecation_warning_does_not_mask_retryable_errors():
+    """毎回出力されるPythonの非推奨の警告があっても、403/429・通信エラーを再試行の対象とすることを確認"""
+    warning = ("WARNING: Python version 3.9 has been deprecated. Please update to Python 3.10 or above. "
+               "Support for 3.9 will be removed in a future version\n")
+    assert classify_failure(warning + "ERROR: unable to download video data: HTTP Error 403: Forbidden") == THROTTLED
+    assert classify_failure(warning + "ERROR: [Errno 104] Connection reset by peer") == TRANSIENT
+    assert classify_failure(warning + "ERROR: [youtube] abc: Private video") == PERMANENT
+
+
+def test_backoff_is_jittered_and_capped():
+    """待ち時間が指数的に伸び、上限で頭打ちになり、403/429は長めになることを確認"""
+    policy = RetryPolicy(max_attempts=10, base_delay=2.0, max_delay=30.0, throttle_multiplier=4.0, rng=lambda: 1.0)
+
+    assert [policy.delay(TRANSIENT, n) for n in (1, 2, 3, 4, 5)] == [2.0, 4.0, 8.0, 16.0, 30.0]
+    assert policy.delay(THROTTLED, 1) == 8.0
+
+    policy.rng = lambda: 0.25
+    assert policy.delay(TRANSIENT, 3) == 2.0
+
+
+def test_attempt_budget_and_permanent_errors():
+    """試行回数の上限で止まり、恒久的なエラー・中断・成功は再試行しないことを確認"""
+    policy = RetryPolicy(max_attempts=3, rng=lambda: 0.5)
+    transient = DownloadResult(False, error_output="ERROR: Connection reset by peer")
+
+    assert policy.next_delay(transient, 1)[1] is not None
+    assert policy.next_delay(transient, 2)[1] is not None
+    assert policy.next_delay(transient, 3) == (TRANSIENT, None)
+    assert policy.next_delay(DownloadResult(False, error_output="ERROR: Private video"), 1) == (PERMANENT, None)
+    assert policy.next_delay(DownloadResult(False, interrupted=True), 1) == (None, None)
+    assert policy.next_delay(DownloadResult(True), 1) == (None, None)
+
+
+def test_unrecognized_errors_are_not_retried():
+    """既知の一時的なエラーに当てはまらないERROR（ログインが必要な動画など）は再試行しないことを確認"""
+    policy = RetryPolicy(max_attempts=3, rng=lambda: 0.5)
+    for output in ("ERROR: [youtube] abc: Sign in to confirm you're not a bot",
+                   "ERROR: [youtube] abc: This live event will begin in a few moments."):
+        assert policy.next_delay(DownloadResult(False, error_output=output), 1) == (PERMANENT, None)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダウンロード・結合の2段のパイプラインのテスト
+"""
+
+import threading
+import time
+
+from staged_pipeline import CpuStep, StagedPipeline
+
+
+def test_downloads_continue_while_postprocessing():
+    """結合・変換の実行中もダウンロードのスレッドが次のジョブを進めることを確認"""
+    release = threading.Event()
+    downloaded = []
+
+    def merge(n):
+        release.wait(timeout=5)
+        return f"merged-{n}"
+
+    def download(n):
+        downloaded.append(n)
+        return CpuStep(merge, n)
+
+    with StagedPipeline(io_workers=1, cpu_workers=1, queue_size=2) as pipeline:
+        futures = [pipeline.submit(download, n) for n in range(3)]
+        # 1件目の結合が止まっていても、キューに空きがある限りダウンロードは進む
+        deadline = time.time() + 5
+        while len(downloaded) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert downloaded == [0, 1, 2]
+        assert not any(future.done() for future in futures)
+        release.set()
+
+    assert [future.result() for future in futures] == ["merged-0", "merged-1", "merged-2"]
+    report = pipeline.report()
+    assert report['download']['jobs'] == 3
+    assert report['postprocess']['jobs'] == 3
+
+
+def test_results_without_postprocess_and_errors():
+    """CpuStepを返さないジョブはそのまま完了し、例外はFutureに伝わることを確認"""
+    def fail():
+        raise RuntimeError("boom")
+
+    def broken_merge():
+        raise ValueError("bad merge")
+
+    with StagedPipeline(io_workers=2, cpu_workers=1) as pipeline:
+        plain = pipeline.submit(lambda: "skipped")
+        failed = pipeline.submit(fail)
+        failed_merge = pipeline.submit(lambda: CpuStep(broken_merge))
+
+    assert plain.result() == "skipped"
+    assert isinstance(failed.exception(), RuntimeError)
+    assert isinstance(failed_merge.exception(), ValueError)
+    assert pipeline.report()['postprocess']['jobs'] == 1
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部ツールの検出のテスト
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import toolchain
+from toolchain import TOOLCHAIN_CACHE_FILENAME, resolve_toolchain
+
+
+def make_tool(path, version, log):
+    """起動のたびにlogへ1行追記し、バージョンを出力する偽のyt-dlp"""
+    path.write_text(f"#!/bin/sh\necho probe >> '{log}'\necho {version}\n", encoding='utf-8')
+    path.chmod(0o755)
+    return path
+
+
+def probes(log):
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def resolve_with(candidates, cache_dir, forget=True):
+    """候補パスを差し替えて検出（forgetの場合はプロセス内の記憶を消して保存済みの結果から読み直す）"""
+    saved = dict(toolchain.TOOL_CANDIDATES)
+    toolchain.TOOL_CANDIDATES.clear()
+    toolchain.TOOL_CANDIDATES.update({'yt-dlp': candidates})
+    if forget:
+        toolchain._resolved.clear()
+    try:
+        return resolve_toolchain(cache_dir)
+    finally:
+        toolchain.TOOL_CANDIDATES.clear()
+        toolchain.TOOL_CANDIDATES.update(saved)
+
+
+def test_resolved_once_per_process():
+    """同じディレクトリでの2回目以降の検出はプロセス内の結果を返し、ツールを起動しないことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        log = tmp / "probes.log"
+        tool = make_tool(tmp / "yt-dlp", "2024.01.01", log)
+
+        first = resolve_with([str(tool)], tmp)
+        assert first.version('yt-dlp') == "2024.01.01" and probes(log) == 1
+        assert resolve_with([str(tool)], tmp, forget=False) is first
+        assert probes(log) == 1
+
+
+def test_persisted_probe_is_invalidated_by_path_and_mtime():
+    """保存済みの結果はパスと更新時刻が一致する場合のみ使い、どちらかが変わると再検出することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        log = tmp / "probes.log"
+        tool = make_tool(tmp / "yt-dlp", "2024.01.01", log)
+
+        resolve_with([str(tool)], tmp)
+        assert probes(log) == 1
+        saved = json.loads((tmp / TOOLCHAIN_CACHE_FILENAME).read_text(encoding='utf-8'))
+        assert saved[str(tool)]['version'] == "2024.01.01"
+
+        # 新しいプロセスでも保存済みの結果を使い、起動しない
+        assert resolve_with([str(tool)], tmp).version('yt-dlp') == "2024.01.01"
+        assert probes(log) == 1
+
+        # 更新（yt-dlp -U等）で更新時刻が変わった場合は再検出
+        make_tool(tool, "2025.02.02", log)
+        mtime = os.stat(tool).st_mtime + 10
+        os.utime(tool, (mtime, mtime))
+        assert resolve_with([str(tool)], tmp).version('yt-dlp') == "2025.02.02"
+        assert probes(log) == 2
+
+        # 別のパスで見つかった場合も再検出
+        (tmp / "bin").mkdir()
+        other = make_tool(tmp / "bin" / "yt-dlp", "2026.03.03", log)
+        assert resolve_with([str(other), str(tool)], tmp).path('yt-dlp') == str(other)
+        assert probes(log) == 3
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YouTube to MP3 ダウンローダー（youtube_to_mp3.py）のテスト
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from download_index import make_cache_key
+from staged_pipeline import CpuStep
+from toolchain import Toolchain
+from youtube_to_mp3 import YouTubeToMP3, playlist_folder_name
+from yt_dlp_engine import RESULT_MARKER, TAIL_LINES, SubprocessEngine
+
+# 偽のffmpeg: -iだけの場合はcodecの音声ストリームを報告し、ストリームコピーは入力を複製、
+# MP3へのエンコードはencode_okがFalseなら失敗する
+FAKE_FFMPEG = '''#!{python}
+import shutil, sys
+args = sys.argv[1:]
+if "-hide_banner" in args:
+    sys.stderr.write("  Stream #0:1[0x2](und): Audio: {codec} (mp4a / 0x6134706D), 44100 Hz, stereo\\n")
+    sys.exit(1)
+if "libmp3lame" in args and not {encode_ok}:
+    sys.stderr.write("encoder failed\\n")
+    sys.exit(1)
+shutil.copyfile(args[args.index("-i") + 1], args[-1])
+'''
+
+# 偽のyt-dlp: ネットワークから取得したものとして出力先にMP3を作成して報告する
+FAKE_YT_DLP = '''#!{python}
+import json, os, sys
+args = sys.argv[1:]
+path = os.path.join(os.path.dirname(args[args.index("--output") + 1]), "network.mp3")
+with open(path, "wb") as f:
+    f.write(b"n" * 7)
+print({marker!r} + json.dumps(["a", "251", path]))
+'''
+
+
+def write_script(path, text):
+    path.write_text(text, encoding='utf-8')
+    path.chmod(0o755)
+    return str(path)
+
+
+def local_audio_downloader(tmp, codec="aac", encode_ok=True, **options):
+    """動画ID「a」の動画ファイルを記録済みで、偽のffmpeg・yt-dlpを使うダウンローダー"""
+    tmp = Path(tmp)
+    bin_dir = tmp / "bin"
+    bin_dir.mkdir()
+    ffmpeg = write_script(bin_dir / "ffmpeg", FAKE_FFMPEG.format(python=sys.executable, codec=codec,
+                                                                 encode_ok=encode_ok))
+    yt_dlp = write_script(bin_dir / "yt-dlp", FAKE_YT_DLP.format(python=sys.executable, marker=RESULT_MARKER))
+    output_dir = tmp / "out"
+    downloader = YouTubeToMP3(output_dir, **options)
+    downloader.toolchain = Toolchain({'ffmpeg': {'path': ffmpeg, 'version': 'test'}})
+    downloader.engine = SubprocessEngine(yt_dlp)
+    (output_dir / "a.mp4").write_bytes(b"v" * 5)
+    downloader.download_index.put(make_cache_key("a", "720p"), "a.mp4", "720p", video_id="a", format_id="22")
+    return downloader, output_dir
+
+
+def test_mp3_skip_downloaded_playlist_entries():
+    """MP3のダウンロード済みの記録だけで除き、同じ動画の動画ファイルの記録とは区別することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeToMP3(tmp)
+        for name in ("a.mp3", "b.mp4"):
+            (Path(tmp) / name).touch()
+        downloader.download_index.put(downloader.cache_key("a", "320"), "a.mp3", "mp3-320", video_id="a")
+        downloader.download_index.put(make_cache_key("b", "720p"), "b.mp4", "720p", video_id="b")
+
+        stats = {'checked': 0, 'skipped': 0}
+        entries = [(video_id, f"{tmp}/%(title)s.%(ext)s") for video_id in ("a", "b")]
+        pending = list(downloader.skip_downloaded(iter(entries), "320", stats))
+
+        assert pending == [("https://www.youtube.com/watch?v=b", f"{tmp}/%(title)s.%(ext)s")]
+        assert stats == {'checked': 2, 'skipped': 1}
+        assert downloader.get_cached_download("https://www.youtube.com/watch?v=a", "320")
+        assert not downloader.get_cached_download("https://www.youtube.com/watch?v=a", "192")
+
+
+def test_native_audio_is_stream_copied_and_indexed_separately():
+    """無変換の形式は音質を指定せずに格納し、MP3の記録とは別に記録することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        mp3 = YouTubeToMP3(tmp)
+        native = YouTubeToMP3(tmp, audio_format='best')
+        args = native.audio_args("URL", "320", "%(title)s.%(ext)s")
+        assert args[args.index('--audio-format') + 1] == 'best'
+        assert '--audio-quality' not in args
+        assert '--embed-thumbnail' in args and '--embed-metadata' in args
+
+        (Path(tmp) / "a.mp3").touch()
+        mp3.download_index.put(mp3.cache_key("a", "320"), "a.mp3", mp3.index_quality("320"), video_id="a")
+        assert mp3.get_cached_download("https://www.youtube.com/watch?v=a", "320")
+        assert not native.get_cached_download("https://www.youtube.com/watch?v=a", "320")
+        assert native.cache_key("a", "320") == native.cache_key("a", "128") == make_cache_key("a", "audio-best")
+
+
+def test_mp3_finds_downloaded_video_of_same_id():
+    """MP3の変換元として、同じ動画IDの動画ファイルの記録（ファイルが存在するもの）だけを使うことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeToMP3(tmp)
+        index = downloader.download_index
+        (Path(tmp) / "a.mp4").touch()
+        (Path(tmp) / "a.mp3").touch()
+        index.put(make_cache_key("a", "1080p"), "missing.mp4", "1080p", video_id="a", timestamp=3)
+        index.put(make_cache_key("a", "mp3-320"), "a.mp3", "mp3-320", video_id="a", timestamp=2)
+        index.put(make_cache_key("a", "720p"), "a.mp4", "720p", video_id="a", timestamp=1)
+
+        assert [r['quality'] for r in index.find_by_video_id("a")] == ["1080p", "mp3-320", "720p"]
+        record, path = downloader.find_downloaded_video("a")
+        assert record['quality'] == "720p" and path == Path(tmp) / "a.mp4"
+        assert downloader.find_downloaded_video("b") is None
+
+
+def test_local_audio_respects_requested_codec():
+    """m4a/opusの指定と動画の音声のコーデックが異なる場合は取り出さず、同じ場合はストリームコピーすることを確認"""
+    url = "https://www.youtube.com/watch?v=a"
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader, output_dir = local_audio_downloader(tmp, codec="opus", audio_format='m4a')
+        template = str(output_dir / "%(title)s.%(ext)s")
+        assert downloader.probe_audio_codec(output_dir / "a.mp4") == "opus"
+        assert downloader.extract_local_audio(url, template) is None
+        assert sorted(p.name for p in output_dir.iterdir() if not p.name.startswith('.')) == ["a.mp4"]
+
+        downloader.audio_format = 'opus'
+        extracted = downloader.extract_local_audio(url, template)
+        assert Path(extracted.filepath) == output_dir / "a.local-a.opus" and extracted.filesize == 5
+        assert extracted.format_id == "22"
+        # 記録に成功するまでは回避したダウンロードとして数えない
+        assert downloader.local_stats == {'files': 0, 'bytes': 0}
+        result = downloader.finish_local_audio(url, "320", extracted)
+        assert result and Path(result.files[0].filepath) == output_dir / "a.opus"
+        assert not Path(extracted.filepath).exists()
+        assert downloader.get_cached_download(url, "320")['filename'] == "a.opus"
+        assert downloader.local_stats == {'files': 1, 'bytes': 5}
+
+
+def test_staged_encode_failure_falls_back_to_network():
+    """段階実行で取り出した音声の変換に失敗した場合、音声を削除してネットワークから取得することを確認"""
+    url = "https://www.youtube.com/watch?v=a"
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader, output_dir = local_audio_downloader(tmp, encode_ok=False)
+        downloader.split_encode = True
+        step = downloader.download_audio(url, "320", str(output_dir / "%(title)s.%(ext)s"))
+        assert isinstance(step, CpuStep) and (output_dir / "a.local-a.m4a").exists()
+
+        result = step.run()
+        assert result and Path(result.filepath) == output_dir / "network.mp3"
+        assert not (output_dir / "a.local-a.m4a").exists()
+        assert downloader.local_stats == {'files': 0, 'bytes': 0}
+        assert downloader.get_cached_download(url, "320")['filename'] == "network.mp3"
+
+
+def test_local_audio_is_encoded_to_mp3():
+    """取り出した音声をMP3に変換して記録し、取り出した音声は残さないことを確認"""
+    url = "https://www.youtube.com/watch?v=a"
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader, output_dir = local_audio_downloader(tmp)
+        downloader.split_encode = True
+        result = downloader.download_audio(url, "320", str(output_dir / "%(title)s.%(ext)s")).run()
+
+        assert result and Path(result.filepath) == output_dir / "a.mp3"
+        assert not (output_dir / "a.local-a.m4a").exists()
+        assert downloader.local_stats == {'files': 1, 'bytes': 5}
+        assert downloader.get_cached_download(url, "320")['filename'] == "a.mp3"
+
+
+def test_mp3_output_is_streamed_with_bounded_tail(capsys):
+    """MP3のダウンロードはyt-dlpの出力を1行ずつ処理し、末尾の行だけを保持することを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = YouTubeToMP3(tmp, enable_cache=False)
+        downloader.engine = SubprocessEngine(sys.executable)
+        seen = []
+        code = "for i in range(5000): print(f'[download] {i / 50:.1f}% of 1MiB')"
+        result = downloader.run_with_retry(['-c', code], on_output=seen.append, echo=False)
+
+        assert result.ok and len(seen) == 5000
+        assert result.stderr.splitlines() == seen[-TAIL_LINES:]
+
+        show = downloader.job_progress("https://www.youtube.com/watch?v=abc")
+        for line in seen:
+            show(line)
+        printed = capsys.readouterr().out.splitlines()
+        assert [line.split()[2] for line in printed] == ['25.0%', '50.0%', '75.0%', '100.0%']
+
+
+def test_local_audio_never_replaces_recorded_files():
+    """取り出した音声が、同じ名前で記録済みの音声（--audio-format bestで保存したものなど）を上書き・削除しないことを確認"""
+    url = "https://www.youtube.com/watch?v=a"
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader, output_dir = local_audio_downloader(tmp)
+        (output_dir / "a.m4a").write_bytes(b"best")
+        downloader.download_index.put(make_cache_key("a", "audio-best"), "a.m4a", "audio-best", video_id="a")
+        # 記録されたファイルが削除済みでも、その名前は使わない
+        downloader.download_index.put(make_cache_key("b", "mp3-320"), "a.mp3", "mp3-320", video_id="b")
+
+        result = downloader.download_audio(url, "320", str(output_dir / "%(title)s.%(ext)s"))
+        assert result and Path(result.files[0].filepath) == output_dir / "a [a].mp3"
+        assert (output_dir / "a.m4a").read_bytes() == b"best"
+        assert downloader.get_cached_download(url, "320")['filename'] == "a [a].mp3"
+        assert sorted(p.name for p in output_dir.iterdir() if not p.name.startswith('.')) == \
+            ["a [a].mp3", "a.m4a", "a.mp4"]
+
+
+def test_playlist_folder_name_is_a_valid_path():
+    """プレイリスト名をyt-dlpと同じく全角の文字に置き換え、末尾の.と空白を除き、%をエスケープすることを確認"""
+    assert playlist_folder_name('Best: "Hits" <2024>?*|/x. ') == 'Best： ＂Hits＂ ＜2024＞？＊｜⧸x'
+    assert playlist_folder_name('Mix 100%') == 'Mix 100%%'
+    assert playlist_folder_name('...') == '_'
+    assert playlist_folder_name('Live 10:20') == 'Live 10_20'
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yt-dlp実行エンジンのテスト
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import types
+from pathlib import Path
+
+import yt_dlp_engine
+from yt_dlp_engine import RESULT_MARKER, SubprocessEngine, parse_result_line
+from youtube_video_downloader import YouTubeVideoDownloader
+
+
+class FakeYoutubeDL:
+    """生成されたインスタンスを記録するYoutubeDLの代わり"""
+
+    created = []
+
+    def __init__(self, params):
+        self.params = dict(params)
+        self.format_selector = None
+        self.downloads = []
+        FakeYoutubeDL.created.append(self)
+
+    def build_format_selector(self, format_spec):
+        return format_spec
+
+    def download(self, urls):
+        """URLに「fail」を含む場合は失敗（YoutubeDLと同じく以後の戻り値も失敗のまま）、それ以外はURLを出力"""
+        self.downloads.append(list(urls))
+        for url in urls:
+            if 'fail' in url:
+                self.params['logger'].error(f"ERROR: {url}: failed")
+                self.retcode = 1
+            else:
+                self.params['logger'].debug(url)
+        return getattr(self, 'retcode', 0)
+
+
+def fake_parse_options(args):
+    """yt_dlp.parse_optionsの代わり（-fとURLのみ解釈）"""
+    args = list(args)
+    format_spec = args[args.index('-f') + 1] if '-f' in args else None
+    urls = [arg for arg in args if arg.startswith('https://')]
+    return types.SimpleNamespace(ydl_opts={'format': format_spec, 'quiet': True},
+                                 options=types.SimpleNamespace(load_info_filename=None), urls=urls)
+
+
+FAKE_YT_DLP = types.SimpleNamespace(
+    YoutubeDL=FakeYoutubeDL,
+    parse_options=fake_parse_options,
+    version=types.SimpleNamespace(__version__='2099.01.01'),
+    utils=types.SimpleNamespace(DownloadError=RuntimeError),
+)
+
+
+def test_inprocess_engine_and_youtubedl_are_reused():
+    """ダウンロードのたびに同じエンジンを使い、スレッドごとのYoutubeDLを使い回すことを確認"""
+    original = yt_dlp_engine.yt_dlp
+    yt_dlp_engine.yt_dlp = FAKE_YT_DLP
+    FakeYoutubeDL.created = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = YouTubeVideoDownloader(output_dir=tmp, enable_cache=False, engine='inprocess')
+            assert downloader.check_yt_dlp()
+            engine = downloader.engine
+            assert downloader.check_yt_dlp() and downloader.engine is engine
+
+            for format_spec in ('18', '22', '18'):
+                assert engine.run(['-f', format_spec, 'https://www.youtube.com/watch?v=abc']).ok
+            assert len(FakeYoutubeDL.created) == 1
+            ydl = FakeYoutubeDL.created[0]
+            assert len(ydl.downloads) == 3 and ydl.params['format'] == '18'
+
+            # 別のスレッドでは専用のインスタンスを生成
+            worker = threading.Thread(target=engine.run, args=(['https://www.youtube.com/watch?v=def'],))
+            worker.start()
+            worker.join()
+            assert len(FakeYoutubeDL.created) == 2 and FakeYoutubeDL.created[1] is not ydl
+    finally:
+        yt_dlp_engine.yt_dlp = original
+
+
+def test_inprocess_engine_discards_failed_youtubedl_and_reuses_reader():
+    """失敗したYoutubeDLは再利用せず、iter_linesは1つの読み取りスレッドとそのYoutubeDLを使い回すことを確認"""
+    original = yt_dlp_engine.yt_dlp
+    yt_dlp_engine.yt_dlp = FAKE_YT_DLP
+    FakeYoutubeDL.created = []
+    try:
+        engine = yt_dlp_engine.InProcessEngine()
+        failed = engine.run(['https://www.youtube.com/watch?v=fail'])
+        assert not failed.ok and "failed" in failed.stderr
+        assert engine.run(['https://www.youtube.com/watch?v=abc']).ok
+        assert len(FakeYoutubeDL.created) == 2
+
+        threads = set(threading.enumerate())
+        for video_id in ('a', 'b', 'c'):
+            url = f'https://www.youtube.com/watch?v={video_id}'
+            assert list(engine.iter_lines([url])) == [url]
+        readers = set(threading.enumerate()) - threads
+        assert [thread.name for thread in readers] == ['yt-dlp-reader']
+        assert len(FakeYoutubeDL.created) == 3
+    finally:
+        yt_dlp_engine.yt_dlp = original
+
+
+def result_line(video_id, format_id, filepath):
+    """RESULT_PRINT_ARGSでyt-dlpが出力する報告行（%(...)jはJSON）"""
+    return RESULT_MARKER + "[" + ",".join(json.dumps(v) for v in (video_id, format_id, filepath)) + "]"
+
+
+def test_parse_result_line():
+    """報告行からファイルのパス・形式ID・サイズを取り出すことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        odd = Path(tmp) / 'タブ\tと"引用符",カンマ [NA].mp4'
+        odd.write_bytes(b"x" * 10)
+
+        parsed = parse_result_line(result_line("abc", "137+140", str(odd)))
+        assert parsed == ("abc", "137+140", str(odd), 10)
+
+        # ファイルが既にない場合はサイズ不明、値のない項目（"NA"）はNone
+        missing = parse_result_line(result_line("abc", "NA", str(Path(tmp) / "gone.mp4")))
+        assert missing.format_id is None and missing.filesize is None
+
+    assert parse_result_line(result_line("abc", "18", "NA")) is None
+    assert parse_result_line(RESULT_MARKER + "[\"abc\", \"18\"") is None
+    assert parse_result_line("[download] Destination: a.mp4") is None
+
+
+def test_subprocess_engine_collects_reported_files():
+    """リアルタイム出力から報告行を取り除き、出力ファイルとして返すことを確認"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "動画\tタイトル.mp4"
+        output.write_bytes(b"x" * 5)
+        fake = Path(tmp) / "yt-dlp"
+        lines = ["[download] Destination: a.mp4", result_line("abc", "22", str(output))]
+        fake.write_text(f"#!{sys.executable}\nfor line in {lines!r}:\n    print(line)\n", encoding='utf-8')
+        fake.chmod(0o755)
+
+        seen = []
+        result = SubprocessEngine(str(fake)).run(["https://www.youtube.com/watch?v=abc"], stream=True,
+                                                 on_output=seen.append, echo=False)
+
+    assert result.ok and result.files == [("abc", "22", str(output), 5)]
+    assert seen == ["[download] Destination: a.mp4"] and RESULT_MARKER not in result.stderr
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部ツール（yt-dlp, ffmpeg, aria2c）の検出
+プロセス内で1度だけ検出し、結果を出力ディレクトリに保存して次回以降の起動でも再利用します
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+TOOLCHAIN_CACHE_FILENAME = ".toolchain_cache.json"
+
+# 各ツールの候補パスとバージョン取得方法
+TOOL_CANDIDATES = {
+    'yt-dlp': [
+        'yt-dlp',  # PATHにある場合
+        '/Users/natuki/Library/Python/3.9/bin/yt-dlp',  # macOSの一般的なパス
+        '/usr/local/bin/yt-dlp',  # Homebrewのパス
+        '/opt/homebrew/bin/yt-dlp'  # Apple Silicon MacのHomebrewパス
+    ],
+    'ffmpeg': [
+        'ffmpeg',
+        '/usr/local/bin/ffmpeg',
+        '/opt/homebrew/bin/ffmpeg'
+    ],
+    'aria2c': [
+        'aria2c',
+        '/usr/local/bin/aria2c',
+        '/opt/homebrew/bin/aria2c'
+    ],
+}
+
+VERSION_ARGS = {
+    'yt-dlp': ['--version'],
+    'ffmpeg': ['-version'],
+    'aria2c': ['--version'],
+}
+
+_lock = threading.Lock()
+_resolved = {}
+
+
+class Toolchain:
+    """検出済みツールのパスとバージョン"""
+
+    def __init__(self, tools):
+        # tools: {ツール名: {'path': ..., 'version': ..., 'startup_s': ...} または None}
+        self.tools = tools
+
+    def path(self, name):
+        info = self.tools.get(name)
+        return info['path'] if info else None
+
+    def version(self, name):
+        info = self.tools.get(name)
+        return info['version'] if info else None
+
+    def has(self, name):
+        return self.tools.get(name) is not None
+
+    def startup_time(self, name):
+        """バージョン確認で計測した起動時間（秒、不明な場合None）"""
+        info = self.tools.get(name)
+        return info.get('startup_s') if info else None
+
+
+def _locate(candidate):
+    """候補を実在する絶対パスに解決（見つからない場合None）"""
+    if os.sep in candidate:
+        return candidate if os.path.isfile(candidate) and os.access(candidate, os.X_OK) else None
+    return shutil.which(candidate)
+
+
+def _probe_version(name, path):
+    """
+    バージョン取得コマンドを実行
+
+    Returns:
+        tuple: (バージョン文字列, 起動から終了までの秒数)（失敗した場合(None, None)）
+    """
+    start = time.perf_counter()
+    try:
+        result = subprocess.run([path] + VERSION_ARGS[name],
+                                capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None, None
+    elapsed = time.perf_counter() - start
+    lines = result.stdout.strip().splitlines()
+    return (lines[0].strip() if lines else ''), elapsed
+
+
+def _load_persisted(cache_file):
+    if cache_file is None or not cache_file.exists():
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _save_persisted(cache_file, data):
+    if cache_file is None:
+        return
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except IOError:
+        pass
+
+
+def _resolve_tool(name, persisted):
+    """
+    1つのツールを検出
+
+    保存済みの結果がパスと更新時刻で一致する場合は、バージョン確認のプロセスを起動しません。
+    """
+    for candidate in TOOL_CANDIDATES[name]:
+        path = _locate(candidate)
+        if not path:
+            continue
+
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+
+        cached = persisted.get(path)
+        if (cached and cached.get('mtime') == mtime and cached.get('version') is not None
+                and 'startup_s' in cached):
+            return {'path': path, 'version': cached['version'], 'startup_s': cached['startup_s']}, False
+
+        version, startup = _probe_version(name, path)
+        if version is not None:
+            persisted[path] = {'mtime': mtime, 'version': version, 'startup_s': round(startup, 4)}
+            return {'path': path, 'version': version, 'startup_s': round(startup, 4)}, True
+
+    return None, False
+
+
+def resolve_toolchain(cache_dir=None, refresh=False):
+    """
+    yt-dlp, ffmpeg, aria2cを検出（プロセス内で1度だけ実行）
+
+    Args:
+        cache_dir (str|Path): 検出結果を保存するディレクトリ（Noneの場合は保存しない）
+        refresh (bool): 保存済みの結果を無視して再検出するか
+
+    Returns:
+        Toolchain: 検出結果
+    """
+    cache_file = Path(cache_dir) / TOOLCHAIN_CACHE_FILENAME if cache_dir else None
+    key = str(cache_file)
+
+    with _lock:
+        if not refresh and key in _resolved:
+            return _resolved[key]
+
+        persisted = {} if refresh else _load_persisted(cache_file)
+        tools = {}
+        changed = False
+        for name in TOOL_CANDIDATES:
+            tools[name], probed = _resolve_tool(name, persisted)
+            changed = changed or probed
+
+        if changed:
+            _save_persisted(cache_file, persisted)
+
+        toolchain = _resolved[key] = Toolchain(tools)
+        return toolchain
@@ -11,48 +11,458 @@ import subprocess
 import argparse
 from pathlib import Path
 import re
+import concurrent.futures
+import itertools
+import threading
+from urllib.parse import urlparse, parse_qs
+
+from circuit_breaker import CircuitBreaker
+from dedup import Deduplicator
+from download_index import INDEX_FILENAME, LEGACY_CACHE_FILENAME, DownloadIndex, make_cache_key
+from listing import OUTPUT_FORMATS, SORT_KEYS, list_files, positive_int
+from retry_policy import DEFAULT_MAX_ATTEMPTS, RetryPolicy, describe_failure
+from staged_pipeline import CpuStep, StagedPipeline
+from toolchain import resolve_toolchain
+from yt_dlp_engine import ENGINE_CHOICES, RESULT_PRINT_ARGS, DownloadedFile, DownloadResult, create_engine
+
+try:
+    from yt_dlp.utils import sanitize_filename
+except ImportError:  # yt-dlpがモジュールとして導入されていない場合（playlist_folder_nameで同じ置き換えを行う）
+    sanitize_filename = None
+
+DEFAULT_MAX_WORKERS = 3
+# 列挙した動画IDをまとめてインデックスと照合する件数（YouTubeのプレイリスト1ページ分）
+SKIP_CHECK_BATCH = 100
+# 音声の保存形式（mp3のみ再エンコード、それ以外は元の音声をそのままコンテナに格納）
+AUDIO_FORMATS = ['mp3', 'best', 'm4a', 'opus']
+# 無変換で格納できる音声を優先して選ぶyt-dlpの形式指定
+NATIVE_AUDIO_SELECTORS = {
+    'best': 'bestaudio/best',                       # 最良の音声（AACはm4a、Opusはopusに格納）
+    'm4a': 'bestaudio[ext=m4a]/bestaudio/best',     # AACがない場合のみAACに変換
+    'opus': 'bestaudio[acodec=opus]/bestaudio/best',  # Opusがない場合のみOpusに変換
+}
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.opus', '.ogg')
+# インデックスの画質の欄のうち、このツールの記録（動画ファイル以外）を表す接頭辞
+AUDIO_INDEX_PREFIXES = ('mp3-', 'audio-')
+# 音声コーデックと、無変換で格納するコンテナ（yt-dlpの--audio-format bestと同じ対応）
+NATIVE_AUDIO_CONTAINERS = {'aac': 'm4a', 'opus': 'opus', 'vorbis': 'ogg', 'mp3': 'mp3'}
+# ffmpeg -i の出力から最初の音声ストリームのコーデックを取得
+AUDIO_CODEC_PATTERN = re.compile(r'Stream #\S+.*?: Audio: (\w+)')
+# 並列ダウンロード中に表示する進捗の間隔（%）と、そのまま表示する行
+PROGRESS_PATTERN = re.compile(r'\[download\]\s+(\d+(?:\.\d+)?)%')
+PROGRESS_STEP = 25
+NOTABLE_PREFIXES = ('[ExtractAudio]', '[EmbedThumbnail]', 'ERROR', 'WARNING')
+# 動画から取り出した音声の中間ファイル名（「動画名.local-動画ID.拡張子」）
+LOCAL_AUDIO_INFIX = '.local-'
+
+# ファイル名に使えない文字（yt-dlpは全角の文字に置き換える）
+UNSAFE_FILENAME_CHARS = '"*:<>?|/\\'
+
+
+def _sanitize_filename(name):
+    """yt-dlpのsanitize_filename（restricted=False）と同じ置き換え（yt-dlpをモジュールとして使えない場合）"""
+    name = re.sub(r'[0-9]+(?::[0-9]+)+', lambda m: m.group(0).replace(':', '_'), name)  # 時刻の:
+    chars = []
+    for char in name:
+        if char == '\n':
+            chars.append('\0 ')
+        elif char in UNSAFE_FILENAME_CHARS:
+            chars.append({'/': '\u29f8', '\\': '\u29f9'}.get(char, chr(ord(char) + 0xfee0)))
+        elif ord(char) < 32 or ord(char) == 127:
+            continue
+        else:
+            chars.append(char)
+    result = re.sub(r'(\0.)(?:(?=\1)..)+', r'\1', ''.join(chars))  # 連続した改行
+    strip = r'(?:\0.|[ _-])*'
+    result = re.sub(f'^\0.{strip}|{strip}\0.$', '', result).replace('\0', '') or '_'
+    result = result.strip('_')
+    if result.startswith('-'):
+        result = '_' + result[1:]
+    return result.lstrip('.') or '_'
+
+
+def playlist_folder_name(title):
+    """
+    プレイリスト名を出力フォルダ名に変換
+
+    yt-dlpが出力テンプレートの%(playlist_title)sに行う置き換え（sanitize_filename）に加え、
+    Windowsで使えない末尾の.と空白を取り除き、%は出力テンプレート用にエスケープします。
+    """
+    name = sanitize_filename(title) if sanitize_filename else _sanitize_filename(title)
+    return (name.rstrip('. ') or '_').replace('%', '%%')
+
 
 class YouTubeToMP3:
-    def __init__(self, output_dir="downloads"):
+    def __init__(self, output_dir="downloads", engine="subprocess", max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 max_workers=DEFAULT_MAX_WORKERS, enable_cache=True, staged=False, audio_format='mp3'):
         """
         YouTubeToMP3クラスの初期化
         
         Args:
             output_dir (str): ダウンロード先ディレクトリ
+            engine (str): yt-dlpの実行方式 ('subprocess' または 'inprocess')
+            max_attempts (int): 最大試行回数（一時的な失敗・403/429の再試行を含む）
+            max_workers (int): プレイリスト・複数動画の並列ダウンロードの最大数
+            enable_cache (bool): ダウンロード済みインデックスを使用するか
+            staged (bool): 並列ダウンロード時にMP3変換をダウンロードと別のステージ（コア数のスレッド）で行うか
+            audio_format (str): 保存形式（'mp3'=指定音質で再エンコード, 'best'/'m4a'/'opus'=無変換で格納）
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.yt_dlp_path = None
+        self.engine_backend = engine
+        self.engine = None
+        self.toolchain = None
+        self.retry_policy = RetryPolicy(max_attempts=max_attempts)
+        self.max_workers = max(1, max_workers)
+        self.breaker = None  # 並列ダウンロード中のみ使用
+        self.staged = staged
+        self.split_encode = False  # 段階実行中（MP3変換をCPUステージに回す）
+        self.audio_format = audio_format
+        # 動画ダウンロードと同じインデックスに「動画ID_mp3-音質」（無変換の形式は「動画ID_audio-形式」）のキーで記録
+        self.enable_cache = enable_cache
+        self.download_index = DownloadIndex(self.output_dir / INDEX_FILENAME,
+                                            legacy_json=self.output_dir / LEGACY_CACHE_FILENAME) if enable_cache else None
+        self.deduplicator = Deduplicator(self.download_index, self.output_dir) if enable_cache else None
+        # ダウンロード済みの動画ファイルから音声を取り出した件数と、その音声のサイズ（ダウンロードを回避したバイト数）
+        self.lock = threading.Lock()
+        self.local_stats = {'files': 0, 'bytes': 0}
         
     def check_yt_dlp(self):
         """
         yt-dlpがインストールされているかチェック
         
+        ツールの検出はプロセス内で1度だけ行い、結果は出力ディレクトリに保存されます。
+        
         Returns:
             bool: yt-dlpが利用可能な場合True
         """
-        # yt-dlpのパスを探す
-        yt_dlp_paths = [
-            'yt-dlp',  # PATHにある場合
-            '/Users/natuki/Library/Python/3.9/bin/yt-dlp',  # macOSの一般的なパス
-            '/usr/local/bin/yt-dlp',  # Homebrewのパス
-            '/opt/homebrew/bin/yt-dlp'  # Apple Silicon MacのHomebrewパス
-        ]
+        # 検出済みの場合は何もしない
+        if self.engine is not None:
+            return True
         
-        for path in yt_dlp_paths:
+        self.toolchain = resolve_toolchain(self.output_dir)
+        if not self.toolchain.has('ffmpeg'):
+            print("⚠️  ffmpegが見つかりません（音声・動画の変換に失敗する可能性があります）")
+        
+        # プロセス内エンジンはyt_dlpモジュールを直接使用
+        if self.engine_backend == 'inprocess':
             try:
-                result = subprocess.run([path, '--version'], 
-                                      capture_output=True, text=True, check=True)
-                print(f"yt-dlp バージョン: {result.stdout.strip()}")
-                self.yt_dlp_path = path
-                return True
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
+                self.engine = create_engine('inprocess')
+            except RuntimeError as e:
+                print(f"エラー: {e}")
+                return False
+            print(f"yt-dlp バージョン: {self.engine.version()} (プロセス内エンジン)")
+            return True
+        
+        path = self.toolchain.path('yt-dlp')
+        if path:
+            print(f"yt-dlp バージョン: {self.toolchain.version('yt-dlp')}")
+            self.yt_dlp_path = path
+            self.engine = create_engine('subprocess', path)
+            return True
         
         print("エラー: yt-dlpがインストールされていません")
         print("インストール方法: pip install yt-dlp")
         return False
     
+    def get_video_id(self, url):
+        """YouTube URLから動画IDを抽出"""
+        if 'youtube.com/watch' in url:
+            return parse_qs(urlparse(url).query).get('v', [None])[0]
+        elif 'youtu.be/' in url:
+            return url.split('youtu.be/')[-1].split('?')[0]
+        return None
+    
+    def index_quality(self, quality):
+        """
+        インデックスに記録する画質の欄（動画ダウンロードの記録と区別するため、mp3-音質 または audio-形式）
+        
+        無変換の形式では音質の指定を使わないため、音質を含めません。
+        """
+        if self.audio_format == 'mp3':
+            return f"mp3-{quality}"
+        return f"audio-{self.audio_format}"
+    
+    def cache_key(self, video_id, quality):
+        """インデックスのキー"""
+        return make_cache_key(video_id, self.index_quality(quality))
+    
+    def format_label(self, quality):
+        """保存形式の表示用の説明"""
+        if self.audio_format == 'mp3':
+            return f"MP3 {quality}kbps"
+        if self.audio_format == 'best':
+            return "無変換 (最良の音声をm4a/opusに格納)"
+        return f"無変換 ({self.audio_format}の音声を優先)"
+    
+    def get_cached_download(self, url, quality):
+        """
+        ダウンロード済みの記録を取得
+        
+        Returns:
+            dict: インデックスの記録（未ダウンロード・ファイルが存在しない場合None）
+        """
+        video_id = self.get_video_id(url)
+        if not self.enable_cache or not video_id:
+            return None
+        record = self.download_index.get(self.cache_key(video_id, quality))
+        if record and (self.output_dir / record['filename']).exists():
+            return record
+        return None
+    
+    def add_to_cache(self, url, quality, files):
+        """yt-dlpが報告した出力ファイルをインデックスに記録"""
+        video_id = self.get_video_id(url)
+        if not self.enable_cache or not video_id:
+            return
+        for downloaded in files:
+            path = Path(downloaded.filepath).resolve()
+            try:
+                filename = str(path.relative_to(self.output_dir.resolve()))
+            except ValueError:
+                filename = str(path)
+            self.download_index.put(self.cache_key(video_id, quality), filename, self.index_quality(quality),
+                                    video_id=video_id, filesize=downloaded.filesize,
+                                    format_id=downloaded.format_id)
+    
+    def dedup_downloads(self, hardlink=False):
+        """
+        出力ディレクトリ全体の重複排除（前回から追加・変更されたファイルのみハッシュを計算）
+        
+        Args:
+            hardlink (bool): reflinkに対応していない場合にハードリンクに置き換えるか
+        
+        Returns:
+            bool: 実行できた場合True
+        """
+        if self.deduplicator is None:
+            print("❌ 重複排除にはダウンロード済みインデックスが必要です（--no-cacheとは併用できません）")
+            return False
+        self.deduplicator.hardlink = hardlink
+        print(f"🔍 重複排除: {self.output_dir}")
+        self.deduplicator.scan()
+        self.deduplicator.print_summary()
+        return True
+    
+    def split_downloaded(self, video_ids, quality):
+        """
+        動画IDをまとめてインデックスと照合
+        
+        Returns:
+            tuple: (未ダウンロードの動画IDのリスト, ダウンロード済みの件数)
+        """
+        if not self.enable_cache:
+            return list(video_ids), 0
+        records = self.download_index.get_many(self.cache_key(video_id, quality) for video_id in video_ids)
+        pending = []
+        for video_id in video_ids:
+            record = records.get(self.cache_key(video_id, quality))
+            if record is None or not (self.output_dir / record['filename']).exists():
+                pending.append(video_id)
+        return pending, len(video_ids) - len(pending)
+    
+    def find_downloaded_video(self, video_id):
+        """
+        動画ダウンロード（youtube_video_downloader.py）で保存済みの動画ファイルを検索
+        
+        Returns:
+            tuple: (インデックスの記録, ファイルのパス)（新しい記録から順に、ファイルが存在する最初のもの。ない場合None）
+        """
+        if not self.enable_cache or not video_id:
+            return None
+        for record in self.download_index.find_by_video_id(video_id):
+            if (record['quality'] or '').startswith(AUDIO_INDEX_PREFIXES):
+                continue
+            path = self.output_dir / record['filename']
+            if path.exists():
+                return record, path
+        return None
+    
+    def probe_audio_codec(self, path):
+        """ffmpegで最初の音声ストリームのコーデック名を取得（音声がない場合None）"""
+        result = subprocess.run([self.toolchain.path('ffmpeg'), '-hide_banner', '-i', str(path)],
+                                capture_output=True, text=True)
+        match = AUDIO_CODEC_PATTERN.search(result.stderr)
+        return match.group(1) if match else None
+    
+    def extract_local_audio(self, url, output_template):
+        """
+        ダウンロード済みの動画ファイルから音声をストリームコピーで取り出す
+        
+        取り出した音声はyt-dlpがネットワークから取得する音声と同じです（回避したバイト数はfinish_local_audioで
+        仕上げに成功した場合のみ集計）。m4a/opusの指定と異なるコーデックの場合は、変換せずにネットワークから取得します。
+        同じ名前のファイル（--audio-format bestで保存した音声など）を上書きしないよう、動画IDを含む中間ファイル
+        （「動画名.local-動画ID.拡張子」）に取り出し、finish_local_audioで記録する際に最終的な名前に移動します。
+        サムネイルとyt-dlpが書き込むタグはネットワークが必要なため埋め込まず、動画ファイルのタグのみ引き継ぎます。
+        
+        Args:
+            url (str): YouTube動画のURL
+            output_template (str): 出力ファイル名のテンプレート（保存先のフォルダに使用）
+        
+        Returns:
+            DownloadedFile: 取り出した音声（動画ファイルがない・取り出せない場合None）
+        """
+        if not self.toolchain or not self.toolchain.has('ffmpeg'):
+            return None
+        video_id = self.get_video_id(url)
+        found = self.find_downloaded_video(video_id)
+        if not found:
+            return None
+        record, video = found
+        ext = NATIVE_AUDIO_CONTAINERS.get(self.probe_audio_codec(video))
+        if ext is None or (self.audio_format in ('m4a', 'opus') and ext != self.audio_format):
+            return None
+        
+        output = Path(output_template).parent / f"{video.stem}{LOCAL_AUDIO_INFIX}{video_id}.{ext}"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [self.toolchain.path('ffmpeg'), '-y', '-loglevel', 'error', '-i', str(video),
+               '-map', '0:a:0', '-c:a', 'copy', '-map_metadata', '0', str(output)]
+        if subprocess.run(cmd, capture_output=True, text=True).returncode != 0:
+            output.unlink(missing_ok=True)
+            return None
+        return DownloadedFile(video_id, record['format_id'], str(output), output.stat().st_size)
+    
+    def place_local_audio(self, path, extracted):
+        """
+        取り出した音声（またはそのMP3）を最終的な名前に移動
+        
+        動画と同じ名前（「動画名.拡張子」）を使い、既存のファイル・インデックスに記録されたファイルがある場合は
+        「動画名 [動画ID].拡張子」、それも使えない場合は中間ファイルの名前のままにします。
+        
+        Args:
+            path (Path): 移動するファイル
+            extracted (DownloadedFile): extract_local_audioで取り出した音声（中間ファイル）
+        
+        Returns:
+            Path: 移動後のパス
+        """
+        stem = Path(extracted.filepath).name.rpartition(LOCAL_AUDIO_INFIX)[0]
+        folder = Path(path).parent
+        with self.lock:  # 同じ名前の動画を並行して処理する場合に同じ名前を選ばないよう
+            for name in (f"{stem}{path.suffix}", f"{stem} [{extracted.video_id}]{path.suffix}"):
+                candidate = folder / name
+                if candidate.exists() or self.is_recorded_file(candidate):
+                    continue
+                os.replace(path, candidate)
+                return candidate
+        return path
+    
+    def is_recorded_file(self, path):
+        """インデックスにいずれかの記録のファイルとして記録されているか"""
+        try:
+            filename = str(Path(path).resolve().relative_to(self.output_dir.resolve()))
+        except ValueError:
+            filename = str(Path(path).resolve())
+        return self.download_index.has_filename(filename)
+    
+    def finish_local_audio(self, url, quality, extracted):
+        """
+        動画ファイルから取り出した音声を保存形式に合わせて仕上げる（mp3はエンコード、それ以外はそのまま記録）
+        
+        成功した場合のみ、取り出した音声のサイズをダウンロードを回避したバイト数として集計します。
+        
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        if self.audio_format == 'mp3':
+            result = self.encode_mp3(url, quality, extracted, local=True)
+            if not result:
+                Path(extracted.filepath).unlink(missing_ok=True)  # 取り出した音声は残さない（ネットワークから再取得）
+                return result
+        else:
+            output = self.place_local_audio(Path(extracted.filepath), extracted)
+            placed = extracted._replace(filepath=str(output))
+            self.add_to_cache(url, quality, [placed])
+            result = DownloadResult(True, [placed])
+        with self.lock:
+            self.local_stats['files'] += 1
+            self.local_stats['bytes'] += extracted.filesize or 0
+        return result
+    
+    def encode_local_audio(self, url, quality, output_template, extracted):
+        """
+        段階実行のCPUステージ: 取り出した音声をMP3に変換（失敗した場合はネットワークから取得し、yt-dlpで変換）
+        
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        result = self.finish_local_audio(url, quality, extracted)
+        if result:
+            return result
+        print(f"   [{self.get_video_id(url) or url}] 取り出した音声の変換に失敗したため、ネットワークから取得します")
+        return self.download_from_network(url, quality, output_template)
+    
+    def audio_args(self, url, quality, output_template):
+        """
+        音声ダウンロード用のyt-dlp引数（出力ファイルの報告を含む）
+        
+        mp3以外の形式では最良の音声を選び、再エンコードせずに（-c:a copy）m4a/opusのコンテナに格納します。
+        """
+        if self.audio_format == 'mp3':
+            conversion = [
+                '--audio-format', 'mp3',     # MP3形式に変換
+                '--audio-quality', quality,  # 音質設定
+            ]
+        else:
+            conversion = [
+                '--format', NATIVE_AUDIO_SELECTORS[self.audio_format],
+                '--audio-format', self.audio_format,  # 同じコーデックならストリームコピー
+            ]
+        return [
+            '--extract-audio',           # 音声のみ抽出
+            *conversion,
+            '--embed-metadata',          # タイトル・アーティストなどのタグを書き込み
+            '--embed-thumbnail',         # サムネイルを埋め込み
+            '--output', output_template, # 出力先
+            '--no-playlist',             # プレイリストの場合は最初の動画のみ
+            *RESULT_PRINT_ARGS,          # 出力ファイルをインデックスに記録するため
+            url
+        ]
+    
+    def source_audio_args(self, url, output_template):
+        """段階実行用: 変換せずに最良の音声とサムネイルを保存するyt-dlp引数"""
+        return [
+            '--format', 'bestaudio/best',
+            '--write-thumbnail',                # サムネイルを保存（変換時に埋め込み）
+            '--convert-thumbnails', 'jpg',
+            '--output', output_template,
+            '--no-playlist',
+            *RESULT_PRINT_ARGS,
+            url
+        ]
+    
+    def run_with_retry(self, cmd, on_output=None, echo=True):
+        """
+        yt-dlpを実行し、一時的な失敗・403/429はretry_policyに従って再試行
+        
+        出力は1行ずつ処理し、エラー診断用に末尾の行だけを保持するため、長時間の実行でもメモリ使用量は増えません。
+        恒久的な失敗（非公開・削除済み・Pythonの非推奨など）は再試行しません。
+        並列ダウンロード中は、403/429の多発で遮断されている間は開始を待ちます。
+        
+        Args:
+            cmd (list): yt-dlpに渡す引数
+            on_output (callable): 出力の各行を受け取る関数
+            echo (bool): 出力の各行をそのまま表示するか
+        
+        Returns:
+            EngineResult: 最後の実行結果（stderrは出力の末尾）
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = self.breaker.enter() if self.breaker else None
+            result = self.engine.run(cmd, stream=True, on_output=on_output, echo=echo)
+            outcome = DownloadResult(result.ok, error_output=result.stderr, interrupted=result.interrupted)
+            if ticket is not None:
+                self.breaker.exit(ticket, outcome)
+            kind, delay = self.retry_policy.next_delay(outcome, attempt)
+            if delay is None:
+                return result
+            print(f"🔁 {describe_failure(kind)}のため{delay:.1f}秒後に再試行します "
+                  f"({attempt + 1}/{self.retry_policy.max_attempts})")
+            self.retry_policy.sleep(delay)
+    
     def download_mp3(self, url, quality="320"):
         """
         YouTube動画をMP3形式でダウンロード
@@ -67,82 +477,43 @@ class YouTubeToMP3:
         if not self.check_yt_dlp():
             return False
         
+        if self.get_cached_download(url, quality):
+            print(f"✅ 既にダウンロード済みです: {url}")
+            return True
+        
         # 出力ファイル名のテンプレート
         output_template = str(self.output_dir / "%(title)s.%(ext)s")
         
+        # ダウンロード済みの動画があれば、そこから音声を取り出す
+        extracted = self.extract_local_audio(url, output_template)
+        if extracted is not None and self.finish_local_audio(url, quality, extracted):
+            print(f"♻️  ダウンロード済みの動画から音声を取り出しました: {url}")
+            print(f"   回避したダウンロード: {extracted.filesize / (1024 * 1024):.1f} MB")
+            return True
+        
         # yt-dlpコマンドの構築
-        cmd = [
-            self.yt_dlp_path,
-            '--extract-audio',           # 音声のみ抽出
-            '--audio-format', 'mp3',     # MP3形式に変換
-            '--audio-quality', quality,  # 音質設定
-            '--embed-thumbnail',         # サムネイルを埋め込み
-            '--output', output_template, # 出力先
-            '--no-playlist',             # プレイリストの場合は最初の動画のみ
-            url
-        ]
+        cmd = self.audio_args(url, quality, output_template)
         
         try:
             print(f"MP3ダウンロード開始: {url}")
             print(f"出力先: {self.output_dir}")
-            print(f"音質: {quality}kbps")
+            print(f"形式: {self.format_label(quality)}")
             print("-" * 50)
             
-            # yt-dlpコマンドを実行
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            # yt-dlpを実行（一時的なエラーは再試行）
+            result = self.run_with_retry(cmd)
+            if not result.ok:
+                raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
             
             print("MP3ダウンロード完了!")
-            print(result.stdout)
+            self.add_to_cache(url, quality, result.files)
             return True
             
         except subprocess.CalledProcessError as e:
             print(f"\n❌ MP3ダウンロードエラーが発生しました")
             if e.stderr:
-                error_output = e.stderr
-                print(f"\nエラー詳細:\n{error_output}")
-                
-                # Python 3.9非推奨エラーの検出
-                if "Python version 3.9 has been deprecated" in error_output or "Please update to Python 3.10" in error_output:
-                    print("\n" + "="*60)
-                    print("⚠️  Python 3.9が非推奨になっています")
-                    print("="*60)
-                    print("解決方法:")
-                    print("1. Python 3.10以上をインストールしてください")
-                    print("   macOS: brew install python@3.10")
-                    print("   Windows: https://www.python.org/downloads/ から最新版をダウンロード")
-                    print("   Ubuntu/Debian: sudo apt install python3.10")
-                    print("\n2. インストール後、以下のコマンドで確認:")
-                    print("   python3.10 --version")
-                    print("\n3. yt-dlpを再インストール:")
-                    print("   python3.10 -m pip install --upgrade yt-dlp")
-                    print("="*60)
-                
-                # HTTP 403エラーの検出
-                if "HTTP Error 403" in error_output or "403: Forbidden" in error_output:
-                    print("\n" + "="*60)
-                    print("⚠️  HTTP 403エラー: YouTubeがアクセスを拒否しました")
-                    print("="*60)
-                    print("解決方法:")
-                    print("1. yt-dlpを最新版にアップデート:")
-                    print("   pip install --upgrade yt-dlp")
-                    print("   または")
-                    print("   python3 -m pip install --upgrade yt-dlp")
-                    print("\n2. しばらく時間をおいてから再試行してください")
-                    print("3. 別の動画URLで試してください")
-                    print("4. 動画が公開されているか、地域制限がないか確認してください")
-                    print("="*60)
-                
-                # その他の一般的なエラー
-                if "ERROR" in error_output and "403" not in error_output and "deprecated" not in error_output.lower():
-                    print("\n" + "="*60)
-                    print("💡 トラブルシューティング:")
-                    print("="*60)
-                    print("1. yt-dlpを最新版にアップデート:")
-                    print("   pip install --upgrade yt-dlp")
-                    print("\n2. インターネット接続を確認してください")
-                    print("3. YouTubeのURLが正しいか確認してください")
-                    print("4. 動画が公開されているか確認してください")
-                    print("="*60)
+                # yt-dlpの出力（エラー詳細）は表示済み
+                self.print_error_advice(e.stderr)
             else:
                 print(f"エラー: {e}")
             return False
@@ -150,11 +521,57 @@ class YouTubeToMP3:
             print(f"\n❌ 予期しないエラー: {e}")
             return False
     
-
+    def print_error_advice(self, error_output):
+        """yt-dlpのエラー出力に応じた解決方法を表示"""
+        # Python 3.9非推奨エラーの検出
+        if "Python version 3.9 has been deprecated" in error_output or "Please update to Python 3.10" in error_output:
+            print("\n" + "="*60)
+            print("⚠️  Python 3.9が非推奨になっています")
+            print("="*60)
+            print("解決方法:")
+            print("1. Python 3.10以上をインストールしてください")
+            print("   macOS: brew install python@3.10")
+            print("   Windows: https://www.python.org/downloads/ から最新版をダウンロード")
+            print("   Ubuntu/Debian: sudo apt install python3.10")
+            print("\n2. インストール後、以下のコマンドで確認:")
+            print("   python3.10 --version")
+            print("\n3. yt-dlpを再インストール:")
+            print("   python3.10 -m pip install --upgrade yt-dlp")
+            print("="*60)
+        
+        # HTTP 403エラーの検出
+        if "HTTP Error 403" in error_output or "403: Forbidden" in error_output:
+            print("\n" + "="*60)
+            print("⚠️  HTTP 403エラー: YouTubeがアクセスを拒否しました")
+            print("="*60)
+            print("解決方法:")
+            print("1. yt-dlpを最新版にアップデート:")
+            print("   pip install --upgrade yt-dlp")
+            print("   または")
+            print("   python3 -m pip install --upgrade yt-dlp")
+            print("\n2. しばらく時間をおいてから再試行してください")
+            print("3. 別の動画URLで試してください")
+            print("4. 動画が公開されているか、地域制限がないか確認してください")
+            print("="*60)
+        
+        # その他の一般的なエラー
+        if "ERROR" in error_output and "403" not in error_output and "deprecated" not in error_output.lower():
+            print("\n" + "="*60)
+            print("💡 トラブルシューティング:")
+            print("="*60)
+            print("1. yt-dlpを最新版にアップデート:")
+            print("   pip install --upgrade yt-dlp")
+            print("\n2. インターネット接続を確認してください")
+            print("3. YouTubeのURLが正しいか確認してください")
+            print("4. 動画が公開されているか確認してください")
+            print("="*60)
     
     def download_playlist(self, playlist_url, quality="320", limit=None):
         """
-        プレイリストからMP3をダウンロード
+        プレイリストからMP3を並列ダウンロード
+        
+        動画IDを列挙しながらインデックスと照合し、未ダウンロードの動画のみmax_workers個同時にダウンロードします。
+        ダウンロード済みの動画はyt-dlpを起動しないため、同じプレイリストの再実行は列挙のみで終わります。
         
         Args:
             playlist_url (str): YouTubeプレイリストのURL
@@ -167,106 +584,294 @@ class YouTubeToMP3:
         if not self.check_yt_dlp():
             return False
         
-        output_template = str(self.output_dir / "%(playlist_title)s/%(title)s.%(ext)s")
-        
-        cmd = [
-            self.yt_dlp_path,
-            '--extract-audio',
-            '--audio-format', 'mp3',
-            '--audio-quality', quality,
-            '--embed-thumbnail',         # サムネイルを埋め込み
-            '--output', output_template,
-            playlist_url
-        ]
-        
+        print(f"プレイリストダウンロード開始: {playlist_url}")
+        print(f"出力先: {self.output_dir}")
+        print(f"形式: {self.format_label(quality)}")
         if limit:
-            cmd.extend(['--playlist-items', f'1-{limit}'])
+            print(f"制限: {limit}個の動画")
+        print(f"🚀 並列ダウンロード (最大{self.max_workers}個同時)")
+        print("-" * 50)
         
+        stats = {'checked': 0, 'skipped': 0}
         try:
-            print(f"プレイリストダウンロード開始: {playlist_url}")
-            print(f"出力先: {self.output_dir}")
-            print(f"音質: {quality}kbps")
-            if limit:
-                print(f"制限: {limit}個の動画")
-            print("-" * 50)
-            
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            
-            print("プレイリストダウンロード完了!")
-            print(result.stdout)
-            return True
-            
+            entries = self.skip_downloaded(self.iter_playlist_entries(playlist_url, limit), quality, stats)
+            results = self.download_in_parallel(entries, quality)
         except subprocess.CalledProcessError as e:
-            print(f"\n❌ プレイリストダウンロードエラーが発生しました")
+            print(f"\n❌ プレイリスト情報の取得エラー: 終了コード {e.returncode}")
             if e.stderr:
-                error_output = e.stderr
-                print(f"\nエラー詳細:\n{error_output}")
-                
-                # Python 3.9非推奨エラーの検出
-                if "Python version 3.9 has been deprecated" in error_output or "Please update to Python 3.10" in error_output:
-                    print("\n" + "="*60)
-                    print("⚠️  Python 3.9が非推奨になっています")
-                    print("="*60)
-                    print("解決方法:")
-                    print("1. Python 3.10以上をインストールしてください")
-                    print("   macOS: brew install python@3.10")
-                    print("   Windows: https://www.python.org/downloads/ から最新版をダウンロード")
-                    print("   Ubuntu/Debian: sudo apt install python3.10")
-                    print("\n2. インストール後、以下のコマンドで確認:")
-                    print("   python3.10 --version")
-                    print("\n3. yt-dlpを再インストール:")
-                    print("   python3.10 -m pip install --upgrade yt-dlp")
-                    print("="*60)
-                
-                # HTTP 403エラーの検出
-                if "HTTP Error 403" in error_output or "403: Forbidden" in error_output:
-                    print("\n" + "="*60)
-                    print("⚠️  HTTP 403エラー: YouTubeがアクセスを拒否しました")
-                    print("="*60)
-                    print("解決方法:")
-                    print("1. yt-dlpを最新版にアップデート:")
-                    print("   pip install --upgrade yt-dlp")
-                    print("   または")
-                    print("   python3 -m pip install --upgrade yt-dlp")
-                    print("\n2. しばらく時間をおいてから再試行してください")
-                    print("3. 別の動画URLで試してください")
-                    print("4. 動画が公開されているか、地域制限がないか確認してください")
-                    print("="*60)
-                
-                # その他の一般的なエラー
-                if "ERROR" in error_output and "403" not in error_output and "deprecated" not in error_output.lower():
-                    print("\n" + "="*60)
-                    print("💡 トラブルシューティング:")
-                    print("="*60)
-                    print("1. yt-dlpを最新版にアップデート:")
-                    print("   pip install --upgrade yt-dlp")
-                    print("\n2. インターネット接続を確認してください")
-                    print("3. YouTubeのURLが正しいか確認してください")
-                    print("4. 動画が公開されているか確認してください")
-                    print("="*60)
-            else:
-                print(f"エラー: {e}")
+                print(f"\nエラー詳細:\n{e.stderr}")
+                self.print_error_advice(e.stderr)
+            return False
+        
+        if not stats['checked']:
+            print("❌ プレイリストから動画IDを取得できませんでした")
             return False
+        print(f"📹 プレイリスト内の動画数: {stats['checked']}")
+        if stats['skipped']:
+            print(f"⏭️  ダウンロード済みのため{stats['skipped']}件をスキップしました")
+        return self.print_summary("プレイリストダウンロード完了!", results)
     
-    def list_downloads(self):
+    def download_multiple(self, urls, quality="320"):
         """
-        ダウンロード済みのMP3ファイル一覧を表示
+        複数の動画をMP3形式で並列ダウンロード（ダウンロード済みの動画はスキップ）
+        
+        Args:
+            urls (list): YouTube動画のURLリスト
+            quality (str): MP3の音質（kbps）
+        
+        Returns:
+            bool: すべて成功した場合True
+        """
+        if not self.check_yt_dlp():
+            return False
+        
+        print(f"🚀 複数動画のMP3並列ダウンロード開始 (最大{self.max_workers}個同時)")
+        print(f"📹 対象動画数: {len(urls)}")
+        print(f"形式: {self.format_label(quality)}")
+        print("-" * 50)
+        
+        template = str(self.output_dir / "%(title)s.%(ext)s")
+        results = self.download_in_parallel(((url, template) for url in urls), quality)
+        return self.print_summary("並列ダウンロード完了!", results)
+    
+    def iter_playlist_entries(self, playlist_url, limit=None):
         """
-        mp3_files = list(self.output_dir.glob("**/*.mp3"))
+        プレイリストの動画を列挙され次第返す
         
-        if not mp3_files:
-            print("ダウンロード済みのMP3ファイルが見つかりません")
-            return
+        Yields:
+            tuple: (動画ID, 出力ファイル名のテンプレート（プレイリスト名のフォルダ内）)
+        
+        Raises:
+            subprocess.CalledProcessError: 列挙に失敗した場合
+        """
+        args = ['--flat-playlist', '--print', '%(playlist_title)s\t%(id)s', playlist_url]
+        if limit:
+            args.extend(['--playlist-items', f'1-{limit}'])
+        for line in self.engine.iter_lines(args):
+            playlist_title, _, video_id = line.strip().rpartition('\t')
+            if not video_id:
+                continue
+            folder = self.output_dir / playlist_folder_name(playlist_title) if playlist_title else self.output_dir
+            yield video_id, str(folder / "%(title)s.%(ext)s")
+    
+    def skip_downloaded(self, entries, quality, stats):
+        """
+        列挙された動画からダウンロード済みのものを除く（SKIP_CHECK_BATCH件ずつ照合）
+        
+        Yields:
+            tuple: (未ダウンロードの動画のURL, 出力ファイル名のテンプレート)
+        """
+        entries = iter(entries)
+        while True:
+            batch = dict(itertools.islice(entries, SKIP_CHECK_BATCH))
+            if not batch:
+                return
+            pending, skipped = self.split_downloaded(list(batch), quality)
+            stats['checked'] += len(batch)
+            stats['skipped'] += skipped
+            for video_id in pending:
+                yield f"https://www.youtube.com/watch?v={video_id}", batch[video_id]
+    
+    def download_in_parallel(self, jobs, quality):
+        """
+        スレッドプールでMP3をダウンロード
+        
+        403/429が多発した場合は、実行全体で新しいダウンロードの開始を一時停止します。
+        
+        Args:
+            jobs (iterable): (URL, 出力ファイル名のテンプレート)
+            quality (str): MP3の音質（kbps）
+        
+        Returns:
+            dict: URLをキーとしたDownloadResult
+        """
+        results = {}
+        self.breaker = CircuitBreaker(full=self.max_workers)
+        self.local_stats = {'files': 0, 'bytes': 0}
+        staged = self.staged and self.audio_format == 'mp3' and self.toolchain.has('ffmpeg')
+        if self.staged and self.audio_format != 'mp3':
+            print("💡 無変換の形式では再エンコードを行わないため、段階実行は使用しません")
+        elif self.staged and not staged:
+            print("⚠️  ffmpegが見つからないため、MP3変換をダウンロードと同じステージで行います")
+        executor = StagedPipeline(self.max_workers) if staged else \
+            concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        self.split_encode = staged
+        # 列挙中の動画を溜め込まないよう、並列数の2倍（段階実行時は変換待ち・変換中の分を加えた数）まで投入
+        in_flight_limit = self.max_workers * 2 + (2 * executor.cpu_workers if staged else 0)
+        try:
+            with executor:
+                futures = {}
+                for url, template in jobs:
+                    futures[executor.submit(self.download_audio, url, quality, template)] = url
+                    while len(futures) >= in_flight_limit:
+                        concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                        self.collect_results(futures, results)
+                concurrent.futures.wait(futures)
+                self.collect_results(futures, results)
+        finally:
+            stats = self.breaker.stats()
+            self.breaker = None
+            self.split_encode = False
+        if staged:
+            executor.print_report()
+        if stats['trips']:
+            print(f"🧯 403の多発による停止: {stats['trips']}回 "
+                  f"(試験の失敗 {stats['canary_failures']}回, 停止時間 計{stats['open_seconds']:.1f}秒)")
+        if self.local_stats['files']:
+            print(f"♻️  ダウンロード済みの動画から{self.local_stats['files']}件の音声を取り出しました "
+                  f"(回避したダウンロード: {self.local_stats['bytes'] / (1024 * 1024):.1f} MB)")
+        return results
+    
+    def collect_results(self, futures, results):
+        """完了したダウンロードの結果を表示してresultsに移す"""
+        for future in [f for f in futures if f.done()]:
+            url = futures.pop(future)
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                print(f"❌ エラー: {url} - {e}")
+                results[url] = DownloadResult(False)
+                continue
+            if results[url].skipped:
+                print(f"✅ 既にダウンロード済み: {url}")
+            elif results[url]:
+                print(f"✅ 完了: {url}")
+            else:
+                print(f"❌ 失敗: {url}")
+    
+    def download_audio(self, url, quality, output_template):
+        """
+        並列ダウンロードの1ジョブ（出力はまとめず、完了・失敗のみ表示）
+        
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        if self.get_cached_download(url, quality):
+            return DownloadResult(True, skipped=True)
+        extracted = self.extract_local_audio(url, output_template)
+        if extracted is not None:
+            if self.split_encode:
+                return CpuStep(self.encode_local_audio, url, quality, output_template, extracted)
+            result = self.finish_local_audio(url, quality, extracted)
+            if result:
+                return result
+        return self.download_from_network(url, quality, output_template, split=self.split_encode)
+    
+    def download_from_network(self, url, quality, output_template, split=False):
+        """
+        yt-dlpで音声をダウンロード
+        
+        Args:
+            split (bool): 変換せずに保存し、MP3変換をCPUステージで行うか（段階実行）
+        
+        Returns:
+            DownloadResult | CpuStep: ダウンロード結果（段階実行の場合はCPUステージの処理）
+        """
+        args = self.source_audio_args(url, output_template) if split else \
+            self.audio_args(url, quality, output_template)
+        result = self.run_with_retry(args, on_output=self.job_progress(url), echo=False)
+        if not result.ok:
+            return DownloadResult(False, error_output=result.stderr, interrupted=result.interrupted)
+        if split and result.files:
+            # 段階実行: MP3変換はCPUステージで行う
+            return CpuStep(self.encode_mp3, url, quality, result.files[0])
+        self.add_to_cache(url, quality, result.files)
+        return DownloadResult(True, result.files)
+    
+    def job_progress(self, url):
+        """
+        並列ダウンロードの1ジョブの出力から、進捗（PROGRESS_STEP%ごと）と変換・エラーの行を動画ID付きで表示する関数
+        
+        複数のジョブの出力が混ざらないよう、yt-dlpの出力はそのまま表示せずにこの関数で間引きます。
+        """
+        label = self.get_video_id(url) or url
+        reached = [0]
+        
+        def show(line):
+            match = PROGRESS_PATTERN.match(line)
+            if match:
+                step = int(float(match.group(1)) // PROGRESS_STEP)
+                if step > reached[0]:
+                    reached[0] = step
+                    print(f"   [{label}] {line.strip()}")
+            elif line.startswith('[download] Destination'):
+                reached[0] = 0  # サムネイル・音声など次のファイル
+            elif line.startswith(NOTABLE_PREFIXES):
+                print(f"   [{label}] {line}")
+        return show
+    
+    def encode_mp3(self, url, quality, source, local=False):
+        """
+        保存した音声をffmpegでMP3に変換し、サムネイルを埋め込んでインデックスに記録
+        
+        Args:
+            url (str): YouTube動画のURL
+            quality (str): MP3の音質（kbps）
+            source (DownloadedFile): yt-dlpが報告した音声ファイル（localの場合は取り出した音声の中間ファイル）
+            local (bool): 動画から取り出した音声か（place_local_audioで最終的な名前を決める）
+        
+        Returns:
+            DownloadResult: 変換後のダウンロード結果
+        """
+        source_path = Path(source.filepath)
+        thumbnail = source_path.with_suffix('.jpg')
+        output = source_path.with_suffix('.mp3')
+        temp = source_path.with_suffix('.temp.mp3')
+        cmd = [self.toolchain.path('ffmpeg'), '-y', '-loglevel', 'error', '-i', str(source_path)]
+        if thumbnail.exists():
+            cmd += ['-i', str(thumbnail), '-map', '0:a:0', '-map', '1:0', '-c:v', 'copy',
+                    '-metadata:s:v', 'title=Album cover', '-metadata:s:v', 'comment=Cover (front)']
+        else:
+            cmd += ['-map', '0:a:0']
+        cmd += ['-c:a', 'libmp3lame', '-b:a', f'{quality}k', '-id3v2_version', '3', str(temp)]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            temp.unlink(missing_ok=True)
+            return DownloadResult(False, error_output=result.stderr)
+        os.replace(temp, output)
+        if local:
+            output = self.place_local_audio(output, source)
+        for leftover in (source_path, thumbnail):
+            if leftover != output and leftover.exists():
+                leftover.unlink()
         
-        print(f"ダウンロード済みMP3ファイル ({len(mp3_files)}個):")
+        encoded = DownloadedFile(source.video_id, source.format_id, str(output), output.stat().st_size)
+        self.add_to_cache(url, quality, [encoded])
+        return DownloadResult(True, [encoded])
+    
+    def print_summary(self, title, results):
+        """
+        並列ダウンロードの結果を表示（失敗があれば最初の失敗の解決方法も表示）
+        
+        Returns:
+            bool: すべて成功した場合True
+        """
+        failures = [result for result in results.values() if not result]
         print("-" * 50)
+        print(f"🎉 {title}")
+        print(f"✅ 成功: {len(results) - len(failures)}個")
+        print(f"❌ 失敗: {len(failures)}個")
+        if failures and failures[0].error_output:
+            print(f"\nエラー詳細:\n{failures[0].error_output}")
+            self.print_error_advice(failures[0].error_output)
+        return not failures
+    
+    def list_downloads(self, output='text', scan=False, **options):
+        """
+        ダウンロード済みの音声ファイル（MP3・m4a・opus）一覧を表示
         
-        for i, mp3_file in enumerate(mp3_files, 1):
-            file_size = mp3_file.stat().st_size / (1024 * 1024)  # MB
-            print(f"{i:2d}. {mp3_file.name}")
-            print(f"    サイズ: {file_size:.1f} MB")
-            print(f"    パス: {mp3_file}")
-            print()
+        インデックスの記録から作成し、インデックスを使用しない場合は出力ディレクトリを1度だけ走査します。
+        
+        Args:
+            output (str): 出力形式（text, json, csv）
+            scan (bool): インデックスを使用せずに出力ディレクトリを走査するか
+            **options: フィルタ・並べ替え・ページ分割（match, quality, sort, reverse, page, page_size）
+        """
+        count = list_files(self.download_index, self.output_dir, AUDIO_EXTENSIONS, output, scan,
+                           title="ダウンロード済み音声ファイル", **options)
+        if not count and output == 'text':
+            print("ダウンロード済みの音声ファイルが見つかりません")
 
 def main():
     """メイン関数"""
@@ -282,6 +887,13 @@ def main():
   # プレイリストをダウンロード
   python youtube_to_mp3.py "https://www.youtube.com/playlist?list=PLAYLIST_ID" --playlist
   python youtube_to_mp3.py "https://www.youtube.com/playlist?list=PLAYLIST_ID" --playlist --quality 320 --limit 5
+  python youtube_to_mp3.py "https://www.youtube.com/playlist?list=PLAYLIST_ID" --playlist --max-workers 5
+  
+  # 複数動画を並列ダウンロード
+  python youtube_to_mp3.py --urls "URL1" "URL2" "URL3"
+  
+  # 再エンコードせずに最良の音声を保存（AACはm4a、Opusはopus）
+  python youtube_to_mp3.py "https://www.youtube.com/watch?v=VIDEO_ID" --audio-format best
   
   # ダウンロード済みファイル一覧を表示
   python youtube_to_mp3.py --list
@@ -289,26 +901,81 @@ def main():
     )
     
     parser.add_argument('url', nargs='?', help='YouTube動画またはプレイリストのURL')
+    parser.add_argument('--urls', nargs='+', help='複数のYouTube動画URL（並列ダウンロード用）')
     parser.add_argument('-o', '--output', default='downloads', 
                        help='出力ディレクトリ (デフォルト: downloads)')
     parser.add_argument('-q', '--quality', default='320', 
                        choices=['64', '128', '192', '256', '320'],
-                       help='MP3音質 (デフォルト: 320)')
+                       help='MP3音質 (デフォルト: 320、--audio-format mp3のみ)')
+    parser.add_argument('--audio-format', default='mp3', choices=AUDIO_FORMATS,
+                       help='保存形式 (mp3=指定音質で再エンコード, best=最良の音声を無変換で格納, '
+                            'm4a/opus=その形式の音声を優先して無変換で格納、ない場合のみ変換, デフォルト: mp3)')
     parser.add_argument('-p', '--playlist', action='store_true',
                        help='プレイリストとしてダウンロード')
     parser.add_argument('-l', '--limit', type=int,
                        help='プレイリストからダウンロードする動画数の制限')
     parser.add_argument('--list', action='store_true',
-                       help='ダウンロード済みMP3ファイル一覧を表示')
+                       help='ダウンロード済み音声ファイル一覧を表示')
+    parser.add_argument('--list-format', default='text', choices=OUTPUT_FORMATS,
+                       help='--listの出力形式 (text, json, csv, デフォルト: text)')
+    parser.add_argument('--match', help='--list: ファイル名に指定した文字列を含むものだけ表示')
+    parser.add_argument('--list-quality', help='--list: 指定した画質の記録だけ表示 (例: mp3-320, audio-best)')
+    parser.add_argument('--sort', choices=SORT_KEYS, help='--list: 並べ替えのキー (デフォルト: ダウンロード順)')
+    parser.add_argument('--reverse', action='store_true', help='--list: 降順に並べ替え')
+    parser.add_argument('--page', type=positive_int, default=1, help='--list: 表示するページ (デフォルト: 1)')
+    parser.add_argument('--page-size', type=positive_int, help='--list: 1ページの件数 (デフォルト: すべて)')
+    parser.add_argument('--scan', action='store_true',
+                       help='--list: インデックスを使用せずに出力ディレクトリを走査（--no-cacheでダウンロードしたファイルも表示）')
+    parser.add_argument('--dedup', action='store_true',
+                       help='出力ディレクトリ内の同じ内容のファイルをreflinkに置き換え（前回からの差分のみ処理）')
+    parser.add_argument('--hardlink', action='store_true',
+                       help='--dedup: reflinkに対応していない場合はハードリンクに置き換え'
+                            '（片方を編集すると他方も変わります）')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                       help=f'プレイリスト・複数動画の並列ダウンロードの最大数 (デフォルト: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--staged', action='store_true',
+                       help='並列ダウンロード時、MP3変換をダウンロードと別のステージ（コア数のスレッド）で実行')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='ダウンロード済みインデックスを使用しない（ダウンロード済みでも再取得）')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                       help=f'最大試行回数。一時的なエラー・403/429は間隔をあけて再試行 (デフォルト: {DEFAULT_MAX_ATTEMPTS})')
+    parser.add_argument('--engine', default='subprocess', choices=ENGINE_CHOICES,
+                       help='yt-dlpの実行方式 (subprocess=動画ごとにプロセス起動, inprocess=プロセス内で実行, デフォルト: subprocess)')
     
     args = parser.parse_args()
     
     # インスタンス作成
-    downloader = YouTubeToMP3(args.output)
+    downloader = YouTubeToMP3(args.output, engine=args.engine, max_attempts=args.max_attempts,
+                              max_workers=args.max_workers, enable_cache=not args.no_cache, staged=args.staged,
+                              audio_format=args.audio_format)
     
     if args.list:
         # ダウンロード済みファイル一覧表示
-        downloader.list_downloads()
+        downloader.list_downloads(args.list_format, scan=args.scan, match=args.match, quality=args.list_quality,
+                                  sort=args.sort, reverse=args.reverse, page=args.page, page_size=args.page_size)
+        return
+    
+    if args.dedup:
+        # 重複排除（保守用）
+        if not downloader.dedup_downloads(hardlink=args.hardlink):
+            sys.exit(1)
+        return
+    
+    # 複数URLの並列ダウンロード
+    if args.urls:
+        if not all(re.search(r'(youtube\.com|youtu\.be)', url) for url in args.urls):
+            print("エラー: 有効なYouTube URLを入力してください")
+            return
+        try:
+            success = downloader.download_multiple(args.urls, args.quality)
+        except KeyboardInterrupt:
+            print("\n\nダウンロードが中断されました")
+            sys.exit(1)
+        if not success:
+            print("\n❌ 一部のMP3ダウンロードに失敗しました")
+            sys.exit(1)
+        print("\n✅ MP3ダウンロードが正常に完了しました!")
+        print(f"ファイルは {args.output} ディレクトリに保存されています")
         return
     
     if not args.url:
@@ -13,14 +13,71 @@ import argparse
 from pathlib import Path
 import re
 import concurrent.futures
+import queue
 import threading
 import time
-import hashlib
 import json
+import atexit
+import contextlib
+import itertools
+import functools
 from urllib.parse import urlparse, parse_qs
 
+from async_orchestrator import AsyncOrchestrator
+from bandwidth import ARIA2C_MAX_CONNECTIONS, BandwidthBudget, parse_rate
+from circuit_breaker import CircuitBreaker
+from concurrency import ADAPTIVE_LOG_FILENAME, DEFAULT_MAX_LIMIT, AdaptiveLimiter
+from dedup import Deduplicator
+from download_index import INDEX_FILENAME, LEGACY_CACHE_FILENAME, DownloadIndex, make_cache_key
+from format_model import QUALITY_HEIGHTS, FormatModel
+from info_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, INFO_CACHE_DIRNAME, InfoCache
+from job_queue import DONE, DOWNLOADING, FAILED, JOB_QUEUE_FILENAME, MERGING, PENDING, PROBING, JobQueue
+from listing import OUTPUT_FORMATS, SORT_KEYS, VIDEO_EXTENSIONS, list_files, positive_int
+from metrics import DEFAULT_METRICS_HOST, DownloadMetrics, MetricsServer
+from profiler import DEFAULT_PROFILE_FILENAME, Profiler
+from progress import ProgressReporter
+from retry_policy import DEFAULT_MAX_ATTEMPTS, RetryPolicy, describe_failure
+from staged_pipeline import CpuStep, StagedPipeline
+from toolchain import resolve_toolchain
+from yt_dlp_engine import (ENGINE_CHOICES, PROGRESS_TEMPLATE_ARGS, RESULT_PRINT_ARGS, DownloadedFile, DownloadResult,
+                           create_engine)
+
+# 並列ダウンロード時に動画情報を先読みする件数（デフォルト）
+DEFAULT_PREFETCH = 2
+# 列挙した動画IDをまとめてインデックスと照合する件数（YouTubeのプレイリスト1ページ分）
+SKIP_CHECK_BATCH = 100
+# 結合・変換の開始を示すyt-dlpの出力（ジョブの状態をmergingにする）
+MERGE_MARKERS = ('[Merger]', '[ExtractAudio]', '[VideoRemuxer]', '[VideoConvertor]')
+# 並列ダウンロード中もyt-dlpの出力から表示する行
+NOTABLE_PREFIXES = ('ERROR', 'WARNING')
+# メトリクスで数えるジョブの状態
+JOB_STATES = (PENDING, PROBING, DOWNLOADING, MERGING, DONE, FAILED)
+# 段階実行時に動画・音声を別々に保存するファイル名（yt-dlpが結合前に使う名前と同じ）
+PART_TEMPLATE = "%(title)s.f%(format_id)s.%(ext)s"
+# 段階実行で分割できる形式指定（"動画ID+音声ID"）
+SPLIT_FORMAT_PATTERN = re.compile(r'^[\w-]+\+[\w-]+$')
+
+
+class SkipStats:
+    """ダウンロード済みとして除いた動画の集計"""
+    
+    def __init__(self):
+        self.checked = 0    # 照合した件数
+        self.skipped = 0    # ダウンロード済みで除いた件数
+        self.elapsed = 0.0  # 照合にかかった時間（秒）
+    
+    def add(self, checked, skipped, elapsed):
+        self.checked += checked
+        self.skipped += skipped
+        self.elapsed += elapsed
+
+
 class YouTubeVideoDownloader:
-    def __init__(self, output_dir="downloads", max_workers=3, enable_cache=True):
+    def __init__(self, output_dir="downloads", max_workers=3, enable_cache=True, engine="subprocess",
+                 info_cache_ttl=DEFAULT_TTL, info_cache_size=DEFAULT_MAX_ENTRIES, use_async=False,
+                 adaptive=False, adaptive_max=DEFAULT_MAX_LIMIT, max_rate=None, max_connections=None,
+                 prefetch=DEFAULT_PREFETCH, max_attempts=DEFAULT_MAX_ATTEMPTS, circuit_breaker=True,
+                 staged=False, progress_json=None):
         """
         YouTubeVideoDownloaderクラスの初期化（高速化版）
         
@@ -28,37 +85,65 @@ class YouTubeVideoDownloader:
             output_dir (str): ダウンロード先ディレクトリ
             max_workers (int): 並列ダウンロードの最大数
             enable_cache (bool): キャッシュ機能を有効にするか
+            engine (str): yt-dlpの実行方式 ('subprocess' または 'inprocess')
+            info_cache_ttl (int): 動画情報キャッシュの有効期限（秒）
+            info_cache_size (int): 動画情報キャッシュの最大件数
+            use_async (bool): 複数動画・プレイリストをasyncioで並列実行するか
+            adaptive (bool): 並列数を自動調整するか（max_workersは開始時の並列数）
+            adaptive_max (int): 自動調整時の並列数の上限
+            max_rate (int): 実行全体の帯域の上限（バイト/秒）
+            max_connections (int): 実行全体の接続数の上限
+            prefetch (int): 並列ダウンロード時に動画情報を先読みする件数（0で無効）
+            max_attempts (int): 1本の動画の最大試行回数（一時的な失敗・403/429の再試行を含む）
+            circuit_breaker (bool): 403/429の多発時に実行全体で新しいジョブの開始を止めるか
+            staged (bool): 並列ダウンロード時に結合をダウンロードと別のステージ（コア数のスレッド）で行うか
+            progress_json (str): 進捗イベントをJSON Linesで追記するファイル（'-'で標準出力）
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.yt_dlp_path = None
+        self.engine_backend = engine
+        self.engine = None
+        self.toolchain = None
         self.max_workers = max_workers
+        self.use_async = use_async
+        self.limiter = None
+        if adaptive:
+            self.limiter = AdaptiveLimiter(initial=max_workers, max_limit=max(adaptive_max, max_workers),
+                                           log_file=self.output_dir / ADAPTIVE_LOG_FILENAME)
+        self.prefetch = prefetch
+        self.retry_policy = RetryPolicy(max_attempts=max_attempts)
+        self.breaker = CircuitBreaker(full=max_workers) if circuit_breaker else None
+        self.staged = staged
+        self.split_merge = False  # 段階実行中（結合をCPUステージに回す）
+        self.job_queue = None  # 一括ダウンロード時に開く（.job_queue.sqlite3）
+        self.jobs = None       # 実行中の一括ダウンロードのジョブ（JobBatch）
+        self.progress_json = progress_json
+        self.progress = None     # 実行中の進捗表示（ProgressReporter）
+        self.echo_output = True  # yt-dlpの出力をそのまま表示するか（並列ダウンロード中はFalse）
+        self.metrics = None      # start_metricsで開始したメトリクス（DownloadMetrics）
+        self.profiler = None     # start_profileで開始したプロファイル（Profiler）
+        self.batch_size = 1  # 実行中の一括ダウンロードの件数（帯域の分配に使用）
+        self.bandwidth = None
+        if max_rate or max_connections:
+            self.bandwidth = BandwidthBudget(max_rate, max_connections, slots=self.concurrent_slots)
         self.enable_cache = enable_cache
-        self.cache_file = self.output_dir / ".download_cache.json"
-        self.download_cache = self.load_cache()
+        self.index_file = self.output_dir / INDEX_FILENAME
+        self.cache_file = self.output_dir / LEGACY_CACHE_FILENAME  # 旧形式（自動でインデックスへ移行）
+        self.download_index = self.load_cache()
+        self.deduplicator = Deduplicator(self.download_index, self.output_dir) if enable_cache else None
         self.lock = threading.Lock()
+        self.info_cache = None
+        if enable_cache:
+            self.info_cache = InfoCache(self.output_dir / INFO_CACHE_DIRNAME,
+                                        ttl=info_cache_ttl, max_entries=info_cache_size)
         
     def load_cache(self):
-        """ダウンロードキャッシュを読み込み"""
-        if not self.enable_cache or not self.cache_file.exists():
-            return {}
-        
-        try:
-            with open(self.cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    
-    def save_cache(self):
-        """ダウンロードキャッシュを保存"""
+        """ダウンロード済みインデックスを開く（旧形式のJSONキャッシュは自動で移行）"""
         if not self.enable_cache:
-            return
+            return None
         
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.download_cache, f, ensure_ascii=False, indent=2)
-        except IOError:
-            pass
+        return DownloadIndex(self.index_file, legacy_json=self.cache_file)
     
     def get_video_id(self, url):
         """YouTube URLから動画IDを抽出"""
@@ -70,25 +155,89 @@ class YouTubeVideoDownloader:
             return url.split('youtu.be/')[-1].split('?')[0]
         return None
     
-    def is_already_downloaded(self, url, quality):
-        """動画が既にダウンロード済みかチェック"""
+    def get_cached_download(self, url, quality):
+        """
+        ダウンロード済みの記録を取得
+        
+        Returns:
+            dict: インデックスの記録（未ダウンロード・ファイルが存在しない場合None）
+        """
         if not self.enable_cache:
-            return False
+            return None
         
         video_id = self.get_video_id(url)
         if not video_id:
-            return False
+            return None
         
-        cache_key = f"{video_id}_{quality}"
-        if cache_key in self.download_cache:
-            cached_info = self.download_cache[cache_key]
+        cached_info = self.download_index.get(make_cache_key(video_id, quality))
+        if cached_info:
             cached_file = self.output_dir / cached_info['filename']
             if cached_file.exists():
-                return True
+                return cached_info
         
-        return False
+        return None
     
-    def add_to_cache(self, url, quality, filename):
+    def split_downloaded(self, video_ids, quality):
+        """
+        動画IDをまとめてインデックスと照合
+        
+        Args:
+            video_ids (list): 動画ID
+            quality (str): 画質
+        
+        Returns:
+            tuple: (未ダウンロードの動画IDのリスト, ダウンロード済みの件数)
+        """
+        if not self.enable_cache:
+            return list(video_ids), 0
+        
+        records = self.download_index.get_many(make_cache_key(video_id, quality) for video_id in video_ids)
+        pending = []
+        for video_id in video_ids:
+            record = records.get(make_cache_key(video_id, quality))
+            if record is None or not (self.output_dir / record['filename']).exists():
+                pending.append(video_id)
+        return pending, len(video_ids) - len(pending)
+    
+    def skip_downloaded(self, video_ids, quality, stats):
+        """
+        列挙された動画IDからダウンロード済みのものを除く（SKIP_CHECK_BATCH件ずつ照合）
+        
+        Args:
+            video_ids (iterable): 動画ID（列挙中のジェネレータでもよい）
+            quality (str): 画質
+            stats (SkipStats): 除いた件数・照合時間の集計先
+        
+        Yields:
+            str: 未ダウンロードの動画ID
+        """
+        video_ids = iter(video_ids)
+        while True:
+            batch = list(itertools.islice(video_ids, SKIP_CHECK_BATCH))
+            if not batch:
+                return
+            start = time.perf_counter()
+            pending, skipped = self.split_downloaded(batch, quality)
+            stats.add(len(batch), skipped, time.perf_counter() - start)
+            self.count_metric('index_skips', skipped)
+            yield from pending
+    
+    def print_skip_summary(self, stats):
+        """ダウンロード済みで除いた件数と短縮時間の推定を表示"""
+        if not stats.skipped:
+            return
+        print(f"⏭️  ダウンロード済みのため{stats.skipped}件をスキップしました "
+              f"(照合 {stats.checked}件 / {stats.elapsed * 1000:.1f} ms)")
+        startup = self.toolchain.startup_time('yt-dlp') if self.toolchain else None
+        if startup and self.engine_backend == 'subprocess':
+            print(f"⏱️  yt-dlpの起動 {stats.skipped}回分（1回 {startup:.2f}秒）、"
+                  f"約{stats.skipped * startup:.1f}秒を短縮しました")
+    
+    def is_already_downloaded(self, url, quality):
+        """動画が既にダウンロード済みかチェック"""
+        return self.get_cached_download(url, quality) is not None
+    
+    def add_to_cache(self, url, quality, filename, filesize=None, format_id=None):
         """ダウンロード完了をキャッシュに記録"""
         if not self.enable_cache:
             return
@@ -97,45 +246,124 @@ class YouTubeVideoDownloader:
         if not video_id:
             return
         
-        cache_key = f"{video_id}_{quality}"
-        self.download_cache[cache_key] = {
-            'filename': filename,
-            'timestamp': time.time(),
-            'quality': quality
-        }
+        # 1件ずつトランザクションで追記（スレッド・プロセス間で安全）
+        with self.timed('index', url):
+            self.download_index.put(make_cache_key(video_id, quality), filename, quality, video_id=video_id,
+                                    filesize=filesize, format_id=format_id)
+    
+    def dedup_downloads(self, hardlink=False):
+        """
+        出力ディレクトリ全体の重複排除（前回から追加・変更されたファイルのみハッシュを計算）
+        
+        Args:
+            hardlink (bool): reflinkに対応していない場合にハードリンクに置き換えるか
         
-        with self.lock:
-            self.save_cache()
+        Returns:
+            bool: 実行できた場合True
+        """
+        if self.deduplicator is None:
+            print("❌ 重複排除にはダウンロード済みインデックスが必要です（--no-cacheとは併用できません）")
+            return False
+        self.deduplicator.hardlink = hardlink
+        print(f"🔍 重複排除: {self.output_dir}")
+        self.deduplicator.scan()
+        self.deduplicator.print_summary()
+        return True
 
     def check_yt_dlp(self):
         """
         yt-dlpがインストールされているかチェック
         
+        ツールの検出はプロセス内で1度だけ行い、結果は出力ディレクトリに保存されます。
+        
         Returns:
             bool: yt-dlpが利用可能な場合True
         """
-        # yt-dlpのパスを探す
-        yt_dlp_paths = [
-            'yt-dlp',  # PATHにある場合
-            '/Users/natuki/Library/Python/3.9/bin/yt-dlp',  # macOSの一般的なパス
-            '/usr/local/bin/yt-dlp',  # Homebrewのパス
-            '/opt/homebrew/bin/yt-dlp'  # Apple Silicon MacのHomebrewパス
-        ]
+        # 検出済みの場合は何もしない
+        if self.engine is not None:
+            return True
+        
+        self.toolchain = resolve_toolchain(self.output_dir)
+        if not self.toolchain.has('ffmpeg'):
+            print("⚠️  ffmpegが見つかりません（音声・動画の変換に失敗する可能性があります）")
         
-        for path in yt_dlp_paths:
+        # プロセス内エンジンはyt_dlpモジュールを直接使用
+        if self.engine_backend == 'inprocess':
             try:
-                result = subprocess.run([path, '--version'], 
-                                      capture_output=True, text=True, check=True)
-                print(f"yt-dlp バージョン: {result.stdout.strip()}")
-                self.yt_dlp_path = path
-                return True
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
+                self.engine = create_engine('inprocess')
+            except RuntimeError as e:
+                print(f"エラー: {e}")
+                return False
+            print(f"yt-dlp バージョン: {self.engine.version()} (プロセス内エンジン)")
+            return True
+        
+        path = self.toolchain.path('yt-dlp')
+        if path:
+            print(f"yt-dlp バージョン: {self.toolchain.version('yt-dlp')}")
+            self.yt_dlp_path = path
+            self.engine = create_engine('subprocess', path)
+            return True
         
         print("エラー: yt-dlpがインストールされていません")
         print("インストール方法: pip install yt-dlp")
         return False
     
+    def get_video_info(self, url):
+        """
+        動画の情報（yt-dlpのJSON）を取得
+        
+        有効期限内の情報が動画情報キャッシュにあれば、yt-dlpを実行せずに返します。
+        
+        Args:
+            url (str): YouTube動画のURL
+            
+        Returns:
+            dict: yt-dlpの情報辞書（取得に失敗した場合None）
+        """
+        info = self.cached_video_info(url)
+        if info is not None:
+            return info
+        
+        result = self.engine.run(self.video_info_args(url))
+        return self.parse_video_info(result)
+    
+    def cached_video_info(self, url):
+        """動画情報キャッシュから情報を取得（ない場合None）"""
+        video_id = self.get_video_id(url)
+        if self.info_cache and video_id:
+            return self.info_cache.get(video_id)
+        return None
+    
+    def video_info_args(self, url):
+        """動画情報取得用のyt-dlp引数"""
+        return ['--dump-single-json', '--no-playlist', url]
+    
+    def parse_video_info(self, result):
+        """
+        動画情報取得の実行結果を解析し、動画情報キャッシュに保存
+        
+        Args:
+            result (EngineResult): yt-dlpの実行結果
+            
+        Returns:
+            dict: yt-dlpの情報辞書（失敗した場合None）
+        """
+        if not result.ok:
+            print(f"動画情報の取得に失敗: 終了コード {result.returncode}")
+            if result.stderr:
+                print(f"エラー詳細: {result.stderr}")
+            return None
+        
+        try:
+            info = json.loads(result.stdout)
+        except json.JSONDecodeError as e:
+            print(f"動画情報の解析に失敗: {e}")
+            return None
+        
+        if self.info_cache and info.get('id'):
+            self.info_cache.put(info['id'], info)
+        return info
+    
     def get_available_formats(self, url):
         """
         動画の利用可能な形式を取得
@@ -144,21 +372,19 @@ class YouTubeVideoDownloader:
             url (str): YouTube動画のURL
             
         Returns:
-            dict: 形式IDをキーとした形式情報の辞書
+            FormatModel: 形式モデル（取得に失敗した場合は空のモデル）
         """
-        try:
-            cmd = [self.yt_dlp_path, '--list-formats', url]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return self.parse_formats_output(result.stdout)
-        except subprocess.CalledProcessError as e:
-            print(f"形式一覧の取得に失敗: {e}")
-            if e.stderr:
-                print(f"エラー詳細: {e.stderr}")
-            return {}
+        with self.timed('probe', url):
+            info = self.get_video_info(url)
+        if info is None:
+            return FormatModel([])
+        return FormatModel.from_info(info)
     
     def parse_formats_output(self, output):
         """
-        yt-dlpの形式一覧出力をパース
+        yt-dlpの形式一覧出力（表形式テキスト）をパース
+        
+        形式の取得には通常JSON情報（get_available_formats）を使用します。
         
         Args:
             output (str): yt-dlp --list-formatsの出力
@@ -220,37 +446,15 @@ class YouTubeVideoDownloader:
         
         Args:
             quality (str): 要求画質
-            available_formats (dict): 利用可能な形式一覧
+            available_formats (FormatModel|dict): 利用可能な形式一覧
+                （dictの場合はparse_formats_outputの結果）
             
         Returns:
             str: 最適な形式ID（動画+音声）
         """
-        # 画質から目標高さを取得
-        target_height = self.get_target_height(quality)
-        
-        # 動画形式と音声形式を分離
-        video_formats = {}
-        audio_formats = {}
-        
-        for format_id, format_info in available_formats.items():
-            if format_info['is_video']:
-                video_formats[format_id] = format_info
-            elif format_info['is_audio']:
-                audio_formats[format_id] = format_info
-        
-        # 最適な動画形式を選択
-        best_video_id = self.select_best_video_format(target_height, video_formats)
-        
-        # 最適な音声形式を選択
-        best_audio_id = self.select_best_audio_format(audio_formats)
-        
-        if best_video_id and best_audio_id:
-            return f"{best_video_id}+{best_audio_id}"
-        elif best_video_id:
-            return best_video_id
-        else:
-            # フォールバック: 利用可能な最高品質
-            return "best"
+        if not isinstance(available_formats, FormatModel):
+            available_formats = FormatModel.from_legacy(available_formats)
+        return available_formats.select(quality)
     
     def get_target_height(self, quality):
         """
@@ -262,17 +466,7 @@ class YouTubeVideoDownloader:
         Returns:
             int: 目標高さ
         """
-        height_map = {
-            "144p": 144,
-            "240p": 240,
-            "360p": 360,
-            "480p": 480,
-            "720p": 720,
-            "1080p": 1080,
-            "1440p": 1440,
-            "2160p": 2160
-        }
-        return height_map.get(quality, 720)
+        return QUALITY_HEIGHTS.get(quality, 720)
     
     def select_best_video_format(self, target_height, video_formats):
         """
@@ -280,64 +474,29 @@ class YouTubeVideoDownloader:
         
         Args:
             target_height (int): 目標高さ
-            video_formats (dict): 動画形式一覧
+            video_formats (dict): 動画形式一覧（parse_formats_outputの形式）
             
         Returns:
             str: 最適な動画形式ID
         """
-        if not video_formats:
-            return None
-        
-        # 目標高さ以下の最高品質形式を選択
-        candidates = []
-        for format_id, format_info in video_formats.items():
-            if format_info['height'] <= target_height:
-                # ビットレートを数値に変換
-                try:
-                    tbr = float(format_info['tbr'].replace('k', ''))
-                except (ValueError, AttributeError):
-                    tbr = 0
-                
-                candidates.append((format_id, format_info['height'], tbr))
-        
-        if not candidates:
-            # 目標高さ以下がない場合、最も近い高さを選択
-            candidates = [(fid, finfo['height'], 0) for fid, finfo in video_formats.items()]
-        
-        # 高さとビットレートでソート（高さ優先、同高さならビットレート優先）
-        candidates.sort(key=lambda x: (x[1], x[2]), reverse=True)
-        
-        return candidates[0][0] if candidates else None
+        best = FormatModel.from_legacy(video_formats).best_video(target_height)
+        return best.format_id if best else None
     
     def select_best_audio_format(self, audio_formats):
         """
         最適な音声形式を選択
         
         Args:
-            audio_formats (dict): 音声形式一覧
+            audio_formats (dict): 音声形式一覧（parse_formats_outputの形式）
             
         Returns:
             str: 最適な音声形式ID
         """
-        if not audio_formats:
-            return None
-        
-        # 音声品質の高い順でソート（ビットレートで判断）
-        candidates = []
-        for format_id, format_info in audio_formats.items():
-            try:
-                tbr = float(format_info['tbr'].replace('k', ''))
-            except (ValueError, AttributeError):
-                tbr = 0
-            
-            candidates.append((format_id, tbr))
-        
-        # ビットレートの高い順でソート
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        
-        return candidates[0][0] if candidates else None
+        best = FormatModel.from_legacy(audio_formats).best_audio
+        return best.format_id if best else None
     
-    def download_video(self, url, quality="720p", format_id=None, audio_quality="0", audio_format="best"):
+    def download_video(self, url, quality="720p", format_id=None, audio_quality="0", audio_format="best",
+                       available_formats=None):
         """
         YouTube動画を動画形式でダウンロード（高速化版）
         
@@ -347,97 +506,282 @@ class YouTubeVideoDownloader:
             format_id (str): 特定の形式ID（オプション）
             audio_quality (str): 音声品質 (0=最高品質)
             audio_format (str): 音声形式
+            available_formats (FormatModel): 先読み済みの形式一覧（省略時は取得する）
         
         Returns:
-            bool: ダウンロードが成功した場合True
+            DownloadResult: ダウンロード結果（成功した場合に真）
         """
-        if not self.check_yt_dlp():
-            return False
+        with self.timed('check_yt_dlp', url):
+            if not self.check_yt_dlp():
+                return DownloadResult(False)
         
         # キャッシュチェック
-        if self.is_already_downloaded(url, quality):
+        cached_info = self.get_cached_download(url, quality)
+        if cached_info:
             print(f"✅ 動画は既にダウンロード済みです: {url}")
-            return True
+            self.count_metric('index_skips')
+            return self.cached_result(cached_info)
         
-        # 出力ファイル名のテンプレート
-        output_template = str(self.output_dir / "%(title)s.%(ext)s")
+        self.set_job_state(url, PROBING)
+        format_spec, info_file = self.resolve_format(url, quality, format_id, available_formats)
+        # 段階実行中は動画・音声を別々に保存し、結合はCPUステージで行う
+        split = self.split_merge and bool(SPLIT_FORMAT_PATTERN.match(format_spec))
         
-        # yt-dlpコマンドの構築（高速化オプション付き）
+        try:
+            with self.bandwidth_lease() as lease:
+                args = self.build_download_args(url, format_spec, audio_quality, audio_format, info_file, lease,
+                                                split)
+                self.print_download_header(url, quality, lease)
+                
+                # yt-dlpを実行（リアルタイム出力）
+                self.set_job_state(url, DOWNLOADING)
+                observer = self.job_output_observer(url)
+                with self.timed('download', url):
+                    result = self.engine.run(args, stream=True, lease=lease, on_output=observer,
+                                             echo=self.echo_output)
+                self.record_merge(url, observer)
+            return self.finish_download(url, quality, result, format_spec if split else None)
+            
+        except Exception as e:
+            print(f"❌ 予期しないエラー: {e}")
+            return DownloadResult(False)
+    
+    def cached_result(self, cached_info):
+        """インデックスの記録からスキップ時の結果を作成"""
+        cached_file = DownloadedFile(cached_info['video_id'], cached_info.get('format_id'),
+                                     str(self.output_dir / cached_info['filename']), cached_info.get('filesize'))
+        return DownloadResult(True, [cached_file], skipped=True)
+    
+    def resolve_format(self, url, quality, format_id=None, available_formats=None):
+        """
+        ダウンロードする形式を決定
+        
+        Args:
+            url (str): YouTube動画のURL
+            quality (str): 動画の画質
+            format_id (str): 特定の形式ID（指定された場合はそのまま使用）
+            available_formats (FormatModel): 取得済みの形式一覧（省略時は取得する）
+        
+        Returns:
+            tuple: (形式指定, yt-dlpに渡す動画情報ファイル（ない場合None）)
+        """
+        # 有効期限内の動画情報があれば、ダウンロード時のyt-dlpの再抽出を省略
+        info_file = None
+        video_id = self.get_video_id(url)
         if format_id:
-            format_spec = format_id
             print(f"カスタム形式ID: {format_id}")
-        else:
-            print(f"画質 {quality} の最適な形式を動的に選択中...")
+            if self.info_cache and video_id:
+                info_file = self.info_cache.fresh_path(video_id)
+            return format_id, info_file
+        
+        print(f"画質 {quality} の最適な形式を動的に選択中...")
+        if available_formats is None:
             available_formats = self.get_available_formats(url)
-            
-            if available_formats:
-                format_spec = self.select_best_format(quality, available_formats)
-                print(f"選択された形式: {format_spec}")
-            else:
-                print("形式の取得に失敗したため、デフォルト形式を使用")
-                format_spec = "best"
+        
+        if not available_formats:
+            print("形式の取得に失敗したため、デフォルト形式を使用")
+            return "best", None
+        
+        format_spec = self.select_best_format(quality, available_formats)
+        print(f"選択された形式: {format_spec}")
+        video_id = available_formats.video_id or video_id
+        if self.info_cache and video_id:
+            # 形式一覧の取得時にヒット・ミスを集計済みのため、ここでは有効期限のみ確認
+            info_file = self.info_cache.fresh_path(video_id, record=False)
+        return format_spec, info_file
+    
+    def uses_aria2c(self):
+        """aria2cを外部ダウンローダーとして使用するか（検出できた場合のみ）"""
+        return self.toolchain is not None and self.toolchain.has('aria2c')
+    
+    def concurrent_slots(self):
+        """帯域・接続数の予算を分ける並列数"""
+        limit = self.limiter.limit if self.limiter else self.max_workers
+        return max(1, min(limit, self.batch_size))
+    
+    @contextlib.contextmanager
+    def batch(self, size):
+        """一括ダウンロードの実行中、件数を帯域の分配に反映"""
+        self.batch_size = size
+        try:
+            yield
+        finally:
+            self.batch_size = 1
+    
+    def bandwidth_lease(self, adjustable=None):
+        """
+        帯域・接続数の割り当てを取得（--max-rate/--max-connections未指定時はNone）
+        
+        Args:
+            adjustable (bool): 実行中に帯域を変更できるか（省略時はプロセス内実行の場合True）
+        """
+        if self.bandwidth is None:
+            return contextlib.nullcontext()
+        if adjustable is None:
+            adjustable = self.engine is not None and self.engine.name == 'inprocess'
+        return self.bandwidth.lease(adjustable)
+    
+    def build_download_args(self, url, format_spec, audio_quality="0", audio_format="best", info_file=None,
+                            lease=None, split=False):
+        """
+        ダウンロード用のyt-dlp引数を構築（実行ファイルパスは含まない）
+        
+        Args:
+            url (str): YouTube動画のURL
+            format_spec (str): 形式指定
+            audio_quality (str): 音声品質
+            audio_format (str): 音声形式
+            info_file (Path): キャッシュ済みの動画情報ファイル（指定時はURLの代わりに使用）
+            lease (Lease): 帯域・接続数の割り当て（指定時は並列フラグメント数・aria2cの接続数に反映）
+            split (bool): 動画・音声を結合せずに別々のファイルで保存するか（"動画ID+音声ID"の形式指定のみ）
+        
+        Returns:
+            list: yt-dlpの引数
+        """
+        connections = lease.connections if lease and lease.connections else None
+        aria2c_connections = None
+        fragments = connections or 4
+        if self.uses_aria2c():
+            # aria2cはフラグメントごとに-x/-s本の接続を開くため、接続数の割り当てがある場合は
+            # フラグメントを1つずつにして、フラグメント数×接続数が割り当てを超えないようにする
+            aria2c_connections = min(connections or ARIA2C_MAX_CONNECTIONS, ARIA2C_MAX_CONNECTIONS)
+            if connections:
+                fragments = 1
+        # 出力ファイル名のテンプレート
+        output_template = str(self.output_dir / (PART_TEMPLATE if split else "%(title)s.%(ext)s"))
+        if split:
+            format_spec = format_spec.replace('+', ',')  # 動画・音声を別々にダウンロード
         
         # 高速化のためのyt-dlpオプション
-        cmd = [
-            self.yt_dlp_path,
+        args = [
             '--format', format_spec,                    # 選択された形式ID
             '--output', output_template,                 # 出力先
             '--no-playlist',                             # プレイリストの場合は最初の動画のみ
             '--audio-quality', audio_quality,            # 音声品質
             '--audio-format', audio_format,              # 音声形式
             '--merge-output-format', 'mp4',              # 出力形式をMP4に統一
-            '--concurrent-fragments', '4',               # 並列フラグメントダウンロード
-            '--downloader-args', 'aria2c:-x 16 -s 16',  # aria2cを使用した高速ダウンロード
-            '--external-downloader', 'aria2c',           # 外部ダウンローダーとしてaria2cを使用
+            '--concurrent-fragments', str(fragments),    # 並列フラグメントダウンロード
             '--progress',                                # プログレスバー表示
             '--newline',                                 # 改行を適切に処理
+            *PROGRESS_TEMPLATE_ARGS,                     # 進捗を機械可読な行で出力させる
             '--no-mtime',                                # ファイル時刻の変更を無効化（高速化）
             '--no-write-thumbnail',                      # サムネイルの書き込みを無効化（高速化）
             '--no-write-description',                    # 説明の書き込みを無効化（高速化）
             '--no-write-info-json',                      # 情報JSONの書き込みを無効化（高速化）
             '--no-write-subtitles',                      # 字幕の書き込みを無効化（高速化）
-            url
+            *RESULT_PRINT_ARGS,                          # 最終的な出力ファイルを報告させる
         ]
+        if lease and lease.rate:
+            args.extend(['--limit-rate', str(lease.rate)])  # 割り当てられた帯域
+        if info_file:
+            args.extend(['--load-info-json', str(info_file)])  # キャッシュ済みの動画情報を使用
+        else:
+            args.append(url)
+        
+        # aria2cが検出できた場合のみ外部ダウンローダーとして使用
+        if aria2c_connections:
+            args[:0] = [
+                '--downloader-args', f'aria2c:-x {aria2c_connections} -s {aria2c_connections}',  # aria2cを使用した高速ダウンロード
+                '--external-downloader', self.toolchain.path('aria2c'),  # 外部ダウンローダーとしてaria2cを使用
+            ]
+        return args
+    
+    def print_download_header(self, url, quality, lease=None):
+        """ダウンロード開始時の表示"""
+        print(f"🚀 動画ダウンロード開始: {url}")
+        print(f"📁 出力先: {self.output_dir}")
+        print(f"🎬 画質: {quality}")
+        print(f"⚡ 高速化オプション: 並列フラグメント{'、aria2c使用' if self.uses_aria2c() else ''}")
+        if lease:
+            rate = f"{lease.rate / (1024 * 1024):.1f} MiB/s" if lease.rate else "無制限"
+            print(f"📶 割り当て: 帯域 {rate}、接続数 {lease.connections or '無制限'}")
+        print("-" * 50)
+    
+    def finish_download(self, url, quality, result, split_spec=None):
+        """
+        yt-dlpの実行結果を処理し、報告された出力ファイルをキャッシュに記録
+        
+        Args:
+            url (str): YouTube動画のURL
+            quality (str): 動画の画質
+            result (EngineResult): yt-dlpの実行結果
+            split_spec (str): 動画・音声を別々に保存した場合の形式指定（結合はpostprocessで行う）
+        
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        if not result.ok:
+            print(f"❌ 動画ダウンロードエラー: 終了コード {result.returncode}")
+            return DownloadResult(False, error_output=result.stderr, interrupted=result.interrupted)
+        
+        if split_spec and len(result.files) == 2:
+            print(f"📥 ダウンロード完了（結合待ち）: {url}")
+            return DownloadResult(True, result.files,
+                                  postprocess=functools.partial(self.merge_parts, url, quality, split_spec,
+                                                                result.files))
+        
+        print("✅ 動画ダウンロード完了!")
         
+        # yt-dlpが報告した出力ファイルをキャッシュに追加
+        for downloaded in result.files:
+            print(f"📄 {downloaded.filepath}")
+            self.add_to_cache(url, quality, self.relative_filename(downloaded.filepath),
+                              filesize=downloaded.filesize, format_id=downloaded.format_id)
+        
+        return DownloadResult(True, result.files)
+    
+    def merge_parts(self, url, quality, format_spec, parts):
+        """
+        別々に保存した動画・音声をffmpegで結合し（再エンコードなし）、キャッシュに記録
+        
+        Args:
+            url (str): YouTube動画のURL
+            quality (str): 動画の画質
+            format_spec (str): "動画ID+音声ID"
+            parts (list): yt-dlpが報告した動画・音声のファイル（DownloadedFile）
+        
+        Returns:
+            DownloadResult: 結合後のダウンロード結果
+        """
+        self.set_job_state(url, MERGING)
+        video_id = format_spec.split('+')[0]
+        video, audio = sorted(parts, key=lambda part: part.format_id != video_id)
+        # "タイトル.f137.mp4" → "タイトル.mp4"
+        stem = re.sub(r'\.f[\w-]+\.\w+$', '', Path(video.filepath).name)
+        output = Path(video.filepath).with_name(stem + '.mp4')
+        temp = output.with_name(stem + '.temp.mp4')
+        cmd = [
+            self.toolchain.path('ffmpeg'), '-y', '-loglevel', 'error',
+            '-i', video.filepath, '-i', audio.filepath,
+            '-c', 'copy', '-map', '0:v:0', '-map', '1:a:0', '-movflags', '+faststart',
+            str(temp),
+        ]
+        print(f"🔗 結合中: {output.name}")
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ 結合エラー: {url}")
+            return DownloadResult(False, error_output=result.stderr)
+        os.replace(temp, output)
+        for part in parts:
+            try:
+                os.remove(part.filepath)
+            except OSError:
+                pass
+        
+        merged = DownloadedFile(video.video_id, format_spec, str(output), output.stat().st_size)
+        print(f"✅ 動画ダウンロード完了!")
+        print(f"📄 {merged.filepath}")
+        self.add_to_cache(url, quality, self.relative_filename(merged.filepath),
+                          filesize=merged.filesize, format_id=format_spec)
+        return DownloadResult(True, [merged])
+    
+    def relative_filename(self, filepath):
+        """出力ディレクトリからの相対パス（ディレクトリ外の場合は絶対パス）"""
+        path = Path(filepath).resolve()
         try:
-            print(f"🚀 動画ダウンロード開始: {url}")
-            print(f"📁 出力先: {self.output_dir}")
-            print(f"🎬 画質: {quality}")
-            print(f"⚡ 高速化オプション: 並列フラグメント、aria2c使用")
-            print("-" * 50)
-            
-            # yt-dlpコマンドを実行（リアルタイム出力）
-            process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            # リアルタイムで出力を表示
-            for line in process.stdout:
-                print(line.rstrip())
-            
-            process.wait()
-            
-            if process.returncode == 0:
-                print("✅ 動画ダウンロード完了!")
-                
-                # ダウンロードされたファイルを検索してキャッシュに追加
-                downloaded_files = list(self.output_dir.glob("*.mp4"))
-                if downloaded_files:
-                    latest_file = max(downloaded_files, key=lambda x: x.stat().st_mtime)
-                    self.add_to_cache(url, quality, latest_file.name)
-                
-                return True
-            else:
-                print(f"❌ 動画ダウンロードエラー: 終了コード {process.returncode}")
-                return False
-            
-        except Exception as e:
-            print(f"❌ 予期しないエラー: {e}")
-            return False
+            return str(path.relative_to(self.output_dir.resolve()))
+        except ValueError:
+            return str(path)
     
     def show_formats(self, url):
         """
@@ -460,40 +804,38 @@ class YouTubeVideoDownloader:
         
         # 形式一覧を表示
         print("利用可能な形式:")
-        print("ID  EXT   RESOLUTION FPS │   FILESIZE   TBR │ VCODEC          ACODEC")
+        print("ID    EXT   RESOLUTION  FPS │   FILESIZE    TBR │ VCODEC          ACODEC")
         print("-" * 80)
         
-        # 動画形式と音声形式を分離して表示
-        video_formats = []
-        audio_formats = []
-        
-        for format_id, format_info in available_formats.items():
-            if format_info['is_video']:
-                video_formats.append((format_id, format_info))
-            elif format_info['is_audio']:
-                audio_formats.append((format_id, format_info))
-        
-        # 動画形式を高さ順でソート
-        video_formats.sort(key=lambda x: x[1]['height'], reverse=True)
-        
-        # 動画形式を表示
-        for format_id, format_info in video_formats:
-            height_str = f"{format_info['height']}p" if format_info['height'] > 0 else "audio"
-            print(f"{format_id:3} {format_info['ext']:4} {format_info['resolution']:10} {format_info['fps']:3} │ {format_info['filesize']:10} {format_info['tbr']:6} │ {format_info['vcodec']:15} {format_info['acodec']:8}")
+        # 動画形式は高さ順、音声形式はビットレート順に並んでいる
+        for record in available_formats.video_formats:
+            print(self.format_record_line(record))
         
         print("-" * 80)
         print("音声形式:")
-        for format_id, format_info in audio_formats:
-            print(f"{format_id:3} {format_info['ext']:4} {format_info['resolution']:10} {format_info['fps']:3} │ {format_info['filesize']:10} {format_info['tbr']:6} │ {format_info['vcodec']:15} {format_info['acodec']:8}")
+        for record in available_formats.audio_formats:
+            print(self.format_record_line(record))
         
-        # 推奨形式の提案
+        # 推奨形式の提案（画質ラダーは形式モデル構築時に計算済み）
         print("\n推奨形式:")
         for quality in ["1080p", "720p", "480p", "360p"]:
-            recommended = self.select_best_format(quality, available_formats)
+            recommended = available_formats.ladder.get(quality)
             if recommended:
                 print(f"  {quality}: {recommended}")
     
-    def download_playlist(self, playlist_url, quality="720p", limit=None, format_id=None, audio_quality="0", audio_format="best"):
+    def format_record_line(self, record):
+        """形式一覧の1行を整形"""
+        if record.filesize:
+            filesize = f"{record.filesize / (1024 * 1024):.1f}MiB"
+        else:
+            filesize = "-"
+        fps = f"{record.fps:.0f}" if record.fps else ""
+        tbr = f"{record.tbr:.0f}k" if record.tbr else ""
+        return (f"{record.format_id:5} {record.ext:5} {record.resolution:11} {fps:>3} │ "
+                f"{filesize:>10} {tbr:>6} │ {record.vcodec:15} {record.acodec}")
+    
+    def download_playlist(self, playlist_url, quality="720p", limit=None, format_id=None, audio_quality="0", audio_format="best",
+                          resume=None):
         """
         プレイリストから動画を並列ダウンロード（高速化版）
         
@@ -504,80 +846,48 @@ class YouTubeVideoDownloader:
             format_id (str): 特定の形式ID（オプション）
             audio_quality (str): 音声品質 (0=最高品質)
             audio_format (str): 音声形式
+            resume (JobBatch): 再開する一括ダウンロード（ジョブキューから取得したもの）
         
         Returns:
             bool: ダウンロードが成功した場合True
         """
+        if self.use_async:
+            return self.download_playlist_async(playlist_url, quality, limit, format_id, audio_quality, audio_format,
+                                                resume)
+        
         if not self.check_yt_dlp():
             return False
         
-        # プレイリスト情報を取得
+        # プレイリストの動画IDを列挙しながら、順にダウンロードを開始
         print(f"📋 プレイリスト情報を取得中: {playlist_url}")
-        
-        # プレイリストの動画URL一覧を取得
-        cmd = [
-            self.yt_dlp_path,
-            '--flat-playlist',
-            '--get-id',
-            playlist_url
-        ]
-        
         if limit:
-            cmd.extend(['--playlist-items', f'1-{limit}'])
+            print(f"📊 ダウンロード制限: {limit}個")
+        print(f"🚀 並列ダウンロード開始 ({self.concurrency_label()})")
+        print("-" * 50)
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            video_ids = result.stdout.strip().split('\n')
-            video_ids = [vid for vid in video_ids if vid]  # 空行を除去
+            skip_stats = SkipStats()
+            options = self.job_options(quality, limit, format_id, audio_quality, audio_format)
+            with self.tracked_jobs('playlist', playlist_url, options, resume) as jobs, \
+                    self.batch(limit or sys.maxsize), self.progress_display():
+                video_urls = self.playlist_job_urls(jobs, playlist_url, limit, quality, skip_stats)
+                results = self.download_with_thread_pool(video_urls, quality, format_id, audio_quality, audio_format)
             
-            if not video_ids:
+            if not skip_stats.checked and resume is None:
                 print("❌ プレイリストから動画IDを取得できませんでした")
                 return False
             
-            print(f"📹 プレイリスト内の動画数: {len(video_ids)}")
-            if limit:
-                print(f"📊 ダウンロード制限: {limit}個")
-            
-            # 並列ダウンロードの実行
-            print(f"🚀 並列ダウンロード開始 (最大{self.max_workers}個同時)")
-            print("-" * 50)
-            
-            success_count = 0
-            failed_count = 0
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # 各動画のダウンロードタスクを開始
-                future_to_url = {}
-                for video_id in video_ids:
-                    video_url = f"https://www.youtube.com/watch?v={video_id}"
-                    future = executor.submit(
-                        self.download_video, 
-                        video_url, 
-                        quality, 
-                        format_id, 
-                        audio_quality, 
-                        audio_format
-                    )
-                    future_to_url[future] = video_url
-                
-                # 完了したタスクの結果を収集
-                for future in concurrent.futures.as_completed(future_to_url):
-                    url = future_to_url[future]
-                    try:
-                        if future.result():
-                            success_count += 1
-                            print(f"✅ 完了: {url}")
-                        else:
-                            failed_count += 1
-                            print(f"❌ 失敗: {url}")
-                    except Exception as e:
-                        failed_count += 1
-                        print(f"❌ エラー: {url} - {e}")
+            if skip_stats.checked:
+                print(f"📹 プレイリスト内の動画数: {skip_stats.checked}")
+            self.print_skip_summary(skip_stats)
+            success_count = sum(1 for success in results.values() if success)
+            failed_count = len(results) - success_count
             
             print("-" * 50)
             print(f"🎉 プレイリストダウンロード完了!")
             print(f"✅ 成功: {success_count}個")
             print(f"❌ 失敗: {failed_count}個")
+            self.print_breaker_summary()
             
             return failed_count == 0
             
@@ -590,45 +900,161 @@ class YouTubeVideoDownloader:
             print(f"❌ 予期しないエラー: {e}")
             return False
     
-    def download_multiple_videos(self, urls, quality="720p", format_id=None, audio_quality="0", audio_format="best"):
+    def job_options(self, quality, limit, format_id, audio_quality, audio_format):
+        """再開時に復元するオプション"""
+        return {'quality': quality, 'limit': limit, 'format_id': format_id,
+                'audio_quality': audio_quality, 'audio_format': audio_format}
+    
+    def playlist_job_urls(self, jobs, playlist_url, limit, quality, skip_stats):
+        """
+        プレイリストのジョブのURLを返す
+        
+        再開時は未完了のジョブを先に返し、列挙が終わっていなければ列挙を続けます。
+        ダウンロード済みの動画はプロセスを起動する前にまとめて除きます。
+        
+        Yields:
+            str: 動画のURL
+        """
+        yield from jobs.unfinished_urls()
+        if jobs.enumerated:
+            return
+        video_ids = self.skip_downloaded(self.iter_playlist_ids(playlist_url, limit), quality, skip_stats)
+        for video_id in video_ids:
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            if jobs.add(url):
+                yield url
+        jobs.mark_enumerated()
+    
+    def playlist_args(self, playlist_url, limit=None):
+        """プレイリストの動画ID列挙用のyt-dlp引数"""
+        args = [
+            '--flat-playlist',
+            '--get-id',
+            playlist_url
+        ]
+        if limit:
+            args.extend(['--playlist-items', f'1-{limit}'])
+        return args
+    
+    def iter_playlist_ids(self, playlist_url, limit=None):
+        """
+        プレイリストの動画IDを列挙され次第返す
+        
+        Yields:
+            str: 動画ID
+        
+        Raises:
+            subprocess.CalledProcessError: 列挙に失敗した場合
+        """
+        for line in self.engine.iter_lines(self.playlist_args(playlist_url, limit)):
+            video_id = line.strip()
+            if video_id:
+                yield video_id
+    
+    async def skip_downloaded_async(self, video_ids, quality, stats):
+        """skip_downloadedの非同期イテレータ版（SKIP_CHECK_BATCH件ずつ照合）"""
+        batch = []
+        async for video_id in video_ids:
+            batch.append(video_id)
+            if len(batch) >= SKIP_CHECK_BATCH:
+                for pending in self.skip_downloaded(batch, quality, stats):
+                    yield pending
+                batch = []
+        for pending in self.skip_downloaded(batch, quality, stats):
+            yield pending
+    
+    def download_multiple_videos(self, urls, quality="720p", format_id=None, audio_quality="0", audio_format="best",
+                                 resume=None):
         """
         複数の動画を並列ダウンロード
         
         Args:
-            urls (list): YouTube動画のURLリスト
+            urls (list): YouTube動画のURLリスト（再開時は不要）
             quality (str): 動画の画質
             format_id (str): 特定の形式ID（オプション）
             audio_quality (str): 音声品質
             audio_format (str): 音声形式
+            resume (JobBatch): 再開する一括ダウンロード（ジョブキューから取得したもの）
         
         Returns:
             dict: 各URLのダウンロード結果
         """
-        if not self.check_yt_dlp():
+        if self.use_async:
+            orchestrator = AsyncOrchestrator(self)
+            if not orchestrator.prepare():
+                return {}
+        elif not self.check_yt_dlp():
             return {}
         
-        print(f"🚀 複数動画の並列ダウンロード開始 (最大{self.max_workers}個同時)")
-        print(f"📹 対象動画数: {len(urls)}")
+        options = self.job_options(quality, None, format_id, audio_quality, audio_format)
+        with self.tracked_jobs('urls', None, options, resume) as jobs:
+            if resume is None:
+                jobs.add_all(urls)
+                jobs.mark_enumerated()
+            urls = jobs.unfinished_urls()
+            
+            print(f"🚀 複数動画の並列ダウンロード開始 ({self.concurrency_label()}{'、asyncio' if self.use_async else ''})")
+            print(f"📹 対象動画数: {len(urls)}")
+            print("-" * 50)
+            
+            with self.batch(len(urls)), self.progress_display():
+                if self.use_async:
+                    results = orchestrator.run(orchestrator.download_all(
+                        urls, quality=quality, format_id=format_id,
+                        audio_quality=audio_quality, audio_format=audio_format))
+                else:
+                    results = self.download_with_thread_pool(urls, quality, format_id, audio_quality, audio_format)
+        
+        # 結果サマリー
+        success_count = sum(1 for success in results.values() if success)
+        failed_count = len(results) - success_count
+        
         print("-" * 50)
+        print(f"🎉 並列ダウンロード完了!")
+        print(f"✅ 成功: {success_count}個")
+        print(f"❌ 失敗: {failed_count}個")
+        self.print_breaker_summary()
         
-        results = {}
+        return results
+    
+    def download_with_thread_pool(self, urls, quality="720p", format_id=None, audio_quality="0", audio_format="best"):
+        """
+        スレッドプールで複数の動画をダウンロード
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 各動画のダウンロードタスクを開始
-            future_to_url = {
-                executor.submit(
-                    self.download_video, 
-                    url, 
-                    quality, 
-                    format_id, 
-                    audio_quality, 
-                    audio_format
-                ): url for url in urls
-            }
-            
-            # 完了したタスクの結果を収集
-            for future in concurrent.futures.as_completed(future_to_url):
-                url = future_to_url[future]
+        URLはリスト・ジェネレータのどちらでもよく、受け取った順にダウンロードを開始します。
+        形式を自動選択する場合は、ダウンロード中に次のprefetch件の動画情報を先読みします。
+        先読み・実行中の合計は「並列数+prefetch」件までに抑えます。
+        段階実行（staged）時は、動画・音声の結合をコア数のスレッドのCPUステージで行います。
+        
+        Returns:
+            dict: 各URLのダウンロード結果
+        """
+        results = {}
+        # 自動調整時は上限数のスレッドを用意し、実行数はリミッターで制御
+        pool_size = self.limiter.max_limit if self.limiter else self.max_workers
+        prefetch = 0 if format_id else self.prefetch
+        staged = self.staged and self.toolchain.has('ffmpeg')
+        if self.staged and not staged:
+            print("⚠️  ffmpegが見つからないため、結合をダウンロードと同じステージで行います")
+        download_pool = StagedPipeline(pool_size) if staged else \
+            concurrent.futures.ThreadPoolExecutor(max_workers=pool_size)
+        # 段階実行時は結合待ち・結合中のジョブの分も空けておき、ダウンロードの開始を妨げない
+        in_postprocess = 2 * download_pool.cpu_workers if staged else 0
+        window = threading.Semaphore(pool_size + prefetch + in_postprocess)
+        finished = queue.Queue()
+        submitted = 0
+        
+        def start_download(url, available_formats=None):
+            future = download_pool.submit(self.run_queued_job, time.perf_counter(), url, quality, format_id,
+                                          audio_quality, audio_format, available_formats)
+            future.add_done_callback(lambda f: (window.release(), finished.put((url, f))))
+        
+        def collect(block):
+            while True:
+                try:
+                    url, future = finished.get(block=block)
+                except queue.Empty:
+                    return
                 try:
                     success = future.result()
                     results[url] = success
@@ -639,38 +1065,471 @@ class YouTubeVideoDownloader:
                 except Exception as e:
                     results[url] = False
                     print(f"❌ エラー: {url} - {e}")
+                if block:
+                    return
+        
+        with download_pool, self.splitting_merges(staged), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=max(1, prefetch)) as prefetch_pool:
+            for url in urls:
+                window.acquire()
+                submitted += 1
+                if prefetch:
+                    # 動画情報を先読みし、取得でき次第ダウンロードを開始
+                    prefetch_pool.submit(self.prefetch_formats, url, quality).add_done_callback(
+                        lambda f, u=url: start_download(u, None if f.exception() else f.result()))
+                else:
+                    start_download(url)
+                collect(block=False)
+            
+            # 完了したタスクの結果を収集
+            while len(results) < submitted:
+                collect(block=True)
         
-        # 結果サマリー
+        if staged:
+            download_pool.print_report()
+        return results
+    
+    @contextlib.contextmanager
+    def splitting_merges(self, enabled):
+        """実行中、動画・音声の結合をCPUステージに回す"""
+        previous, self.split_merge = self.split_merge, enabled
+        try:
+            yield
+        finally:
+            self.split_merge = previous
+    
+    def prefetch_formats(self, url, quality):
+        """
+        ダウンロード前に形式一覧を取得（ダウンロード済みの場合は取得しない）
+        
+        Returns:
+            FormatModel: 形式モデル（不要な場合None）
+        """
+        if self.is_already_downloaded(url, quality):
+            return None
+        self.set_job_state(url, PROBING)
+        return self.get_available_formats(url)
+    
+    def run_queued_job(self, queued_at, url, *args):
+        """スレッドプールで実行を待った時間を記録してからジョブを実行"""
+        self.record_stage('queue_wait', queued_at, time.perf_counter(), url)
+        return self.run_job(url, *args)
+    
+    def run_job(self, url, quality="720p", format_id=None, audio_quality="0", audio_format="best",
+                available_formats=None):
+        """
+        並列ダウンロードの1ジョブ
+        
+        一時的な失敗・403/429はretry_policyに従って再試行し、恒久的な失敗は再試行しません。
+        
+        Returns:
+            DownloadResult: ダウンロード結果
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self.timed('job', url):
+                    result = self.attempt_job(url, quality, format_id, audio_quality, audio_format,
+                                              available_formats)
+            except Exception as e:
+                self.set_job_state(url, FAILED, str(e))
+                raise
+            kind, delay = self.retry_policy.next_delay(result, attempt)
+            if kind:
+                self.count_metric('failures', kind=kind)
+            if delay is None:
+                break
+            self.wait_before_retry(url, kind, attempt, delay)
+        if result.postprocess is not None:
+            # 段階実行: 結合はCPUステージで行い、完了後にジョブを記録
+            return CpuStep(self.finish_postprocess, url, result, time.perf_counter())
+        self.finish_job(url, result)
+        return result
+    
+    def finish_postprocess(self, url, result, queued_at=None):
+        """CPUステージで結合・変換し、ジョブの完了・失敗を記録"""
+        if queued_at is not None:
+            self.record_stage('merge_wait', queued_at, time.perf_counter(), url)
+        try:
+            with self.timed('merge', url):
+                final = result.postprocess()
+        except Exception as e:
+            self.set_job_state(url, FAILED, str(e))
+            raise
+        self.finish_job(url, final)
+        return final
+    
+    def attempt_job(self, url, quality, format_id, audio_quality, audio_format, available_formats):
+        """
+        ジョブの1回の試行
+        
+        403/429の多発で遮断中は開始を待ち、自動調整時は実行枠を確保して結果をリミッターに報告します。
+        """
+        if self.breaker is None:
+            return self.download_in_slot(url, quality, format_id, audio_quality, audio_format, available_formats)
+        ticket = self.breaker.enter()
+        result = DownloadResult(False)
+        try:
+            result = self.download_in_slot(url, quality, format_id, audio_quality, audio_format, available_formats)
+        finally:
+            self.breaker.exit(ticket, result)
+        return result
+    
+    def download_in_slot(self, url, quality, format_id, audio_quality, audio_format, available_formats):
+        """自動調整時は実行枠を確保してダウンロードし、結果をリミッターに報告"""
+        if self.limiter is None:
+            return self.download_video(url, quality, format_id, audio_quality, audio_format, available_formats)
+        with self.limiter.slot():
+            try:
+                result = self.download_video(url, quality, format_id, audio_quality, audio_format,
+                                             available_formats)
+            except Exception:
+                self.limiter.record(False)
+                raise
+            self.limiter.record_result(result)
+        return result
+    
+    def retry_message(self, url, kind, attempt, delay):
+        """再試行の待機開始時の表示"""
+        return (f"🔁 {describe_failure(kind)}のため{delay:.1f}秒後に再試行します "
+                f"({attempt + 1}/{self.retry_policy.max_attempts}): {url}")
+    
+    def wait_before_retry(self, url, kind, attempt, delay):
+        """
+        再試行まで待機（自動調整時の実行枠は解放したまま、ジョブは実行待ちとして記録）
+        
+        Args:
+            url (str): YouTube動画のURL
+            kind (str): 失敗の分類
+            attempt (int): 失敗した試行の回数
+            delay (float): 待ち時間（秒）
+        """
+        print(self.retry_message(url, kind, attempt, delay))
+        self.set_job_state(url, PENDING, kind)
+        self.count_metric('retries', kind=kind)
+        self.retry_policy.sleep(delay)
+    
+    def open_job_queue(self):
+        """ジョブキューを開く（初回のみ）"""
+        if self.job_queue is None:
+            self.job_queue = JobQueue(self.output_dir / JOB_QUEUE_FILENAME)
+        return self.job_queue
+    
+    @contextlib.contextmanager
+    def tracked_jobs(self, kind, source=None, options=None, resume=None):
+        """
+        一括ダウンロードの各ジョブの状態をジョブキューに記録
+        
+        正常に終わった場合のみ終了済みにし、中断された場合は--resumeで再開できるよう残します。
+        
+        Args:
+            kind (str): 'urls' または 'playlist'
+            source (str): プレイリストのURL
+            options (dict): 画質などのオプション
+            resume (JobBatch): 再開する一括ダウンロード（省略時は新規に登録）
+        
+        Yields:
+            JobBatch: ジョブ
+        """
+        if resume is None:
+            self.jobs = self.open_job_queue().create_batch(kind, source, options)
+        else:
+            self.jobs = resume
+            counts = resume.counts()
+            print(f"🔁 中断された一括ダウンロードを再開します "
+                  f"(完了 {counts.get(DONE, 0)}件 / 失敗 {counts.get(FAILED, 0)}件 / "
+                  f"未完了 {len(resume.unfinished_urls())}件)")
+        try:
+            yield self.jobs
+            self.jobs.finish()
+        finally:
+            self.jobs = None
+    
+    def set_job_state(self, url, state, error=None):
+        """一括ダウンロード中のジョブの状態を記録（完了・失敗は進捗表示にも送る）"""
+        if self.jobs is not None:
+            self.jobs.set_state(url, state, error)
+        if self.progress is not None and state in (DONE, FAILED):
+            self.progress.finish(url, state == DONE, error)
+    
+    def finish_job(self, url, result):
+        """ジョブの完了・失敗を記録（インデックスへの記録後に呼ぶ）"""
+        if result.interrupted:
+            return  # 中断されたジョブは未完了のまま残し、再開時にもう一度実行
+        if result:
+            self.set_job_state(url, DONE)
+        else:
+            error = result.error_output.strip().splitlines()[-1] if result.error_output.strip() else None
+            self.set_job_state(url, FAILED, error)
+    
+    def job_output_observer(self, url):
+        """
+        yt-dlpの出力を処理する関数
+        
+        進捗行は進捗イベントとして表示スレッドに送り、結合・変換の開始をジョブの状態に記録します。
+        yt-dlpの出力を表示しない並列ダウンロード中は、エラー・警告の行のみ表示スレッドに送ります。
+        
+        Returns:
+            callable: 出力の行を受け取る関数（進捗表示中・一括ダウンロード中でない場合None）
+        """
+        reporter = self.progress
+        if self.jobs is None and reporter is None:
+            return None
+        forward = reporter is not None and not self.echo_output
+        merging = []  # 結合・変換の開始時刻
+        
+        def observe(line):
+            if reporter is not None and reporter.observe(url, line):
+                return
+            if not merging and line.startswith(MERGE_MARKERS):
+                merging.append(time.perf_counter())
+                self.set_job_state(url, MERGING)
+            if forward and line.startswith(NOTABLE_PREFIXES):
+                reporter.message(line, url)
+        observe.merge_started = merging
+        return observe
+    
+    def record_merge(self, url, observer):
+        """yt-dlpが行った結合・変換の時間（開始の出力から実行の終了まで）を記録"""
+        if observer is not None and observer.merge_started:
+            self.record_stage('merge', observer.merge_started[0], time.perf_counter(), url)
+    
+    @contextlib.contextmanager
+    def progress_display(self, parallel=True):
+        """
+        実行中の進捗を1つの表示スレッドで集約して表示
+        
+        並列ダウンロード中はyt-dlpの出力をそのまま表示せず、進捗イベントとエラー・警告の行だけを表示します。
+        各スレッドのprintも表示スレッド経由で出力するため、複数のジョブの出力が混ざりません。
+        
+        Args:
+            parallel (bool): 並列ダウンロードか（Falseの場合はyt-dlpの出力もそのまま表示）
+        """
+        if self.progress is not None:
+            yield self.progress
+            return
+        with contextlib.ExitStack() as stack:
+            out, json_out = sys.stdout, None
+            if self.progress_json == '-':
+                out, json_out = sys.stderr, sys.__stdout__  # 標準出力はイベント専用にする
+            elif self.progress_json:
+                json_out = stack.enter_context(open(self.progress_json, 'a', encoding='utf-8'))
+            listeners = [self.metrics.record_progress] if self.metrics else None
+            reporter = stack.enter_context(ProgressReporter(out=out, json_out=json_out, listeners=listeners))
+            stack.enter_context(reporter.capture_stdout())
+            self.progress, self.echo_output = reporter, not parallel
+            try:
+                yield reporter
+            finally:
+                self.progress, self.echo_output = None, True
+    
+    def start_metrics(self, port, host=DEFAULT_METRICS_HOST):
+        """
+        メトリクスのHTTPエンドポイント（Prometheus/OpenMetrics形式）を開始（プロセスの終了時に停止）
+        
+        Args:
+            port (int): 待ち受けるポート（0の場合は空いているポート）
+            host (str): 待ち受けるアドレス
+        
+        Returns:
+            bool: 開始できた場合True
+        """
+        metrics = DownloadMetrics()
+        metrics.add_collector(self.collect_metrics)
+        server = MetricsServer(metrics, port, host)
+        try:
+            server.start()
+        except OSError as e:
+            print(f"❌ メトリクスのエンドポイントを開始できません: {e}")
+            return False
+        atexit.register(server.close)
+        self.metrics = metrics
+        print(f"📈 メトリクス: {server.url}")
+        return True
+    
+    def collect_metrics(self):
+        """メトリクスの取得時に読み出す値（ジョブの状態・動画情報キャッシュ・並列数・403による停止）"""
+        jobs = self.jobs
+        counts = jobs.counts() if jobs is not None else {}
+        families = [('jobs', 'gauge', "実行中の一括ダウンロードの状態ごとのジョブ数",
+                     [({'state': state}, counts.get(state, 0)) for state in JOB_STATES])]
+        if self.info_cache:
+            stats = self.info_cache.stats()
+            families.extend([
+                ('info_cache_hits', 'counter', "動画情報キャッシュのヒット数", [({}, stats['hits'])]),
+                ('info_cache_misses', 'counter', "動画情報キャッシュのミス数", [({}, stats['misses'])]),
+                ('info_cache_hit_ratio', 'gauge', "動画情報キャッシュのヒット率", [({}, stats['hit_rate'])]),
+            ])
+        families.append(('concurrency_limit', 'gauge', "並列数（自動調整時は現在の上限）",
+                         [({}, self.limiter.limit if self.limiter else self.max_workers)]))
+        if self.breaker:
+            stats = self.breaker.stats()
+            families.extend([
+                ('circuit_breaker_trips', 'counter', "403/429の多発で新しいジョブの開始を止めた回数",
+                 [({}, stats['trips'])]),
+                ('circuit_breaker_open_seconds', 'counter', "新しいジョブの開始を止めていた時間の合計（秒）",
+                 [({}, stats['open_seconds'])]),
+            ])
+        return families
+    
+    @contextlib.contextmanager
+    def timed(self, stage, url=None):
+        """ブロックの所要時間を段階の所要時間として記録（メトリクス・プロファイルのどちらも無効の場合は何もしない）"""
+        if self.metrics is None and self.profiler is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, start, time.perf_counter(), url)
+    
+    def record_stage(self, stage, start, end, url=None):
+        """
+        段階の所要時間をメトリクス（ヒストグラム）とプロファイル（区間）に記録
+        
+        Args:
+            stage (str): 段階（queue_wait, job, check_yt_dlp, probe, download, merge_wait, merge, index）
+            start (float): 開始時刻（time.perf_counter()）
+            end (float): 終了時刻（time.perf_counter()）
+            url (str): ジョブのURL
+        """
+        if self.metrics is not None:
+            self.metrics.observe(stage, end - start)
+        if self.profiler is not None:
+            self.profiler.record(stage, start, end, url)
+    
+    def start_profile(self, path=DEFAULT_PROFILE_FILENAME):
+        """
+        段階ごとの区間の記録を開始（プロセスの終了時にトレースを書き出し、集計を表示）
+        
+        Args:
+            path (str): Chrome/Perfetto形式のトレースJSONの出力先
+        """
+        self.profiler = Profiler()
+        atexit.register(self.finish_profile, path)
+    
+    def finish_profile(self, path=DEFAULT_PROFILE_FILENAME):
+        """トレースを書き出し、段階ごとのp50/p95/p99を表示"""
+        if self.profiler is None:
+            return
+        print("-" * 50)
+        self.profiler.print_summary()
+        try:
+            self.profiler.write_trace(path)
+        except OSError as e:
+            print(f"❌ トレースを書き出せません: {e}")
+            return
+        print(f"📝 トレース: {path}（chrome://tracing または https://ui.perfetto.dev で開けます）")
+    
+    def count_metric(self, name, amount=1, **labels):
+        """メトリクスのカウンターを増やす（メトリクスを開始していない場合は何もしない）"""
+        if self.metrics and amount:
+            self.metrics.inc(name, amount, **labels)
+    
+    def print_breaker_summary(self):
+        """403/429の多発で新しいジョブの開始を止めた回数・時間を表示（止めていない場合は何もしない）"""
+        if self.breaker is None:
+            return
+        stats = self.breaker.stats()
+        if stats['trips']:
+            print(f"🧯 403の多発による停止: {stats['trips']}回 "
+                  f"(試験の失敗 {stats['canary_failures']}回, 停止時間 計{stats['open_seconds']:.1f}秒)")
+    
+    def concurrency_label(self, max_workers=None):
+        """並列数の表示（例: 最大3個同時、自動調整 3〜16個同時）"""
+        if self.limiter:
+            return f"自動調整 {self.limiter.limit}〜{self.limiter.max_limit}個同時"
+        return f"最大{max_workers or self.max_workers}個同時"
+    
+    def download_playlist_async(self, playlist_url, quality="720p", limit=None, format_id=None, audio_quality="0", audio_format="best",
+                                resume=None):
+        """
+        プレイリストから動画をasyncioで並列ダウンロード
+        
+        Returns:
+            bool: ダウンロードが成功した場合True
+        """
+        orchestrator = AsyncOrchestrator(self)
+        if not orchestrator.prepare():
+            return False
+        
+        async def run_playlist():
+            # プレイリストの動画IDを列挙しながら、順にダウンロードを開始
+            print(f"📋 プレイリスト情報を取得中: {playlist_url}")
+            if limit:
+                print(f"📊 ダウンロード制限: {limit}個")
+            print(f"🚀 並列ダウンロード開始 ({self.concurrency_label(orchestrator.max_concurrency)}、asyncio)")
+            print("-" * 50)
+            
+            async def video_urls():
+                # 再開時は未完了のジョブを先に実行し、列挙が終わっていなければ続ける
+                for url in jobs.unfinished_urls():
+                    yield url
+                if jobs.enumerated:
+                    return
+                # ダウンロード済みの動画はプロセスを起動する前にまとめて除く
+                video_ids = orchestrator.iter_playlist_ids(playlist_url, limit)
+                async for video_id in self.skip_downloaded_async(video_ids, quality, skip_stats):
+                    url = f"https://www.youtube.com/watch?v={video_id}"
+                    if jobs.add(url):
+                        yield url
+                if not orchestrator.enumeration_failed:
+                    jobs.mark_enumerated()
+            
+            with self.batch(limit or sys.maxsize):
+                return await orchestrator.download_all(
+                    video_urls(), quality=quality, format_id=format_id,
+                    audio_quality=audio_quality, audio_format=audio_format)
+        
+        skip_stats = SkipStats()
+        options = self.job_options(quality, limit, format_id, audio_quality, audio_format)
+        with self.tracked_jobs('playlist', playlist_url, options, resume) as jobs, self.progress_display():
+            results = orchestrator.run(run_playlist())
+        if orchestrator.enumeration_failed or (not skip_stats.checked and resume is None):
+            if not orchestrator.enumeration_failed:
+                print("❌ プレイリストから動画IDを取得できませんでした")
+            return False
+        
+        if skip_stats.checked:
+            print(f"📹 プレイリスト内の動画数: {skip_stats.checked}")
+        self.print_skip_summary(skip_stats)
         success_count = sum(1 for success in results.values() if success)
         failed_count = len(results) - success_count
         
         print("-" * 50)
-        print(f"🎉 並列ダウンロード完了!")
+        print(f"🎉 プレイリストダウンロード完了!")
         print(f"✅ 成功: {success_count}個")
         print(f"❌ 失敗: {failed_count}個")
+        self.print_breaker_summary()
         
-        return results
+        return failed_count == 0
     
-    def list_downloads(self):
+    def print_cache_stats(self):
+        """動画情報キャッシュのヒット・ミス数を表示"""
+        if not self.info_cache:
+            print("💾 動画情報キャッシュは無効です")
+            return
+        stats = self.info_cache.stats()
+        print(f"💾 動画情報キャッシュ: ヒット {stats['hits']}回 / ミス {stats['misses']}回 "
+              f"(期限切れ {stats['expired']}回, 削除 {stats['evictions']}件, ヒット率 {stats['hit_rate']:.0%})")
+    
+    def list_downloads(self, output='text', scan=False, **options):
         """
         ダウンロード済みの動画ファイル一覧を表示
-        """
-        # 動画ファイルを検索
-        video_files = list(self.output_dir.glob("**/*.mp4")) + list(self.output_dir.glob("**/*.webm")) + list(self.output_dir.glob("**/*.mkv"))
         
-        if not video_files:
-            print("ダウンロード済みの動画ファイルが見つかりません")
-            return
-        
-        print(f"ダウンロード済み動画ファイル ({len(video_files)}個):")
-        print("-" * 50)
+        インデックスの記録から作成し、インデックスを使用しない場合は出力ディレクトリを1度だけ走査します。
         
-        for i, video_file in enumerate(video_files, 1):
-            file_size = video_file.stat().st_size / (1024 * 1024)  # MB
-            print(f"{i:2d}. {video_file.name}")
-            print(f"    サイズ: {file_size:.1f} MB")
-            print(f"    パス: {video_file}")
-            print()
+        Args:
+            output (str): 出力形式（text, json, csv）
+            scan (bool): インデックスを使用せずに出力ディレクトリを走査するか
+            **options: フィルタ・並べ替え・ページ分割（match, quality, sort, reverse, page, page_size）
+        """
+        count = list_files(self.download_index, self.output_dir, VIDEO_EXTENSIONS, output, scan,
+                           title="ダウンロード済み動画ファイル", **options)
+        if not count and output == 'text':
+            print("ダウンロード済みの動画ファイルが見つかりません")
 
 def main():
     """メイン関数（高速化版）"""
@@ -697,6 +1556,10 @@ def main():
   
   # ダウンロード済みファイル一覧を表示
   python youtube_video_downloader.py --list
+  python youtube_video_downloader.py --list --sort size --reverse --page-size 20 --list-format json
+  
+  # 同じ内容のファイルをリンクに置き換え
+  python youtube_video_downloader.py --dedup
         """
     )
     
@@ -721,25 +1584,142 @@ def main():
                        help='プレイリストからダウンロードする動画数の制限')
     parser.add_argument('--list', action='store_true',
                        help='ダウンロード済み動画ファイル一覧を表示')
+    parser.add_argument('--list-format', default='text', choices=OUTPUT_FORMATS,
+                       help='--listの出力形式 (text, json, csv, デフォルト: text)')
+    parser.add_argument('--match', help='--list: ファイル名に指定した文字列を含むものだけ表示')
+    parser.add_argument('--list-quality', help='--list: 指定した画質の記録だけ表示 (例: 720p)')
+    parser.add_argument('--sort', choices=SORT_KEYS, help='--list: 並べ替えのキー (デフォルト: ダウンロード順)')
+    parser.add_argument('--reverse', action='store_true', help='--list: 降順に並べ替え')
+    parser.add_argument('--page', type=positive_int, default=1, help='--list: 表示するページ (デフォルト: 1)')
+    parser.add_argument('--page-size', type=positive_int, help='--list: 1ページの件数 (デフォルト: すべて)')
+    parser.add_argument('--scan', action='store_true',
+                       help='--list: インデックスを使用せずに出力ディレクトリを走査（--no-cacheでダウンロードしたファイルも表示）')
+    parser.add_argument('--dedup', action='store_true',
+                       help='出力ディレクトリ内の同じ内容のファイルをreflinkに置き換え（前回からの差分のみ処理）')
+    parser.add_argument('--hardlink', action='store_true',
+                       help='--dedup: reflinkに対応していない場合はハードリンクに置き換え'
+                            '（片方を編集すると他方も変わります）')
     parser.add_argument('--show-formats', action='store_true',
                        help='利用可能な形式一覧を表示')
     parser.add_argument('--max-workers', type=int, default=3,
-                       help='並列ダウンロードの最大数 (デフォルト: 3)')
+                       help='並列ダウンロードの最大数（--adaptive時は開始時の並列数） (デフォルト: 3)')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='スループット・エラー率・403率・CPU負荷から並列数を自動調整')
+    parser.add_argument('--adaptive-max', type=int, default=DEFAULT_MAX_LIMIT,
+                       help=f'自動調整時の並列数の上限 (デフォルト: {DEFAULT_MAX_LIMIT})')
+    parser.add_argument('--max-rate', type=parse_rate,
+                       help='実行全体の帯域の上限（例: 200M, 500K）。実行中のジョブで分け合う')
+    parser.add_argument('--max-connections', type=int,
+                       help='実行全体の接続数の上限（並列フラグメント・aria2cの接続数をジョブで分け合う）')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH,
+                       help=f'並列ダウンロード中に動画情報を先読みする件数（0で無効） (デフォルト: {DEFAULT_PREFETCH})')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                       help=f'1本の動画の最大試行回数。一時的なエラー・403/429は間隔をあけて再試行 (デフォルト: {DEFAULT_MAX_ATTEMPTS})')
+    parser.add_argument('--staged', action='store_true',
+                       help='並列ダウンロード時、動画・音声の結合をダウンロードと別のステージ（コア数のスレッド）で実行')
+    parser.add_argument('--progress-json', metavar='FILE',
+                       help='進捗イベント（バイト数・速度・残り時間・段階）をJSON Linesで追記するファイル（-で標準出力）')
+    parser.add_argument('--metrics-port', type=int,
+                       help='メトリクス（Prometheus/OpenMetrics形式）を公開するポート。http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-host', default=DEFAULT_METRICS_HOST,
+                       help=f'メトリクスを公開するアドレス (デフォルト: {DEFAULT_METRICS_HOST})')
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_FILENAME, metavar='FILE',
+                       help=f'各ジョブの段階ごとの所要時間を記録し、終了時にp50/p95/p99を表示してChrome/Perfetto形式のトレースを書き出す (デフォルト: {DEFAULT_PROFILE_FILENAME})')
+    parser.add_argument('--no-circuit-breaker', action='store_true',
+                       help='403/429の多発時に新しいダウンロードの開始を一時停止しない')
     parser.add_argument('--no-cache', action='store_true',
                        help='キャッシュ機能を無効化')
+    parser.add_argument('--info-cache-ttl', type=int, default=DEFAULT_TTL,
+                       help=f'動画情報キャッシュの有効期限（秒） (デフォルト: {DEFAULT_TTL})')
+    parser.add_argument('--info-cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                       help=f'動画情報キャッシュの最大件数 (デフォルト: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--cache-stats', action='store_true',
+                       help='終了時に動画情報キャッシュのヒット・ミス数を表示')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                       help='複数動画・プレイリストをasyncioで並列実行（スレッドプールの代わり）')
+    parser.add_argument('--resume', action='store_true',
+                       help='中断された複数動画・プレイリストのダウンロードを続きから再開')
+    parser.add_argument('--engine', default='subprocess', choices=ENGINE_CHOICES,
+                       help='yt-dlpの実行方式 (subprocess=動画ごとにプロセス起動, inprocess=プロセス内で実行, デフォルト: subprocess)')
     
     args = parser.parse_args()
+    if args.progress_json == '-':
+        sys.stdout = sys.stderr  # 標準出力は進捗イベント専用にし、通常の表示は標準エラー出力へ
     
     # インスタンス作成（高速化オプション付き）
     downloader = YouTubeVideoDownloader(
         output_dir=args.output,
         max_workers=args.max_workers,
-        enable_cache=not args.no_cache
+        enable_cache=not args.no_cache,
+        engine=args.engine,
+        info_cache_ttl=args.info_cache_ttl,
+        info_cache_size=args.info_cache_size,
+        use_async=args.use_async,
+        adaptive=args.adaptive,
+        adaptive_max=args.adaptive_max,
+        max_rate=args.max_rate,
+        max_connections=args.max_connections,
+        prefetch=args.prefetch,
+        max_attempts=args.max_attempts,
+        circuit_breaker=not args.no_circuit_breaker,
+        staged=args.staged,
+        progress_json=args.progress_json
     )
+    if args.cache_stats:
+        atexit.register(downloader.print_cache_stats)
+    if args.metrics_port is not None and not downloader.start_metrics(args.metrics_port, args.metrics_host):
+        sys.exit(1)
+    if args.profile:
+        downloader.start_profile(args.profile)
     
     if args.list:
         # ダウンロード済みファイル一覧表示
-        downloader.list_downloads()
+        downloader.list_downloads(args.list_format, scan=args.scan, match=args.match, quality=args.list_quality,
+                                  sort=args.sort, reverse=args.reverse, page=args.page, page_size=args.page_size)
+        return
+    
+    if args.dedup:
+        # 重複排除（保守用）
+        if not downloader.dedup_downloads(hardlink=args.hardlink):
+            sys.exit(1)
+        return
+    
+    # 中断された一括ダウンロードの再開
+    if args.resume:
+        batch = downloader.open_job_queue().latest_unfinished()
+        if batch is None:
+            print("🔁 再開できる一括ダウンロードはありません")
+            return
+        options = batch.options
+        try:
+            if batch.kind == 'playlist':
+                success = downloader.download_playlist(
+                    batch.source,
+                    options.get('quality', '720p'),
+                    options.get('limit'),
+                    options.get('format_id'),
+                    options.get('audio_quality', '0'),
+                    options.get('audio_format', 'best'),
+                    resume=batch
+                )
+            else:
+                results = downloader.download_multiple_videos(
+                    None,
+                    options.get('quality', '720p'),
+                    options.get('format_id'),
+                    options.get('audio_quality', '0'),
+                    options.get('audio_format', 'best'),
+                    resume=batch
+                )
+                success = all(results.values())
+        except KeyboardInterrupt:
+            print("\n\n⏹️ ダウンロードが中断されました（--resumeで再開できます）")
+            sys.exit(1)
+        
+        if not success:
+            print("\n❌ 一部のダウンロードに失敗しました")
+            sys.exit(1)
+        print("\n✅ 一括ダウンロードが完了しました!")
         return
     
     # 複数URLの並列ダウンロード
@@ -748,13 +1728,17 @@ def main():
             print("❌ エラー: 有効なYouTube URLを入力してください")
             return
         
-        success = downloader.download_multiple_videos(
-            args.urls, 
-            args.quality, 
-            args.format_id, 
-            args.audio_quality, 
-            args.audio_format
-        )
+        try:
+            success = downloader.download_multiple_videos(
+                args.urls, 
+                args.quality, 
+                args.format_id, 
+                args.audio_quality, 
+                args.audio_format
+            )
+        except KeyboardInterrupt:
+            print("\n\n⏹️ ダウンロードが中断されました（--resumeで再開できます）")
+            sys.exit(1)
         
         if success:
             print("\n✅ 並列ダウンロードが正常に完了しました!")
@@ -789,26 +1773,27 @@ def main():
                 args.audio_format
             )
         else:
-            # 単一動画ダウンロード
-            success = downloader.download_video(
-                args.url, 
-                args.quality, 
-                args.format_id, 
-                args.audio_quality, 
-                args.audio_format
-            )
+            # 単一動画ダウンロード（一時的なエラーは再試行）
+            with downloader.progress_display(parallel=False):
+                success = downloader.run_job(
+                    args.url, 
+                    args.quality, 
+                    args.format_id, 
+                    args.audio_quality, 
+                    args.audio_format
+                )
         
         if success:
             print("\n✅ 動画ダウンロードが正常に完了しました!")
             print(f"📁 ファイルは {args.output} ディレクトリに保存されています")
-            if args.enable_cache:
+            if not args.no_cache:
                 print("💾 キャッシュに保存されました（重複ダウンロード防止）")
         else:
             print("\n❌ 動画ダウンロードに失敗しました")
             sys.exit(1)
             
     except KeyboardInterrupt:
-        print("\n\n⏹️ ダウンロードが中断されました")
+        print("\n\n⏹️ ダウンロードが中断されました" + ("（--resumeで再開できます）" if args.playlist else ""))
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ 予期しないエラーが発生しました: {e}")
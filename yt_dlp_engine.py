@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yt-dlp実行エンジン
+yt-dlpをサブプロセスとして起動するバックエンドと、
+yt_dlp.YoutubeDLをプロセス内で直接駆動するバックエンドを提供します
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+from collections import deque
+from typing import NamedTuple, Optional
+
+try:
+    import yt_dlp
+except ImportError:  # yt-dlpがモジュールとして導入されていない場合
+    yt_dlp = None
+
+ENGINE_CHOICES = ['subprocess', 'inprocess']
+
+# リアルタイム出力時に、エラー診断用として保持する末尾の行数
+TAIL_LINES = 50
+
+# 実行ごとに変わるオプション（YoutubeDLインスタンスの再利用判定から除き、実行時に差し替える）
+_PER_RUN_OPTIONS = ('ratelimit', 'concurrent_fragment_downloads', 'external_downloader_args')
+
+# 移動後（最終的な出力ファイル確定後）にyt-dlpが出力する報告行
+RESULT_MARKER = "YTDL_RESULT\t"
+RESULT_PRINT_ARGS = [
+    '--no-quiet',  # --printは既定で画面出力を抑制するため、通常の出力を維持
+    '--print', 'after_move:' + RESULT_MARKER + '[%(id)j,%(format_id)j,%(filepath)j]',
+]
+
+# ダウンロード・後処理の進捗を機械可読な1行で出力させる（表示・末尾の保持はせずon_outputにのみ渡す）
+PROGRESS_MARKER = "YTDL_PROGRESS\t"
+PROGRESS_TEMPLATE_ARGS = [
+    '--progress-template', 'download:' + PROGRESS_MARKER + '["download",%(info.id)j,%(progress.status)j,'
+    '%(progress.downloaded_bytes)j,%(progress.total_bytes)j,%(progress.total_bytes_estimate)j,'
+    '%(progress.speed)j,%(progress.eta)j]',
+    '--progress-template', 'postprocess:' + PROGRESS_MARKER + '["postprocess",%(info.id)j,%(progress.status)j,'
+    '%(progress.postprocessor)j]',
+]
+
+
+class DownloadedFile(NamedTuple):
+    """yt-dlpが報告した出力ファイル"""
+    video_id: str
+    format_id: str
+    filepath: str
+    filesize: Optional[int]
+
+
+def parse_result_line(line):
+    """
+    報告行を解析
+
+    Args:
+        line (str): yt-dlpの出力行
+
+    Returns:
+        DownloadedFile: 出力ファイル（報告行でない場合None）
+    """
+    if not line.startswith(RESULT_MARKER):
+        return None
+    try:
+        video_id, format_id, filepath = json.loads(line[len(RESULT_MARKER):])
+    except (ValueError, TypeError):
+        return None
+    # 値がない項目はyt-dlpが"NA"として出力する
+    video_id, format_id, filepath = (None if value == 'NA' else value for value in (video_id, format_id, filepath))
+    if not filepath or not isinstance(filepath, str):
+        return None
+    try:
+        filesize = os.stat(filepath).st_size
+    except OSError:
+        filesize = None
+    return DownloadedFile(video_id, format_id, filepath, filesize)
+
+
+class DownloadResult:
+    """
+    1本の動画のダウンロード結果
+
+    真偽値として評価すると成功したかどうかを返します。
+    """
+
+    def __init__(self, ok, files=None, skipped=False, error_output="", interrupted=False, postprocess=None):
+        self.ok = ok
+        self.files = files or []  # yt-dlpが報告した出力ファイル（DownloadedFile）
+        self.skipped = skipped    # ダウンロード済みのためスキップした場合True
+        self.error_output = error_output  # 失敗時のyt-dlpの出力（末尾）
+        self.interrupted = interrupted    # Ctrl-C等で中断された場合True
+        # 段階実行時、ダウンロード後にCPUステージで行う結合・変換（最終的なDownloadResultを返す関数）
+        self.postprocess = postprocess
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def filepath(self):
+        return self.files[0].filepath if self.files else None
+
+
+class EngineResult:
+    """yt-dlp実行結果"""
+
+    def __init__(self, returncode, stdout="", stderr="", files=None):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.files = files or []  # RESULT_PRINT_ARGSを渡した場合の出力ファイル
+        # stream=Trueの場合、stderrには標準出力と合わせた末尾TAIL_LINES行が入る
+
+    @property
+    def interrupted(self):
+        """シグナルで終了した、またはyt-dlpが中断を報告した場合True"""
+        return self.returncode < 0 or 'Interrupted by user' in (self.stderr or '')
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+class SubprocessEngine:
+    """yt-dlpの実行ファイルを1回ごとに起動するバックエンド（従来の動作）"""
+
+    name = 'subprocess'
+
+    def __init__(self, yt_dlp_path='yt-dlp'):
+        self.yt_dlp_path = yt_dlp_path
+
+    def version(self):
+        """yt-dlpのバージョン文字列を取得（取得できない場合None）"""
+        try:
+            result = subprocess.run([self.yt_dlp_path, '--version'],
+                                    capture_output=True, text=True, check=True)
+            return result.stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    def run(self, args, stream=False, lease=None, on_output=None, echo=True):
+        """
+        yt-dlpを実行
+
+        Args:
+            args (list): yt-dlpに渡す引数（実行ファイルパスは含まない）
+            stream (bool): 出力をリアルタイムで処理するか（保持するのは末尾TAIL_LINES行のみ）
+            lease (Lease): 帯域の割り当て（プロセス内実行のみ、実行中の変更を反映）
+            on_output (callable): リアルタイム出力の各行を受け取る関数
+            echo (bool): リアルタイム出力の各行を表示するか（Falseの場合はon_outputにのみ渡す）
+
+        Returns:
+            EngineResult: 実行結果
+        """
+        cmd = [self.yt_dlp_path] + list(args)
+
+        if not stream:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            files = [f for f in map(parse_result_line, result.stdout.splitlines()) if f]
+            return EngineResult(result.returncode, result.stdout, result.stderr, files)
+
+        # リアルタイム出力（stderrもstdoutにまとめて表示）
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            bufsize=1
+        )
+        files = []
+        tail = deque(maxlen=TAIL_LINES)
+        for line in process.stdout:
+            line = line.rstrip()
+            reported = parse_result_line(line)
+            if reported:
+                files.append(reported)
+            elif line.startswith(PROGRESS_MARKER):
+                if on_output:
+                    on_output(line)
+            else:
+                if echo:
+                    print(line)
+                tail.append(line)
+                if on_output:
+                    on_output(line)
+        process.wait()
+        return EngineResult(process.returncode, stderr="\n".join(tail), files=files)
+
+    def iter_lines(self, args):
+        """
+        yt-dlpの標準出力を出力され次第1行ずつ返す（プレイリストの列挙など）
+
+        Args:
+            args (list): yt-dlpに渡す引数（実行ファイルパスは含まない）
+
+        Yields:
+            str: 出力の行
+
+        Raises:
+            subprocess.CalledProcessError: 終了コードが0以外の場合
+        """
+        cmd = [self.yt_dlp_path] + list(args)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   universal_newlines=True, bufsize=1)
+        # stderrが詰まらないよう別スレッドで読み捨てる（末尾はエラー表示用に保持）
+        stderr_tail = deque(maxlen=TAIL_LINES)
+        reader = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+        reader.start()
+        try:
+            for line in process.stdout:
+                yield line.rstrip('\n')
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        reader.join()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr="".join(stderr_tail))
+
+
+class _CaptureLogger:
+    """YoutubeDLのログ出力を受け取り、実行ごとの出力先に振り分けるロガー"""
+
+    def __init__(self):
+        self.stdout = []
+        self.stderr = []
+        self.files = []
+        self.stream = False
+        self.on_line = None
+        self.on_output = None
+        self.echo = True
+
+    def reset(self, stream, on_line=None, on_output=None, echo=True):
+        self.stdout = []
+        self.stderr = deque(maxlen=TAIL_LINES) if stream else []
+        self.files = []
+        self.stream = stream
+        self.on_line = on_line
+        self.on_output = on_output
+        self.echo = echo
+
+    def _emit(self, sink, msg):
+        reported = parse_result_line(msg)
+        if reported:
+            self.files.append(reported)
+        elif msg.startswith(PROGRESS_MARKER):
+            if self.stream and self.on_output:
+                self.on_output(msg)
+        elif self.on_line is not None and sink is self.stdout:
+            self.on_line(msg)
+        elif self.stream:
+            if self.echo:
+                print(msg)
+            self.stderr.append(msg)
+            if self.on_output:
+                self.on_output(msg)
+        else:
+            sink.append(msg)
+
+    def debug(self, msg):
+        # yt-dlpは通常の画面出力もdebugに流す（verbose時のみ[debug]接頭辞付き）
+        if msg.startswith('[debug] '):
+            return
+        self._emit(self.stdout, msg)
+
+    def info(self, msg):
+        self._emit(self.stdout, msg)
+
+    def warning(self, msg):
+        self._emit(self.stderr, msg)
+
+    def error(self, msg):
+        self._emit(self.stderr, msg)
+
+
+class InProcessEngine:
+    """
+    yt_dlp.YoutubeDLをプロセス内で駆動するバックエンド
+
+    ワーカースレッドごとに長寿命のYoutubeDLインスタンスを保持し、
+    インタプリタ起動とエクストラクタ初期化のコストを初回のみに抑えます。
+    引数はyt-dlp本体と同じparse_optionsで解釈するため、出力はサブプロセス版と一致します。
+    出力はYoutubeDLのlogger引数（形式一覧・--printなどの標準出力もloggerに渡される）で受け取り、
+    終了コードはdownload()の戻り値を使います。YoutubeDLは失敗を以後の戻り値にも残すため、
+    失敗したインスタンスは再利用せずに破棄します。
+    iter_lines（プレイリストの列挙など）はエンジンごとに1つの読み取りスレッドで順に実行します。
+    """
+
+    name = 'inprocess'
+
+    def __init__(self):
+        if yt_dlp is None:
+            raise RuntimeError("yt_dlpモジュールがインポートできません (pip install yt-dlp)")
+        self._local = threading.local()
+        self._reader_jobs = None
+        self._reader_lock = threading.Lock()
+
+    def version(self):
+        """yt-dlpのバージョン文字列を取得"""
+        return yt_dlp.version.__version__
+
+    def _get_ydl(self, ydl_opts):
+        """
+        現在のスレッド用のYoutubeDLインスタンスを取得
+
+        形式指定（format）と帯域・並列数以外のオプションが同じであれば、既存のインスタンスを再利用します。
+        """
+        opts = dict(ydl_opts)
+        format_spec = opts.pop('format', None)
+        per_run = {name: opts.pop(name, None) for name in _PER_RUN_OPTIONS}
+        key = repr(sorted(opts.items(), key=lambda item: item[0]))
+
+        instances = getattr(self._local, 'instances', None)
+        if instances is None:
+            instances = self._local.instances = {}
+
+        entry = instances.get(key)
+        if entry is None:
+            logger = _CaptureLogger()
+            ydl = yt_dlp.YoutubeDL(dict(ydl_opts, logger=logger))
+            entry = instances[key] = (ydl, logger)
+
+        ydl, logger = entry
+        for name, value in per_run.items():
+            if value is None:
+                ydl.params.pop(name, None)
+            else:
+                ydl.params[name] = value
+        if ydl.params.get('format') != format_spec:
+            # 形式指定のみ差し替える（YoutubeDL.__init__と同じ手順でセレクタを再構築）
+            ydl.params['format'] = format_spec
+            ydl.format_selector = (
+                format_spec if format_spec in (None, '-')
+                else ydl.build_format_selector(format_spec)
+            )
+        return ydl, logger
+
+    def _discard_ydl(self, ydl):
+        """失敗したYoutubeDLインスタンスを破棄（download()の戻り値が以後も失敗のままになるため）"""
+        instances = getattr(self._local, 'instances', {})
+        for key, (cached, _) in list(instances.items()):
+            if cached is ydl:
+                del instances[key]
+
+    def run(self, args, stream=False, lease=None, on_output=None, on_line=None, echo=True):
+        """
+        yt-dlpを実行
+
+        Args:
+            args (list): yt-dlpに渡す引数（実行ファイルパスは含まない）
+            stream (bool): 出力をリアルタイムで処理するか（保持するのは末尾TAIL_LINES行のみ）
+            lease (Lease): 帯域の割り当て（プロセス内実行のみ、実行中の変更を反映）
+            on_output (callable): リアルタイム出力の各行を受け取る関数
+            on_line (callable): 標準出力の行を受け取る関数（指定時は結果に含めない）
+            echo (bool): リアルタイム出力の各行を表示するか（Falseの場合はon_outputにのみ渡す）
+
+        Returns:
+            EngineResult: 実行結果
+        """
+        try:
+            parsed = yt_dlp.parse_options(list(args))
+        except SystemExit as e:
+            # 引数エラーはyt-dlp本体と同じく終了コード2
+            return EngineResult(e.code if isinstance(e.code, int) else 2)
+
+        ydl, logger = self._get_ydl(parsed.ydl_opts)
+        logger.reset(stream, on_line, on_output, echo)
+        if lease is not None:
+            # ダウンローダーはydl.paramsを共有するため、再分配した帯域が実行中のダウンロードに反映される
+            lease.bind(lambda rate: ydl.params.__setitem__('ratelimit', rate))
+
+        try:
+            if parsed.options.load_info_filename:
+                # --load-info-json: 保存済みの情報から抽出を省略してダウンロード
+                returncode = ydl.download_with_info_file(parsed.options.load_info_filename)
+            else:
+                returncode = ydl.download(parsed.urls)
+        except yt_dlp.utils.DownloadError:
+            returncode = 1
+        except Exception as e:
+            logger.error(f"ERROR: {e}")
+            returncode = 1
+        if returncode:
+            self._discard_ydl(ydl)
+
+        return EngineResult(returncode, "\n".join(logger.stdout), "\n".join(logger.stderr), logger.files)
+
+    def iter_lines(self, args):
+        """
+        yt-dlpの標準出力を出力され次第1行ずつ返す（SubprocessEngine.iter_linesと同じ）
+
+        エンジンの読み取りスレッドで実行し、出力された行をキュー経由で受け取ります。
+        読み取りスレッドは1つのため、同時に呼び出した場合は先の列挙の終了後に開始します。
+        """
+        lines = queue.Queue()
+        outcome = {}
+        self._reader_queue().put((args, lines, outcome))
+        while True:
+            line = lines.get()
+            if line is None:
+                break
+            yield line
+        result = outcome.get('result')
+        if result is None or not result.ok:
+            returncode = result.returncode if result else 1
+            raise subprocess.CalledProcessError(returncode, args, stderr=result.stderr if result else None)
+
+
+    def _reader_queue(self):
+        """iter_lines用の読み取りスレッド（初回に起動）のジョブキュー"""
+        with self._reader_lock:
+            if self._reader_jobs is None:
+                self._reader_jobs = queue.Queue()
+                threading.Thread(target=self._read_lines, name='yt-dlp-reader', daemon=True).start()
+            return self._reader_jobs
+
+    def _read_lines(self):
+        """読み取りスレッド: iter_linesの実行を順に処理（スレッドのYoutubeDLを列挙のたびに再利用）"""
+        while True:
+            args, lines, outcome = self._reader_jobs.get()
+            try:
+                outcome['result'] = self.run(args, on_line=lines.put)
+            except Exception:
+                pass  # 結果がない場合はiter_linesで失敗として扱う
+            finally:
+                lines.put(None)
+
+
+def create_engine(backend='subprocess', yt_dlp_path='yt-dlp'):
+    """
+    バックエンド名からエンジンを生成
+
+    Args:
+        backend (str): 'subprocess' または 'inprocess'
+        yt_dlp_path (str): サブプロセス版で使用するyt-dlpのパス
+
+    Returns:
+        SubprocessEngine | InProcessEngine: エンジン
+    """
+    if backend == 'inprocess':
+        return InProcessEngine()
+    return SubprocessEngine(yt_dlp_path)